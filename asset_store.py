@@ -0,0 +1,231 @@
+"""
+[Asset Store Module]
+렌더링된 HTML 이 참조하는 이미지를 내용 해시(sha256)로 저장하는 저장소입니다.
+
+- 같은 이미지는 페이지/요청/작업자 프로세스가 달라도 파일 하나로 저장 (내용이 같으면 해시가 같음)
+- HTML 에는 base64 data URI 대신 /assets/{hash} URL 이 들어가므로 응답이 작아지고 브라우저가 이미지를 캐시함
+- 내용이 바뀌면 URL 도 바뀌므로 GET /assets/{hash} 는 immutable 로 1년 캐시
+- 저장 용량이 MAX_BYTES 를 넘으면 오래 쓰이지 않은 파일부터 삭제 (prune, 서버 시작 시 실행)
+  단, 끝나지 않았거나 보관 중인 작업(job_queue)이 참조하는 파일과 MIN_AGE 안에 쓰인 파일은 지우지 않음
+  (이미 응답한 HTML 이 /assets URL 을 계속 참조하므로)
+- 업로드 원본은 공개되지 않는 별도 저장소(upload_store, AURA_UPLOAD_DIR)에 둠
+  staging 디렉토리에 흘려 쓴 뒤 해시가 정해지면 adopt 로 옮김 (upload_spool)
+
+상태 확인:
+    python asset_store.py [--prune]
+"""
+
+import base64
+import hashlib
+import os
+import re
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Optional, Set
+
+
+ASSET_DIR = os.getenv("AURA_ASSET_DIR", "./.assets")
+MAX_BYTES = int(os.getenv("AURA_ASSET_MAX_BYTES", str(2 * 1024 ** 3)))
+MIN_AGE = float(os.getenv("AURA_ASSET_MIN_AGE", str(7 * 24 * 3600)))   # 초: 최근 이 시간 안에 쓰인 파일은 prune 하지 않음
+UPLOAD_DIR = os.getenv("AURA_UPLOAD_DIR", "./.uploads")
+UPLOAD_MAX_BYTES = int(os.getenv("AURA_UPLOAD_STORE_MAX_BYTES", str(2 * 1024 ** 3)))
+UPLOAD_MIN_AGE = 24 * 3600.0   # 초: 업로드 원본은 /edit 재사용 동안만 필요
+URL_PREFIX = "/assets/"
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+TOUCH_INTERVAL = 3600.0     # 초: 재사용된 파일의 mtime 갱신 간격 (prune 순서용)
+STAGING_TTL = 3600.0        # 초: 이보다 오래된 staging 파일은 중단된 업로드로 보고 prune 때 삭제
+
+HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+# 파일 시그니처 → Content-Type
+MAGIC_TYPES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"RIFF", "image/webp"),   # RIFF....WEBP
+)
+
+
+def sniff_content_type(head: bytes) -> str:
+    for magic, content_type in MAGIC_TYPES:
+        if head.startswith(magic):
+            if content_type == "image/webp" and head[8:12] != b"WEBP":
+                continue
+            return content_type
+    return "application/octet-stream"
+
+
+def decode_data_uri(data_uri: str) -> bytes:
+    """data:image/...;base64,.... (또는 base64 문자열) → bytes"""
+    return base64.b64decode(data_uri.split(",", 1)[1] if data_uri.startswith("data:") else data_uri)
+
+
+class AssetStore:
+    """
+    내용 주소 방식(content-addressed) 이미지 저장소
+    """
+
+    def __init__(self, root: str = ASSET_DIR, max_bytes: int = MAX_BYTES, min_age: float = MIN_AGE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.min_age = min_age
+
+    def path(self, asset_hash: str) -> Optional[str]:
+        """저장된 파일 경로 (잘못된 해시이거나 없으면 None)"""
+        if not HASH_PATTERN.match(asset_hash or ""):
+            return None
+        path = os.path.join(self.root, asset_hash[:2], asset_hash)
+        return path if os.path.exists(path) else None
+
+    @staticmethod
+    def url(asset_hash: str) -> str:
+        return f"{URL_PREFIX}{asset_hash}"
+
+    def put(self, data: bytes) -> str:
+        """저장 후 해시 반환 (이미 있으면 쓰지 않음)"""
+        asset_hash = hashlib.sha256(data).hexdigest()
+        directory = os.path.join(self.root, asset_hash[:2])
+        path = os.path.join(directory, asset_hash)
+        if os.path.exists(path):
+            self._touch(path)
+            return asset_hash
+        os.makedirs(directory, exist_ok=True)
+        # 다른 프로세스가 같은 파일을 쓰는 중이어도 완성된 파일만 보이도록 임시 파일 → rename
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return asset_hash
+
+    def staging_dir(self) -> str:
+        """spool 중인 업로드 임시 파일 위치 (같은 파일시스템이라 adopt 가 rename 으로 끝남)"""
+        directory = os.path.join(self.root, ".staging")
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def adopt(self, tmp_path: str, asset_hash: str) -> str:
+        """다 쓴 staging 파일을 해시 경로로 이동 (이미 있으면 임시 파일 삭제), 해시 반환"""
+        directory = os.path.join(self.root, asset_hash[:2])
+        path = os.path.join(directory, asset_hash)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            self._touch(path)
+            return asset_hash
+        os.makedirs(directory, exist_ok=True)
+        os.replace(tmp_path, path)
+        return asset_hash
+
+    def put_url(self, data: bytes) -> str:
+        return self.url(self.put(data))
+
+    def content_type(self, asset_hash: str) -> str:
+        path = self.path(asset_hash)
+        if path is None:
+            return "application/octet-stream"
+        with open(path, "rb") as f:
+            return sniff_content_type(f.read(16))
+
+    @staticmethod
+    def _touch(path: str):
+        try:
+            if time.time() - os.path.getmtime(path) > TOUCH_INTERVAL:
+                os.utime(path)
+        except OSError:
+            pass
+
+    def _files(self):
+        if not os.path.isdir(self.root):
+            return
+        for shard in os.listdir(self.root):
+            directory = os.path.join(self.root, shard)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if HASH_PATTERN.match(name):
+                    path = os.path.join(directory, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def _prune_staging(self):
+        directory = os.path.join(self.root, ".staging")
+        if not os.path.isdir(directory):
+            return
+        cutoff = time.time() - STAGING_TTL
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                continue
+
+    def prune(self, keep: Optional[Set[str]] = None) -> int:
+        """
+        MAX_BYTES 를 넘는 만큼 오래 쓰이지 않은 파일 삭제, 삭제한 파일 수 반환
+        keep: 지우지 않을 해시 (job_store.referenced_assets), min_age 안에 쓰인 파일도 남김
+        """
+        self._prune_staging()
+        keep = keep or set()
+        cutoff = time.time() - self.min_age
+        files = sorted(self._files(), key=lambda f: f[2])
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for path, size, mtime in files:
+            if total <= self.max_bytes:
+                break
+            if mtime >= cutoff:
+                # 나머지는 모두 최근에 쓰인 파일
+                print(f"⚠️ [Assets] {self.root} over {self.max_bytes / 1024 ** 2:.0f}MB "
+                      f"but remaining files were used in the last {self.min_age / 3600:.0f}h", file=sys.stderr)
+                break
+            if os.path.basename(path) in keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            print(f"🧹 [Assets] Pruned {removed} file(s), {total / 1024 ** 2:.1f}MB kept", file=sys.stderr)
+        return removed
+
+    def metrics(self) -> Dict[str, Any]:
+        files = list(self._files())
+        return {
+            "root": self.root,
+            "files": len(files),
+            "bytes": sum(size for _, size, _ in files),
+            "max_bytes": self.max_bytes,
+        }
+
+
+# 전역 인스턴스
+asset_store = AssetStore()                   # 렌더링된 이미지, GET /assets/{hash} 로 공개
+upload_store = AssetStore(UPLOAD_DIR, UPLOAD_MAX_BYTES, UPLOAD_MIN_AGE)   # 업로드 원본 (공개하지 않음)
+
+
+def prune_stores() -> int:
+    """두 저장소 prune (작업 큐가 참조하는 파일은 남김)"""
+    from job_queue import job_store
+
+    keep = job_store.referenced_assets()
+    return asset_store.prune(keep) + upload_store.prune(keep)
+
+
+if __name__ == "__main__":
+    if "--prune" in sys.argv:
+        prune_stores()
+    for store, label in ((asset_store, "assets"), (upload_store, "uploads")):
+        m = store.metrics()
+        print(f"{m['files']} {label}, {m['bytes'] / 1024 ** 2:.1f}MB / {m['max_bytes'] / 1024 ** 2:.0f}MB in {m['root']}")
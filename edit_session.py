@@ -0,0 +1,140 @@
+"""
+[Edit Session Module]
+페이지별 직전 요청과 중간 결과를 보관하고, 수정 요청과 비교해 다시 실행할 단계를 결정하는 모듈입니다.
+
+단계별 의존 입력:
+1. Vision Analysis (Gemini)  : 이미지 (제목/본문 수정은 분위기 분석에 영향이 작아 재사용)
+2. RAG Search                : Vision 결과 + 페이지 유형 + 이미지 수
+3. image_analyzer            : 이미지 + 페이지 유형
+4. layout_planner            : 이미지 + 페이지 유형 + 본문 길이 구간 (text_size 는 재사용 시에도 다시 맞춤)
+5. typography_styler         : 제목 + 본문 앞부분 + 인용구(key phrase) + 페이지 유형
+6. html_generator 이후       : 항상 다시 실행 (본문이 그대로 출력되므로)
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Union
+
+
+MAX_PAGES = 256            # 보관할 최대 페이지 기록 수 (오래된 것부터 제거)
+BODY_PREVIEW_CHARS = 200   # typography 재사용 판단에 비교하는 본문 도입부 (인용구는 따로 비교)
+
+# layout_planner 의 레이아웃 선택 기준 (본문 길이 200 / 1000 자)
+BODY_LENGTH_BANDS = (200, 1000)
+
+QUOTE_PATTERN = re.compile(r'"([^"]+)"|“([^”]+)”|‘([^’]+)’|\'([^\']{4,})\'')
+
+
+def image_fingerprints(images: List[Union[Any, bytes, str]]) -> List[str]:
+    """업로드 원본 지문 (SourceImage 는 원본 sha256, bytes / data URI 는 sha1)"""
+    fingerprints = []
+    for image in images:
+        digest = getattr(image, "digest", None)
+        if digest is None:
+            digest = hashlib.sha1(image if isinstance(image, bytes) else image.encode("utf-8")).hexdigest()
+        fingerprints.append(digest[:16])
+    return fingerprints
+
+
+def key_phrases(body: str) -> List[str]:
+    """typography_styler 가 강조색을 입히는 인용구 목록"""
+    return sorted({next(g for g in match if g) for match in QUOTE_PATTERN.findall(body or "")})
+
+
+def body_length_band(body: str) -> int:
+    length = len(body or "")
+    return sum(1 for threshold in BODY_LENGTH_BANDS if length >= threshold)
+
+
+def plan_rerender(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    직전 기록과 새 요청을 비교해 재사용할 결과 결정
+
+    Args:
+        previous: EditStore 에 저장된 기록 (headline, body, layout_type, images, analysis, rag_results,
+                  best_layout, context, variants, result)
+        current: 새 요청 (headline, body, layout_type, images, variants, style_override)
+
+    Returns:
+        {"changed": [...], "unchanged": bool, "rerun_vision": bool, "rerun_rag": bool,
+         "reuse_context": {...}, "reasons": [...]}
+    """
+    changed = [field for field in ("headline", "body", "layout_type", "variants", "style_override")
+               if previous.get(field) != current.get(field)]
+    if image_fingerprints(previous.get("images", [])) != image_fingerprints(current.get("images", [])):
+        changed.append("images")
+
+    context = previous.get("context") or {}
+    plan = {"changed": changed, "unchanged": not changed, "rerun_vision": False, "rerun_rag": False,
+            "reuse_context": {}, "reasons": []}
+
+    if "images" in changed:
+        plan.update(rerun_vision=True, rerun_rag=True)
+        plan["reasons"].append("images changed: full re-render")
+        return plan
+    if "layout_type" in changed:
+        plan["rerun_rag"] = True
+        plan["reasons"].append("page type changed: RAG search and all layout nodes rerun")
+        return plan
+
+    reuse = {}
+    if context.get("image_analysis") is not None:
+        reuse["image_analysis"] = context["image_analysis"]
+
+    if context.get("layout_plan") is not None:
+        if body_length_band(previous.get("body")) == body_length_band(current.get("body")):
+            reuse["layout_plan"] = context["layout_plan"]
+        else:
+            plan["reasons"].append("body length crossed a layout threshold: layout_planner reruns")
+
+    typography_inputs_same = (
+        "headline" not in changed
+        and "style_override" not in changed
+        and (previous.get("body") or "")[:BODY_PREVIEW_CHARS] == (current.get("body") or "")[:BODY_PREVIEW_CHARS]
+        and key_phrases(previous.get("body")) == key_phrases(current.get("body"))
+    )
+    if context.get("typography_style") is not None and typography_inputs_same:
+        reuse["typography_style"] = context["typography_style"]
+    elif changed:
+        plan["reasons"].append("headline/lead/key phrases/style override changed: typography_styler reruns")
+
+    plan["reuse_context"] = reuse
+    plan["reasons"].append(f"reusing vision analysis, RAG results and {sorted(reuse) or 'no node outputs'}")
+    return plan
+
+
+class EditStore:
+    """
+    (사용자, 페이지) 별 직전 요청/결과 저장소 (프로세스 메모리, LRU)
+    """
+
+    def __init__(self, max_pages: int = MAX_PAGES):
+        self.max_pages = max_pages
+        self._records: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(username: str, page_id: Any) -> str:
+        return f"{username}:{page_id}"
+
+    def get(self, username: str, page_id: Any) -> Optional[Dict[str, Any]]:
+        key = self._key(username, page_id)
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None:
+                self._records.move_to_end(key)
+            return record
+
+    def save(self, username: str, page_id: Any, record: Dict[str, Any]):
+        key = self._key(username, page_id)
+        with self._lock:
+            self._records[key] = record
+            self._records.move_to_end(key)
+            while len(self._records) > self.max_pages:
+                self._records.popitem(last=False)
+
+
+# 전역 인스턴스
+edit_store = EditStore()
@@ -0,0 +1,153 @@
+"""
+[Event Loop Module]
+uvicorn 이벤트 루프를 막지 않도록 동기 호출을 내보내는 bounded executor 와 루프 지연(lag) 측정기입니다.
+
+1. BlockingPool   : 작업 스레드 수(AURA_BLOCKING_WORKERS)와 대기 작업 수(AURA_BLOCKING_PENDING)가 제한된 executor
+                    대기열이 차면 호출 측 코루틴이 기다리므로(backpressure) 스레드/메모리가 무한히 늘지 않음
+                    contextvars(token_budget 요청 집계 등)는 작업 스레드로 복사됨
+2. LoopLagMonitor : LAG_INTERVAL 마다 sleep 이 늦게 깨어난 시간을 기록 (루프를 막는 동기 호출이 있으면 커짐)
+
+지표: GET /metrics/runtime
+"""
+
+import asyncio
+import contextvars
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+BLOCKING_WORKERS = int(os.getenv("AURA_BLOCKING_WORKERS", "16"))
+BLOCKING_PENDING = int(os.getenv("AURA_BLOCKING_PENDING", "64"))   # 실행 중 + 대기 중 작업 최대 수
+
+LAG_INTERVAL = 0.25     # 초: 측정 주기
+LAG_WINDOW = 240        # 최근 샘플 수 (약 1분)
+LAG_WARN = 0.2          # 초: 이보다 크게 막히면 경고 출력
+
+
+class BlockingPool:
+    """
+    동기 함수를 작업 스레드에서 실행하는 제한된 executor
+    """
+
+    def __init__(self, workers: int = BLOCKING_WORKERS, max_pending: int = BLOCKING_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aura-blocking")
+        self._admission: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self.stats = {"pending": 0, "running": 0, "completed": 0, "failed": 0,
+                      "queue_wait_total": 0.0, "queue_wait_max": 0.0}
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        if self._admission is None:
+            self._admission = asyncio.Semaphore(self.max_pending)
+        async with self._admission:
+            ctx = contextvars.copy_context()
+            submitted = time.monotonic()
+            with self._lock:
+                self.stats["pending"] += 1
+
+            def call():
+                wait = time.monotonic() - submitted
+                with self._lock:
+                    self.stats["running"] += 1
+                    self.stats["queue_wait_total"] += wait
+                    self.stats["queue_wait_max"] = max(self.stats["queue_wait_max"], wait)
+                try:
+                    return ctx.run(fn, *args, **kwargs)
+                finally:
+                    with self._lock:
+                        self.stats["running"] -= 1
+
+            # completed 는 성공한 호출만, 예외/취소는 failed 로 집계
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(self._executor, call)
+            except BaseException:
+                with self._lock:
+                    self.stats["failed"] += 1
+                raise
+            else:
+                with self._lock:
+                    self.stats["completed"] += 1
+            finally:
+                with self._lock:
+                    self.stats["pending"] -= 1
+            return result
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        completed = stats["completed"]
+        finished = completed + stats["failed"]
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "running": stats["running"],
+            "queued": stats["pending"] - stats["running"],
+            "completed": completed,
+            "failed": stats["failed"],
+            "queue_wait_avg_ms": round(stats["queue_wait_total"] / finished * 1000, 1) if finished else 0.0,
+            "queue_wait_max_ms": round(stats["queue_wait_max"] * 1000, 1),
+        }
+
+
+class LoopLagMonitor:
+    """
+    이벤트 루프 지연 측정기 (FastAPI lifespan 에서 start/stop)
+    """
+
+    def __init__(self, interval: float = LAG_INTERVAL, window: int = LAG_WINDOW):
+        self.interval = interval
+        self.samples: deque = deque(maxlen=window)
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag > LAG_WARN:
+                print(f"🐢 [Event Loop] Blocked for {lag * 1000:.0f}ms", file=sys.stderr)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def metrics(self) -> Dict[str, Any]:
+        samples = sorted(self.samples)
+        if not samples:
+            return {"samples": 0}
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        return {
+            "samples": len(samples),
+            "last_ms": round(self.samples[-1] * 1000, 1),
+            "mean_ms": round(statistics.fmean(samples) * 1000, 1),
+            "p99_ms": round(p99 * 1000, 1),
+            "window_max_ms": round(samples[-1] * 1000, 1),
+            "max_ms": round(self.max_lag * 1000, 1),
+            "over_warn": sum(1 for lag in samples if lag > LAG_WARN),
+        }
+
+
+# 전역 인스턴스
+blocking_pool = BlockingPool()
+loop_monitor = LoopLagMonitor()
@@ -45,7 +45,8 @@ def generate_single_article(a_id, article):
                     layout_override=layout_override,
                     vision_json=vision_json,
                     design_json=design_json,
-                    plan_json=plan_json
+                    plan_json=plan_json,
+                    priority="batch"  # 대량 발행은 /analyze 요청이 남긴 LLM 용량만 사용
                 )
             )
             
@@ -0,0 +1,302 @@
+"""
+[HTML Analyzer Module]
+생성된 HTML 을 한 번만 순회하여 요소 트리와 요소별 Tailwind 유틸리티를 만드는 모듈입니다.
+
+validator_node 와 html_quality_checker_node 가 같은 분석 결과를 공유합니다.
+문자열 검색/정규식 대신 요소 단위로 클래스를 해석하므로
+`top-4` 안의 `p-4`, `min-h-[280px]` 안의 `h-[280px]` 처럼 잘못된 문맥의 매칭이 생기지 않습니다.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+
+VOID_TAGS = {"img", "br", "hr", "input", "meta", "link", "source", "area", "col", "embed", "wbr"}
+
+# 긴 prefix 부터 매칭 (min-h 가 h 보다 먼저)
+UTILITY_PREFIXES = sorted([
+    "p", "px", "py", "pt", "pb", "pl", "pr",
+    "m", "mx", "my", "mt", "mb", "ml", "mr",
+    "h", "w", "min-h", "max-h", "min-w", "max-w",
+    "gap", "gap-x", "gap-y", "columns", "text", "leading",
+    "top", "bottom", "left", "right", "inset",
+], key=len, reverse=True)
+
+# Tailwind 기본 글자 크기: (font-size px, line-height px)
+TEXT_SIZES = {
+    "xs": (12, 16), "sm": (14, 20), "base": (16, 24), "lg": (18, 28),
+    "xl": (20, 28), "2xl": (24, 32), "3xl": (30, 36), "4xl": (36, 40),
+    "5xl": (48, 48), "6xl": (60, 60), "7xl": (72, 72), "8xl": (96, 96), "9xl": (128, 128),
+}
+
+# leading-* 배율
+LEADING_RATIOS = {
+    "none": 1.0, "tight": 1.25, "snug": 1.375, "normal": 1.5, "relaxed": 1.625, "loose": 2.0,
+}
+
+PLACEHOLDER_PATTERN = re.compile(r'__IMAGE_(\d+)__')
+COMMENT_PATTERN = re.compile(r'<!--.*?-->', re.DOTALL)
+TAG_PATTERN = re.compile(r'<(/?)([a-zA-Z][a-zA-Z0-9-]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>')
+ATTR_PATTERN = re.compile(r'([^\s=/]+)(?:\s*=\s*("[^"]*"|\'[^\']*\'|[^\s>]+))?')
+ARBITRARY_PX = re.compile(r'^\[(-?\d+(?:\.\d+)?)px\]$')
+ARBITRARY_PERCENT = re.compile(r'^\[(\d+(?:\.\d+)?)%\]$')
+
+
+class Utility:
+    """
+    Tailwind 클래스 1개 해석 결과
+    예) "md:-mt-4" -> variants=["md"], negative=True, prefix="mt", value="4"
+    """
+    __slots__ = ("raw", "variants", "negative", "prefix", "value")
+
+    def __init__(self, raw: str):
+        self.raw = raw
+        *variants, name = raw.split(":")
+        self.variants = variants
+        self.negative = name.startswith("-")
+        name = name.lstrip("-")
+        self.prefix = name
+        self.value = None
+        for prefix in UTILITY_PREFIXES:
+            if name.startswith(prefix + "-"):
+                self.prefix = prefix
+                self.value = name[len(prefix) + 1:]
+                break
+
+    @property
+    def px(self) -> Optional[float]:
+        """간격/크기 값을 px 로 변환 (스케일 값은 1단위 = 4px)"""
+        if self.value is None:
+            return None
+        match = ARBITRARY_PX.match(self.value)
+        if match:
+            return float(match.group(1))
+        try:
+            return float(self.value) * 4
+        except ValueError:
+            return None
+
+    @property
+    def scale(self) -> Optional[float]:
+        """스케일 값 (p-4 -> 4). 임의 값이면 None"""
+        try:
+            return float(self.value)
+        except (TypeError, ValueError):
+            return None
+
+    @property
+    def percent(self) -> Optional[float]:
+        if self.value is None:
+            return None
+        if self.value == "full":
+            return 100.0
+        match = ARBITRARY_PERCENT.match(self.value)
+        if match:
+            return float(match.group(1))
+        if "/" in self.value:
+            num, _, den = self.value.partition("/")
+            try:
+                return float(num) / float(den) * 100
+            except (ValueError, ZeroDivisionError):
+                return None
+        return None
+
+
+class Element:
+    """HTML 요소 (태그, 속성, 해석된 유틸리티, 자식, 직접 포함한 텍스트)"""
+    __slots__ = ("tag", "attrs", "utilities", "children", "parent", "text")
+
+    def __init__(self, tag: str, attrs: Dict[str, str], parent: Optional["Element"]):
+        self.tag = tag
+        self.attrs = attrs
+        self.utilities = [parse_utility(c) for c in attrs.get("class", "").split()]
+        self.children: List["Element"] = []
+        self.parent = parent
+        self.text = ""
+
+    def has(self, raw_class: str) -> bool:
+        return any(u.raw == raw_class for u in self.utilities)
+
+    def get(self, prefix: str) -> Optional[Utility]:
+        """해당 prefix 의 (variant 없는) 마지막 유틸리티"""
+        found = None
+        for u in self.utilities:
+            if u.prefix == prefix and not u.variants:
+                found = u
+        return found
+
+    def inherited(self, prefix: str, accept=None) -> Optional[Utility]:
+        """자신 또는 가장 가까운 조상의 유틸리티 (text-*, leading-* 상속 계산용)"""
+        node = self
+        while node is not None:
+            for u in reversed(node.utilities):
+                if u.prefix == prefix and not u.variants and (accept is None or accept(u)):
+                    return u
+            node = node.parent
+        return None
+
+    def iter(self):
+        yield self
+        for child in self.children:
+            yield from child.iter()
+
+
+def is_text_size(u: Utility) -> bool:
+    """text-* 중 글자 크기 유틸리티만 (색상 text-red-600, 정렬 text-center 제외)"""
+    return u.value in TEXT_SIZES or bool(ARBITRARY_PX.match(u.value or ""))
+
+
+@lru_cache(maxsize=4096)
+def parse_utility(raw: str) -> Utility:
+    """같은 클래스 문자열은 한 번만 해석 (생성 HTML 은 클래스 반복이 많음)"""
+    return Utility(raw)
+
+
+def _parse_attrs(attr_text: str) -> Dict[str, str]:
+    attrs = {}
+    for name, value in ATTR_PATTERN.findall(attr_text):
+        if value[:1] in ('"', "'"):
+            value = value[1:-1]
+        attrs[name.lower()] = value
+    return attrs
+
+
+def build_tree(html: str) -> Tuple[Element, List[Element]]:
+    """
+    태그 정규식 한 번의 순회로 요소 트리 생성
+    닫히지 않은 태그가 있어도 가장 가까운 같은 태그까지 정리합니다.
+    """
+    html = COMMENT_PATTERN.sub("", html)
+    root = Element("#root", {}, None)
+    stack = [root]
+    elements: List[Element] = []
+    last_end = 0
+
+    for match in TAG_PATTERN.finditer(html):
+        if match.start() > last_end:
+            stack[-1].text += html[last_end:match.start()]
+        last_end = match.end()
+
+        closing, tag, attr_text = match.groups()
+        tag = tag.lower()
+        if closing:
+            for i in range(len(stack) - 1, 0, -1):
+                if stack[i].tag == tag:
+                    del stack[i:]
+                    break
+            continue
+
+        element = Element(tag, _parse_attrs(attr_text), stack[-1])
+        stack[-1].children.append(element)
+        elements.append(element)
+        # <img>, <br> 등 void 요소와 <div ... /> 처럼 스스로 닫힌 요소는 push 하지 않음
+        if tag not in VOID_TAGS and not attr_text.rstrip().endswith("/"):
+            stack.append(element)
+
+    if last_end < len(html):
+        stack[-1].text += html[last_end:]
+    return root, elements
+
+
+class HTMLAnalysis:
+    """
+    한 번의 파싱 결과와 두 노드가 묻는 질문에 대한 답
+    """
+
+    def __init__(self, html: str):
+        self.root, self.elements = build_tree(html or "")
+        self.images = [e for e in self.elements if e.tag == "img"]
+
+        # 속성/텍스트 어디든 등장한 플레이스홀더 (style 의 url(__IMAGE_0__) 포함)
+        mentions = PLACEHOLDER_PATTERN.findall(html or "")
+        self.placeholders = {int(i) for i in mentions}
+        self.placeholder_mentions = len(mentions)
+
+        # 요소 순회 1회로 유틸리티 색인 생성
+        self._utility_values: Dict[str, List[Utility]] = {}
+        self._raw_classes = set()
+        self.absolute_count = 0
+        for element in self.elements:
+            for u in element.utilities:
+                self._raw_classes.add(u.raw)
+                if not u.variants:
+                    self._utility_values.setdefault(u.prefix, []).append(u)
+                    if u.raw == "absolute":
+                        self.absolute_count += 1
+
+    # ============ Validator 질문 ============
+    def missing_placeholders(self, image_count: int) -> List[int]:
+        return [i for i in range(image_count) if i not in self.placeholders]
+
+    def has_bottom_padding(self, min_scale: float = 8) -> bool:
+        """pb-N / py-N (N >= min_scale) 가 있는지"""
+        return any(
+            (u.scale or 0) >= min_scale or (u.px or 0) >= min_scale * 4
+            for prefix in ("pb", "py")
+            for u in self.utilities(prefix)
+        )
+
+    # ============ Quality Checker 질문 ============
+    def utilities(self, prefix: str) -> List[Utility]:
+        return self._utility_values.get(prefix, [])
+
+    def scales(self, prefix: str) -> List[int]:
+        """p-4 -> 4 처럼 스케일 값 목록 (임의 값 제외)"""
+        return [int(u.scale) for u in self.utilities(prefix) if u.scale is not None]
+
+    def image_heights(self) -> List[int]:
+        """<img> 요소별 픽셀 높이 (h-[Npx], 없으면 min-h-[Npx])"""
+        heights = []
+        for img in self.images:
+            u = img.get("h") or img.get("min-h")
+            if u is not None and u.value and u.value.startswith("["):
+                px = u.px
+                if px is not None:
+                    heights.append(int(px))
+        return heights
+
+    def uses(self, *raw_classes: str) -> bool:
+        """클래스가 실제 class 속성에 쓰였는지 (텍스트 내용은 제외)"""
+        return any(c in self._raw_classes for c in raw_classes)
+
+    def column_count(self) -> int:
+        counts = [int(u.scale) for u in self.utilities("columns") if u.scale is not None]
+        return max(counts) if counts else 1
+
+    def main_text_element(self) -> Optional[Element]:
+        """본문으로 추정되는 요소 (직접 텍스트가 가장 긴 요소)"""
+        candidates = [e for e in self.elements if e.tag not in ("script", "style")]
+        if not candidates:
+            return None
+        best = max(candidates, key=lambda e: len(e.text.strip()))
+        return best if best.text.strip() else None
+
+    def body_text_metrics(self) -> Tuple[float, float]:
+        """
+        본문 요소의 (font-size px, line-height px)
+        text-*/leading-* 는 조상에서 상속됩니다.
+        """
+        element = self.main_text_element()
+        size_u = element.inherited("text", is_text_size) if element else None
+        if size_u is None:
+            font_px, line_px = TEXT_SIZES["base"]
+        elif size_u.value in TEXT_SIZES:
+            font_px, line_px = TEXT_SIZES[size_u.value]
+        else:
+            font_px = size_u.px
+            line_px = font_px * 1.5
+
+        leading_u = element.inherited("leading") if element else None
+        if leading_u is not None:
+            if leading_u.value in LEADING_RATIOS:
+                line_px = font_px * LEADING_RATIOS[leading_u.value]
+            elif leading_u.px is not None:
+                line_px = leading_u.px
+        return float(font_px), float(line_px)
+
+
+@lru_cache(maxsize=16)
+def analyze_html(html: str) -> HTMLAnalysis:
+    """HTML 분석 (같은 HTML 은 validator / quality checker 사이에서 재사용)"""
+    return HTMLAnalysis(html)
@@ -0,0 +1,243 @@
+"""
+[Image Pool Module]
+Pillow 이미지 작업(헤더 확인, 디코딩, LANCZOS 리사이징, 특징 계산, 인코딩)을 실행하는 전용 작업 풀입니다.
+
+요청 처리 코루틴이나 blocking_pool(네트워크/sqlite 대기용)과 분리해, 이미지 작업이 CPU 코어 수만큼 병렬로 돌고
+이벤트 루프나 다른 대기 작업을 막지 않도록 합니다.
+
+- AURA_IMAGE_POOL=thread  (기본) Pillow 는 디코딩/리사이징/인코딩 중 GIL 을 놓으므로 스레드로도 코어를 나눠 씀
+                                  bytes 복사가 없어 업로드가 큰 경우 유리
+- AURA_IMAGE_POOL=process 특징 계산 등 GIL 을 잡는 부분까지 완전히 병렬 (작업 인자/결과는 pickle 로 복사)
+- 작업자 수 AURA_IMAGE_WORKERS (기본 CPU 코어 수), 실행 중 + 대기 작업 수 AURA_IMAGE_PENDING 으로 제한
+  (대기열이 차면 호출 측 코루틴이 기다림)
+
+작업 함수는 process 모드에서도 실행되도록 이 모듈의 최상위 함수로 두고 bytes 또는 SourceImage 를 주고받습니다
+(spool 된 업로드의 SourceImage 는 파일 경로만 pickle 되므로 원본 bytes 를 복사하지 않음).
+
+사용:
+    sources = await image_pool.run(open_uploads, uploads)
+    asset = await image_pool.run(render_asset, source, max_height)
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+import multiprocessing
+
+
+IMAGE_POOL_MODE = os.getenv("AURA_IMAGE_POOL", "thread")
+IMAGE_WORKERS = int(os.getenv("AURA_IMAGE_WORKERS", str(os.cpu_count() or 4)))
+IMAGE_PENDING = int(os.getenv("AURA_IMAGE_PENDING", str(IMAGE_WORKERS * 4)))
+
+SLOT_MAX_WIDTH = 400   # aura_render_page 이미지 슬롯 최대 너비
+
+
+# ============ 작업 함수 ============
+def open_uploads(uploads: List[Dict[str, Any]]) -> list:
+    """
+    작업 큐 업로드 [{"filename", "asset_hash", "data"}, ...] → SourceImage 목록 (헤더만 확인, 픽셀 디코딩 없음)
+    upload_store 에 spool 된 원본은 경로만 가진 SourceImage (필요할 때 파일에서 읽음), 예전 작업은 원본 bytes
+    이미지가 아니거나 원본이 없으면 건너뜀
+    """
+    from image_validator import SourceImage
+    from asset_store import upload_store
+
+    sources = []
+    for upload in uploads:
+        filename, asset_hash = upload["filename"], upload.get("asset_hash")
+        try:
+            if asset_hash:
+                path = upload_store.path(asset_hash)
+                if path is None:
+                    raise FileNotFoundError(f"upload {asset_hash[:12]} is no longer stored")
+                image = SourceImage(filename=filename, path=path, digest=asset_hash)
+            else:
+                image = SourceImage(upload["data"], filename)
+            sources.append(image)
+            print(f"✅ Loaded image: {filename} ({image.format} {image.size[0]}x{image.size[1]}, {image.nbytes / 1024:.0f}KB)")
+        except Exception as e:
+            print(f"⚠️ Error loading image {filename}: {e}")
+    return sources
+
+
+def render_asset(source: Union[Any, bytes], max_height: int, index: int = 0) -> Dict[str, Any]:
+    """
+    렌더링용 이미지 1장: 슬롯 크기로 축소 → asset_store 저장
+    source 는 SourceImage (spool 된 업로드는 경로만 전달되고 작업자가 파일에서 읽음) 또는 원본 bytes
+    (process 모드에서 결과 bytes 를 다시 보내지 않도록 저장까지 작업자에서 처리)
+
+    Returns:
+        {"src": /assets URL, "features": dict | None, "cpu_ms": float, "input_bytes": int, "output_bytes": int}
+    """
+    from image_validator import image_validator, SourceImage
+    from asset_store import asset_store
+
+    started = time.thread_time()
+    output, features = None, None
+    input_bytes = source.nbytes if isinstance(source, SourceImage) else len(source)
+    try:
+        if not isinstance(source, SourceImage):
+            source = SourceImage(source)
+        orig_width, orig_height = source.size  # 헤더만 읽음
+
+        aspect_ratio = orig_width / orig_height
+        slot_height = max_height
+        slot_width = int(slot_height * aspect_ratio)
+
+        if slot_width > SLOT_MAX_WIDTH:
+            slot_width = SLOT_MAX_WIDTH
+            slot_height = int(slot_width / aspect_ratio)
+
+        print(f"  📐 [Image {index}] Original: {orig_width}x{orig_height} {source.format}, Slot: {slot_width}x{slot_height}")
+
+        result = image_validator.prepare_for_layout(
+            source,
+            layout_type="magazine_full",
+            slot_info={
+                "width": slot_width,
+                "height": slot_height,
+                "fit_mode": "contain"
+            },
+            as_data_uri=False,
+            output_format=source.output_format()
+        )
+
+        if result["success"]:
+            output = result["image_bytes"]
+        else:
+            print(f"  ⚠️ [Image {index}] Validation failed, using original")
+        features = result.get("features")
+    except Exception as e:
+        print(f"  ⚠️ [Image {index}] Error during validation: {e}")
+
+    if output is None:
+        # 원본 그대로 공개 저장소에 복사 (업로드 저장소는 /assets 로 제공하지 않음)
+        src = asset_store.put_url(source.data if isinstance(source, SourceImage) else source)
+        output_bytes = input_bytes
+    else:
+        src = asset_store.put_url(output)
+        output_bytes = len(output)
+
+    return {
+        "src": src,
+        "features": features,
+        "cpu_ms": (time.thread_time() - started) * 1000,
+        "input_bytes": input_bytes,
+        "output_bytes": output_bytes,
+    }
+
+
+# ============ 작업 풀 ============
+class ImagePool:
+    """
+    이미지 작업 전용 bounded executor (thread / process)
+    """
+
+    def __init__(self, mode: str = IMAGE_POOL_MODE, workers: int = IMAGE_WORKERS, max_pending: int = IMAGE_PENDING):
+        self.mode = mode if mode in ("thread", "process") else "thread"
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[Executor] = None
+        self._admission: Optional[asyncio.Semaphore] = None
+        self._sync_admission = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.stats = {"in_flight": 0, "completed": 0, "failed": 0, "admission_wait_total": 0.0,
+                      "admission_wait_max": 0.0, "task_total": 0.0}
+
+    @property
+    def executor(self) -> Executor:
+        # 첫 사용 시 생성 (import 만으로 프로세스를 띄우지 않도록)
+        with self._lock:
+            if self._executor is None:
+                if self.mode == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                         mp_context=multiprocessing.get_context("spawn"))
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="aura-image")
+            return self._executor
+
+    def _record(self, waited: float, started: float, failed: bool):
+        with self._lock:
+            self.stats["in_flight"] -= 1
+            self.stats["completed"] += int(not failed)
+            self.stats["failed"] += int(failed)
+            self.stats["admission_wait_total"] += waited
+            self.stats["admission_wait_max"] = max(self.stats["admission_wait_max"], waited)
+            self.stats["task_total"] += time.monotonic() - started
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """이미지 작업 1건 (대기열이 차면 자리가 날 때까지 기다림)"""
+        if self._admission is None:
+            self._admission = asyncio.Semaphore(self.max_pending)
+        queued = time.monotonic()
+        async with self._admission:
+            started = time.monotonic()
+            with self._lock:
+                self.stats["in_flight"] += 1
+            failed = False
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                self._record(started - queued, started, failed)
+
+    async def map(self, fn: Callable[..., Any], items: Iterable[Union[tuple, Any]]) -> List[Any]:
+        """items 의 각 인자 튜플로 fn 을 병렬 실행, 입력 순서대로 결과 반환"""
+        return list(await asyncio.gather(*(
+            self.run(fn, *(item if isinstance(item, tuple) else (item,))) for item in items
+        )))
+
+    def map_sync(self, fn: Callable[..., Any], items: Iterable[Union[tuple, Any]]) -> List[Any]:
+        """
+        동기 호출 측(ImageValidator.batch_prepare 등)용 map
+        풀 작업자 안에서 호출하면 자기 자신을 기다릴 수 있으므로 작업 함수 안에서는 사용하지 않음
+        """
+        futures = []
+        for item in items:
+            queued = time.monotonic()
+            self._sync_admission.acquire()
+            started = time.monotonic()
+            with self._lock:
+                self.stats["in_flight"] += 1
+            future = self.executor.submit(fn, *(item if isinstance(item, tuple) else (item,)))
+
+            def done(f, waited=started - queued, started=started):
+                self._sync_admission.release()
+                self._record(waited, started, f.exception() is not None)
+
+            future.add_done_callback(done)
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        completed = stats["completed"]
+        finished = completed + stats["failed"]
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "in_flight": stats["in_flight"],
+            "completed": completed,
+            "failed": stats["failed"],
+            "admission_wait_avg_ms": round(stats["admission_wait_total"] / finished * 1000, 1) if finished else 0.0,
+            "admission_wait_max_ms": round(stats["admission_wait_max"] * 1000, 1),
+            "task_avg_ms": round(stats["task_total"] / finished * 1000, 1) if finished else 0.0,
+        }
+
+
+# 전역 인스턴스
+image_pool = ImagePool()
@@ -6,13 +6,80 @@
 1. 이미지 비율 검사 및 조정
 2. 레이아웃 슬롯에 맞게 이미지 리사이징/크롭
 3. 이미지 품질 검증
+4. 레이아웃 배치용 특징(크기/비율/선명도/시선 집중도) 계산 및 HERO 이미지 선정
+5. SourceImage: 업로드 원본 bytes 를 그대로 보관하고 필요할 때만 디코딩
 """
 
-from PIL import Image
+from PIL import Image, ImageChops, ImageFilter, ImageStat
+import hashlib
 import io
+import math
+import os
 import base64
 from typing import Tuple, Optional, Dict, Any, List, Union
 
+
+class SourceImage:
+    """
+    업로드 원본 이미지 (원본 bytes 또는 spool 된 파일 경로만 보관, 디코딩은 필요할 때)
+
+    - 생성 시 헤더만 읽어 형식/크기 확인 (픽셀 디코딩 없음, 이미지가 아니면 예외)
+    - Gemini 에는 원본 bytes 를 그대로 전달 (PIL 디코딩/재인코딩 없음)
+    - 픽셀이 필요한 리사이징/특징 계산은 image 속성으로 디코딩 (캐시하지 않음)
+    - 파일 기반(path)이면 data 도 읽을 때마다 파일에서 가져옴 (요청 동안 메모리에 두지 않음)
+    """
+
+    # Gemini 가 inline data 로 받는 형식 (그 외 형식은 PIL 이미지로 전달)
+    GEMINI_FORMATS = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+
+    def __init__(self, data: Optional[bytes] = None, filename: Optional[str] = None,
+                 path: Optional[str] = None, digest: Optional[str] = None):
+        if data is None and path is None:
+            raise ValueError("SourceImage needs data or path")
+        self._data = data
+        self.path = path
+        self.filename = filename
+        self._digest = digest
+        with Image.open(io.BytesIO(data) if data is not None else path) as probe:
+            self.format = probe.format
+            self.size = probe.size
+        self.nbytes = len(data) if data is not None else os.path.getsize(path)
+
+    @property
+    def data(self) -> bytes:
+        if self._data is not None:
+            return self._data
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    @property
+    def digest(self) -> str:
+        """원본 sha256 (upload_store 해시와 같음)"""
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.data).hexdigest()
+        return self._digest
+
+    @property
+    def mime_type(self) -> Optional[str]:
+        return Image.MIME.get(self.format or "")
+
+    @property
+    def image(self) -> Image.Image:
+        image = Image.open(io.BytesIO(self._data) if self._data is not None else self.path)
+        image.load()
+        return image
+
+    def gemini_part(self) -> Union[Dict[str, Any], Image.Image]:
+        """generate_content 입력: 지원 형식이면 원본 bytes blob"""
+        mime_type = self.GEMINI_FORMATS.get(self.format or "")
+        if mime_type:
+            return {"mime_type": mime_type, "data": self.data}
+        return self.image
+
+    def output_format(self) -> str:
+        """리사이징 결과 저장 형식: PNG 원본은 PNG (그래픽/투명도), 그 외는 JPEG"""
+        return "PNG" if self.format == "PNG" else "JPEG"
+
 class ImageValidator:
     """
     이미지 검수 및 처리 클래스
@@ -35,6 +102,15 @@ class ImageValidator:
     MAX_WIDTH = 4000
     MAX_HEIGHT = 4000
     
+    # 특징 계산용 축소 크기 (원본 해상도와 무관하게 일정한 비용)
+    FEATURE_SIZE = 256
+    
+    # HERO 점수 가중치
+    HERO_WEIGHTS = {"saliency": 0.35, "sharpness": 0.25, "size": 0.2, "aspect_fit": 0.2}
+    
+    # 페이지 유형별 HERO 슬롯 목표 비율 (가로/세로)
+    HERO_TARGET_ASPECT = {"COVER": 210 / 297, "ARTICLE": 3 / 4}
+    
     def __init__(self, default_quality: int = 95):
         """
         Args:
@@ -87,6 +163,90 @@ class ImageValidator:
         
         return result
     
+    def compute_features(self, image: Image.Image) -> Dict[str, Any]:
+        """
+        배치 결정용 이미지 특징 계산 (FEATURE_SIZE 썸네일 기준)
+        
+        Returns:
+            {
+                "width", "height", "aspect_ratio", "orientation",
+                "sharpness": Laplacian 분산 (클수록 선명),
+                "saliency": 중앙 영역 국소 대비 + 색채도 (클수록 시선이 모임)
+            }
+        """
+        width, height = image.size
+        thumb = image.convert("RGB")
+        thumb.thumbnail((self.FEATURE_SIZE, self.FEATURE_SIZE))
+        gray = thumb.convert("L")
+        
+        # 선명도: Laplacian 응답의 분산
+        laplacian = gray.filter(ImageFilter.Kernel((3, 3), [0, 1, 0, 1, -4, 1, 0, 1, 0], scale=1, offset=128))
+        sharpness = ImageStat.Stat(laplacian).var[0]
+        
+        # 시선 집중도: 흐린 이미지와의 차이(국소 대비)를 중앙 영역에서 측정
+        local_contrast = ImageChops.difference(gray, gray.filter(ImageFilter.GaussianBlur(radius=8)))
+        w, h = local_contrast.size
+        center = local_contrast.crop((w // 4, h // 4, w - w // 4, h - h // 4))
+        center_contrast = ImageStat.Stat(center).mean[0]
+        
+        # 색채도 (Hasler & Süsstrunk, 채널 차의 절댓값 근사)
+        r, g, b = thumb.split()
+        rg = ImageStat.Stat(ImageChops.difference(r, g))
+        yb = ImageStat.Stat(ImageChops.difference(ImageChops.add(r, g, scale=2), b))
+        colorfulness = (math.hypot(rg.stddev[0], yb.stddev[0])
+                        + 0.3 * math.hypot(rg.mean[0], yb.mean[0]))
+        
+        return {
+            "width": width,
+            "height": height,
+            "aspect_ratio": round(width / height, 3),
+            "orientation": self._get_orientation(width, height),
+            "sharpness": round(sharpness, 2),
+            "saliency": round(center_contrast + 0.25 * colorfulness, 2),
+        }
+    
+    def rank_images(self, features: List[Optional[Dict[str, Any]]], page_type: str = "ARTICLE") -> Dict[str, Any]:
+        """
+        특징으로 HERO 이미지와 배치 순서 결정 (LLM 없음)
+        특징은 페이지 안에서 0~1 로 정규화하여 비교합니다. 특징이 없는 이미지는 중간값(0.5)으로 취급.
+        
+        Returns:
+            {"hero_image_index": int, "image_order": [int, ...], "scores": [float, ...]}
+        """
+        count = len(features)
+        if count == 0:
+            return {"hero_image_index": 0, "image_order": [], "scores": []}
+        
+        def normalized(values: List[Optional[float]]) -> List[float]:
+            known = [v for v in values if v is not None]
+            if not known or max(known) == min(known):
+                return [0.5 if v is None else 1.0 for v in values]
+            low, high = min(known), max(known)
+            return [0.5 if v is None else (v - low) / (high - low) for v in values]
+        
+        target = self.HERO_TARGET_ASPECT.get((page_type or "").upper(), self.HERO_TARGET_ASPECT["ARTICLE"])
+        saliency = normalized([f["saliency"] if f else None for f in features])
+        sharpness = normalized([math.log1p(f["sharpness"]) if f else None for f in features])
+        size = normalized([math.log(f["width"] * f["height"]) if f else None for f in features])
+        aspect_fit = [
+            max(0.0, 1 - abs(math.log(f["aspect_ratio"] / target))) if f else 0.5
+            for f in features
+        ]
+        
+        weights = self.HERO_WEIGHTS
+        scores = []
+        for i, f in enumerate(features):
+            score = (weights["saliency"] * saliency[i] + weights["sharpness"] * sharpness[i]
+                     + weights["size"] * size[i] + weights["aspect_fit"] * aspect_fit[i])
+            # 저해상도 이미지는 크게 배치하면 깨져 보임
+            if f and min(f["width"], f["height"]) < self.MIN_WIDTH:
+                score *= 0.7
+            scores.append(round(score, 3))
+        
+        # 동점이면 업로드 순서 유지
+        order = sorted(range(count), key=lambda i: (-scores[i], i))
+        return {"hero_image_index": order[0], "image_order": order, "scores": scores}
+    
     def _get_orientation(self, width: int, height: int) -> str:
         """이미지 방향 감지"""
         if width > height * 1.1:
@@ -239,30 +399,38 @@ class ImageValidator:
         self, 
         image: Union[Image.Image, str, bytes],
         layout_type: str = "magazine_full",
-        slot_info: Optional[Dict] = None
+        slot_info: Optional[Dict] = None,
+        as_data_uri: bool = True,
+        output_format: str = "PNG"
     ) -> Dict[str, Any]:
         """
         레이아웃용 이미지 준비 (메인 API)
         
         Args:
-            image: PIL Image, Base64 문자열, 또는 bytes
+            image: PIL Image, SourceImage, Base64 문자열, 또는 bytes
             layout_type: 레이아웃 타입 (portrait, landscape, square, magazine_full 등)
             slot_info: 슬롯 정보 딕셔너리 {"width": px, "height": px, "position": str}
+            as_data_uri: False 면 base64 변환을 생략 (image_bytes 만 사용하는 경우, 예: asset_store 저장)
+            output_format: 결과 인코딩 형식 ("PNG" 또는 "JPEG", SourceImage.output_format() 참고)
             
         Returns:
             {
                 "success": bool,
                 "processed_image": PIL Image,
-                "base64": str (data URI),
+                "image_bytes": bytes (인코딩된 이미지),
+                "base64": str (data URI, as_data_uri=False 면 None),
                 "validation": dict,
+                "features": dict (compute_features 결과),
                 "adjustments": list of str
             }
         """
         result = {
             "success": False,
             "processed_image": None,
+            "image_bytes": None,
             "base64": None,
             "validation": None,
+            "features": None,
             "adjustments": []
         }
         
@@ -279,6 +447,8 @@ class ImageValidator:
                 img = Image.open(io.BytesIO(image_bytes))
             elif isinstance(image, bytes):
                 img = Image.open(io.BytesIO(image))
+            elif isinstance(image, SourceImage):
+                img = image.image
             else:
                 img = image
             
@@ -297,6 +467,13 @@ class ImageValidator:
             validation = self.validate_image(img)
             result["validation"] = validation
             
+            # 배치 결정용 특징 (리사이징 전 원본 기준)
+            try:
+                result["features"] = self.compute_features(img)
+            except Exception as e:
+                result["features"] = None
+                result["adjustments"].append(f"특징 계산 실패: {e}")
+            
             # 슬롯 정보가 있는 경우 해당 크기에 맞게 조정
             if slot_info:
                 slot_width = slot_info.get("width", 800)
@@ -333,11 +510,18 @@ class ImageValidator:
             result["processed_image"] = processed
             result["success"] = True
             
-            # Base64 변환
             buffered = io.BytesIO()
-            processed.save(buffered, format="PNG", quality=self.default_quality)
-            base64_str = base64.b64encode(buffered.getvalue()).decode()
-            result["base64"] = f"data:image/png;base64,{base64_str}"
+            if output_format == "JPEG":
+                processed.save(buffered, format="JPEG", quality=self.default_quality, optimize=True)
+            else:
+                processed.save(buffered, format="PNG")
+            result["image_bytes"] = buffered.getvalue()
+            
+            # Base64 변환
+            if as_data_uri:
+                base64_str = base64.b64encode(result["image_bytes"]).decode()
+                mime_type = "image/jpeg" if output_format == "JPEG" else "image/png"
+                result["base64"] = f"data:{mime_type};base64,{base64_str}"
             
         except Exception as e:
             result["success"] = False
@@ -360,16 +544,15 @@ class ImageValidator:
             slot_infos: 각 이미지별 슬롯 정보 (None이면 동일 적용)
             
         Returns:
-            처리 결과 리스트
+            처리 결과 리스트 (입력 순서)
         """
-        results = []
-        
-        for i, img in enumerate(images):
-            slot_info = slot_infos[i] if slot_infos and i < len(slot_infos) else None
-            result = self.prepare_for_layout(img, layout_type, slot_info)
-            results.append(result)
+        from image_pool import image_pool
         
-        return results
+        # 이미지별 처리는 서로 독립이므로 image_pool 에서 병렬로
+        return image_pool.map_sync(self.prepare_for_layout, [
+            (img, layout_type, slot_infos[i] if slot_infos and i < len(slot_infos) else None)
+            for i, img in enumerate(images)
+        ])
     
     def get_optimal_css(
         self, 
@@ -0,0 +1,359 @@
+"""
+[Job Queue Module]
+/jobs API 의 분석 작업을 저장하는 sqlite 기반 작업 큐입니다.
+
+웹 서버(POST /jobs)는 업로드 원본과 pages_data 를 저장만 하고 바로 응답하며,
+job_worker.py 의 작업 프로세스들이 큐에서 작업을 가져가 처리합니다.
+클라이언트가 연결을 끊어도 작업은 계속되고, GET /jobs/{id} 로 진행 상황과 완료된 페이지 결과를 조회합니다.
+
+1. jobs       : 작업 상태 (queued → running → done / failed), 소유 사용자, 요청 내용
+2. job_pages  : 페이지별 진행 단계와 결과 (완료되는 즉시 저장되므로 부분 결과 조회 가능)
+3. job_files  : 업로드 원본 참조 (upload_store 해시, 작업이 끝나면 삭제 / 예전 작업은 원본 BLOB)
+
+작업 프로세스는 작업을 가져갈 때 lease 를 받고 HEARTBEAT_INTERVAL 마다 연장합니다.
+프로세스가 비정상 종료해 lease 가 만료되면 다른 작업자가 이어받고, 이미 끝난 페이지는 다시 처리하지 않습니다.
+(MAX_ATTEMPTS 번 실패하면 failed)
+
+상태 확인:
+    python job_queue.py [--json]
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+DB_PATH = os.getenv("AURA_JOB_DB", "./.jobs.db")
+
+LEASE_TTL = 120.0             # 초: heartbeat 없이 작업을 보유할 수 있는 시간
+HEARTBEAT_INTERVAL = 15.0     # 초: 작업자가 lease 를 연장하는 간격
+MAX_ATTEMPTS = 2              # 작업자 비정상 종료 시 재시도 포함 최대 실행 횟수
+JOB_RETENTION = 24 * 3600.0   # 초: 끝난 작업 보관 기간
+
+ASSET_URL_PATTERN = re.compile(r"/assets/([0-9a-f]{64})")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    username TEXT NOT NULL,
+    status TEXT NOT NULL,
+    pages_data TEXT NOT NULL,
+    issue_mode INTEGER NOT NULL DEFAULT 0,
+    issue_title TEXT NOT NULL DEFAULT '',
+    stage TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_pid INTEGER,
+    lease_expires REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_pages (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    page_id TEXT,
+    stage TEXT NOT NULL DEFAULT 'queued',
+    result TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE TABLE IF NOT EXISTS job_files (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    filename TEXT,
+    data BLOB NOT NULL,
+    asset_hash TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+"""
+
+# 이전 버전 db 에 추가된 컬럼
+MIGRATIONS = [
+    "ALTER TABLE job_files ADD COLUMN asset_hash TEXT",
+]
+
+
+class JobStore:
+    """
+    프로세스 간 공유되는 분석 작업 큐
+    """
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        self._initialized = False
+
+    # ============ 저장소 ============
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            for statement in MIGRATIONS:
+                try:
+                    conn.execute(statement)
+                except sqlite3.OperationalError:
+                    pass  # 이미 있는 컬럼
+            self._initialized = True
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # ============ 웹 서버 측 ============
+    def enqueue(self, username: str, pages_info: List[Dict[str, Any]], files: List[Tuple[str, str]],
+                issue_mode: bool = False, issue_title: str = "") -> str:
+        """
+        작업 등록 후 job id 반환
+        files: 업로드 순서대로 (filename, upload_store 해시)
+               원본은 upload_store 에 그대로 두고 해시만 저장 (작업이 남아 있는 동안 prune 되지 않음)
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._purge(conn, now)
+            conn.execute(
+                "INSERT INTO jobs (id, username, status, pages_data, issue_mode, issue_title, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, username, QUEUED, json.dumps(pages_info, ensure_ascii=False), int(issue_mode),
+                 issue_title, now),
+            )
+            conn.executemany(
+                "INSERT INTO job_pages (job_id, idx, page_id) VALUES (?, ?, ?)",
+                [(job_id, i, str(page.get('id'))) for i, page in enumerate(pages_info)],
+            )
+            conn.executemany(
+                "INSERT INTO job_files (job_id, idx, filename, data, asset_hash) VALUES (?, ?, ?, ?, ?)",
+                [(job_id, i, filename, b"", asset_hash) for i, (filename, asset_hash) in enumerate(files)],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        print(f"📥 [Jobs] Queued {job_id} ({len(pages_info)} pages, {len(files)} files) for {username}",
+              file=sys.stderr)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """작업 상태와 페이지별 진행 단계/결과 (완료되지 않은 페이지의 result 는 None)"""
+        conn = self._connect()
+        try:
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            pages = conn.execute(
+                "SELECT idx, page_id, stage, result FROM job_pages WHERE job_id = ? ORDER BY idx", (job_id,)
+            ).fetchall()
+            queued_ahead = 0
+            if job["status"] == QUEUED:
+                queued_ahead = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at < ?", (QUEUED, job["created_at"])
+                ).fetchone()[0]
+        finally:
+            conn.close()
+        results = [json.loads(p["result"]) if p["result"] else None for p in pages]
+        return {
+            "job_id": job["id"],
+            "username": job["username"],
+            "status": job["status"],
+            "stage": job["stage"],
+            "error": job["error"],
+            "queued_ahead": queued_ahead,
+            "attempts": job["attempts"],
+            "created_at": job["created_at"],
+            "started_at": job["started_at"],
+            "finished_at": job["finished_at"],
+            "pages": len(pages),
+            "completed": sum(1 for r in results if r is not None),
+            "progress": [{"index": p["idx"], "page_id": p["page_id"], "stage": p["stage"]} for p in pages],
+            "results": results,
+        }
+
+    # ============ 작업자 측 ============
+    def claim(self, pid: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        가장 오래된 대기 작업 (또는 lease 가 만료된 실행 중 작업)을 가져옴
+        Returns: {"job_id", "username", "pages_info", "issue_mode", "issue_title", "done": {idx: result}} 또는 None
+        """
+        pid = pid or os.getpid()
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # 재시도 횟수를 다 쓴 작업자 중단 작업은 실패 처리
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, "worker stopped responding", now, RUNNING, now, MAX_ATTEMPTS),
+            )
+            job = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? OR (status = ? AND lease_expires < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (QUEUED, RUNNING, now),
+            ).fetchone()
+            if job is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, worker_pid = ?, lease_expires = ?, "
+                "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                (RUNNING, pid, now + LEASE_TTL, now, job["id"]),
+            )
+            done = {
+                row["idx"]: json.loads(row["result"])
+                for row in conn.execute(
+                    "SELECT idx, result FROM job_pages WHERE job_id = ? AND result IS NOT NULL", (job["id"],)
+                )
+            }
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        if job["status"] == RUNNING:
+            print(f"♻️  [Jobs] Reclaimed {job['id']} from worker {job['worker_pid']} "
+                  f"({len(done)} pages already done)", file=sys.stderr)
+        return {
+            "job_id": job["id"],
+            "username": job["username"],
+            "pages_info": json.loads(job["pages_data"]),
+            "issue_mode": bool(job["issue_mode"]),
+            "issue_title": job["issue_title"],
+            "done": done,
+        }
+
+    def files(self, job_id: str) -> List[Dict[str, Any]]:
+        """업로드 순서대로 {"filename", "asset_hash", "data"} (data 는 해시 없이 원본을 저장한 예전 작업만)"""
+        conn = self._connect()
+        try:
+            return [
+                {"filename": row["filename"], "asset_hash": row["asset_hash"],
+                 "data": None if row["asset_hash"] else bytes(row["data"])}
+                for row in conn.execute(
+                    "SELECT filename, data, asset_hash FROM job_files WHERE job_id = ? ORDER BY idx", (job_id,)
+                )
+            ]
+        finally:
+            conn.close()
+
+    def heartbeat(self, job_id: str, pid: Optional[int] = None) -> bool:
+        """lease 연장. 다른 작업자가 이미 이어받았으면 False"""
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND status = ? AND worker_pid = ?",
+                (time.time() + LEASE_TTL, job_id, RUNNING, pid or os.getpid()),
+            )
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def set_stage(self, job_id: str, stage: str, index: Optional[int] = None):
+        """페이지 진행 단계 (index 가 없으면 작업 전체 단계: issue_vision / issue_style)"""
+        conn = self._connect()
+        try:
+            if index is None:
+                conn.execute("UPDATE jobs SET stage = ? WHERE id = ?", (stage, job_id))
+            else:
+                conn.execute("UPDATE job_pages SET stage = ? WHERE job_id = ? AND idx = ?", (stage, job_id, index))
+        finally:
+            conn.close()
+
+    def set_result(self, job_id: str, index: int, result: Dict[str, Any]):
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE job_pages SET stage = ?, result = ? WHERE job_id = ? AND idx = ?",
+                (DONE, json.dumps(result, ensure_ascii=False), job_id, index),
+            )
+        finally:
+            conn.close()
+
+    def finish(self, job_id: str, error: Optional[str] = None):
+        """작업 종료 (error 가 있으면 failed) 후 업로드 원본 삭제"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, stage = NULL, finished_at = ? WHERE id = ?",
+                (FAILED if error else DONE, error, time.time(), job_id),
+            )
+            conn.execute("DELETE FROM job_files WHERE job_id = ?", (job_id,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _purge(self, conn: sqlite3.Connection, now: float):
+        old = [row["id"] for row in conn.execute(
+            "SELECT id FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (now - JOB_RETENTION,)
+        )]
+        for table, column in (("job_files", "job_id"), ("job_pages", "job_id"), ("jobs", "id")):
+            conn.executemany(f"DELETE FROM {table} WHERE {column} = ?", [(job_id,) for job_id in old])
+
+    def referenced_assets(self) -> Set[str]:
+        """
+        보관 중인 작업이 참조하는 asset 해시 (asset_store / upload_store prune 에서 제외)
+        - 끝나지 않은 작업의 업로드 원본
+        - 결과 HTML 의 /assets/{hash} - 작업이 purge 될 때까지 GET /jobs/{id} 로 다시 내려가므로
+        """
+        conn = self._connect()
+        try:
+            hashes = {row["asset_hash"] for row in conn.execute(
+                "SELECT asset_hash FROM job_files WHERE asset_hash IS NOT NULL"
+            )}
+            for row in conn.execute("SELECT result FROM job_pages WHERE result IS NOT NULL"):
+                hashes.update(ASSET_URL_PATTERN.findall(row["result"]))
+            return hashes
+        finally:
+            conn.close()
+
+    # ============ 지표 ============
+    def metrics(self) -> Dict[str, Any]:
+        """상태별 작업 수, 가장 오래 기다린 작업의 대기 시간, 실행 중 작업자"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+            for row in conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"):
+                counts[row["status"]] = row["n"]
+            oldest = conn.execute("SELECT MIN(created_at) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+            workers = sorted({row["worker_pid"] for row in conn.execute(
+                "SELECT worker_pid FROM jobs WHERE status = ? AND lease_expires >= ?", (RUNNING, now)
+            )})
+        finally:
+            conn.close()
+        return {
+            "jobs": counts,
+            "oldest_queued_s": round(now - oldest, 1) if oldest else 0.0,
+            "busy_workers": workers,
+        }
+
+
+# 전역 인스턴스
+job_store = JobStore()
+
+
+if __name__ == "__main__":
+    metrics = job_store.metrics()
+    if "--json" in sys.argv:
+        print(json.dumps(metrics, indent=2))
+    else:
+        jobs = metrics["jobs"]
+        print(f"queued={jobs['queued']} running={jobs['running']} done={jobs['done']} failed={jobs['failed']} "
+              f"oldest_queued={metrics['oldest_queued_s']}s busy_workers={metrics['busy_workers']}")
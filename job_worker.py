@@ -0,0 +1,216 @@
+"""
+[Job Worker]
+job_queue 의 분석 작업을 처리하는 작업 프로세스입니다.
+
+- 작업자 1개 = 프로세스 1개, 한 번에 작업 1건 (작업 안의 페이지들은 main.run_pages 로 동시 처리)
+- 페이지가 끝날 때마다 결과를 저장하므로 GET /jobs/{id} 로 부분 결과를 볼 수 있음
+- HEARTBEAT_INTERVAL 마다 lease 를 연장하고, 다른 작업자가 작업을 이어받았으면 처리를 중단
+
+FastAPI 서버가 시작할 때 AURA_JOB_WORKERS 개의 작업자를 띄웁니다 (0 이면 띄우지 않음, 웹 작업자가 여럿이면 leader_lock 을 얻은 하나만).
+웹 서버와 따로 실행하려면:
+    AURA_JOB_WORKERS=0 python main.py
+    python job_worker.py --workers 4
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from event_loop import blocking_pool, loop_monitor
+from image_pool import image_pool, open_uploads
+from job_queue import job_store, HEARTBEAT_INTERVAL
+from token_budget import token_budget
+from upload_spool import memory_tracker
+
+
+JOB_WORKERS = int(os.getenv("AURA_JOB_WORKERS", "2"))
+POLL_INTERVAL = 1.0     # 초: 큐가 비어 있을 때 재확인 간격
+STOP_TIMEOUT = 10.0     # 초: 종료 신호 후 강제 종료까지 기다리는 시간
+MONITOR_INTERVAL = 2.0  # 초: 종료된 작업자 확인 간격
+RESTART_BACKOFF = 30.0  # 초: 연달아 종료되는 작업자의 최대 재시작 대기 시간
+
+
+async def run_job(job: Dict[str, Any]):
+    # main 은 작업자 프로세스에서만 import (main 이 이 모듈을 import 하므로)
+    import main
+
+    job_id = job['job_id']
+    pid = os.getpid()
+    pages_info = job['pages_info']
+    print(f"👷 [Jobs] Worker {pid} running {job_id} ({len(pages_info)} pages)", file=sys.stderr)
+    token_budget.start_request(f"job:{job['username']}")
+    memory_tracker.start_request(f"job:{job['username']}")
+
+    pending_writes = set()
+
+    def emit(event: Dict[str, Any]):
+        if event.get('event') != 'progress':
+            return
+        write = asyncio.ensure_future(
+            blocking_pool.run(job_store.set_stage, job_id, event['stage'], event.get('index'))
+        )
+        pending_writes.add(write)
+        write.add_done_callback(pending_writes.discard)
+
+    async def process():
+        # 업로드 로딩 실패도 작업 실패로 기록되도록 작업 안에서 처리
+        files = await blocking_pool.run(job_store.files, job_id)
+        uploaded_images = await image_pool.run(open_uploads, files)
+        images_by_page = main.assign_page_images(uploaded_images, pages_info)
+        page_jobs = await main.analyze_jobs(pages_info, images_by_page, job['username'],
+                                            job['issue_mode'], job['issue_title'], emit)
+
+        async def run_and_store(index, page_job):
+            result = await page_job()
+            await blocking_pool.run(job_store.set_result, job_id, index, result)
+            return result
+
+        await main.run_pages([
+            lambda i=i, page_job=page_job: run_and_store(i, page_job)
+            for i, page_job in enumerate(page_jobs) if i not in job['done']
+        ])
+
+    task = asyncio.create_task(process())
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            if not await blocking_pool.run(job_store.heartbeat, job_id, pid):
+                print(f"⚠️ [Jobs] Lost lease on {job_id}, stopping", file=sys.stderr)
+                task.cancel()
+                return
+
+    beat = asyncio.create_task(heartbeat())
+    error = None
+    try:
+        await task
+    except asyncio.CancelledError:
+        return  # 다른 작업자가 이어받음
+    except Exception as e:
+        print(f"❌ [Jobs] {job_id} failed: {e}", file=sys.stderr)
+        error = str(e)
+    finally:
+        beat.cancel()
+        if pending_writes:
+            await asyncio.gather(*pending_writes, return_exceptions=True)
+
+    await blocking_pool.run(job_store.finish, job_id, error)
+    token_budget.report()
+    memory_tracker.report()
+    print(f"✅ [Jobs] {job_id} {'failed' if error else 'done'}", file=sys.stderr)
+
+
+async def work():
+    """작업자 1개: 큐에서 작업을 하나씩 가져와 처리"""
+    import main
+    main.rag_modules.setup_rag()
+    loop_monitor.start()
+    print(f"👷 [Jobs] Worker {os.getpid()} ready", file=sys.stderr)
+    while True:
+        job = await blocking_pool.run(job_store.claim)
+        if job is None:
+            await asyncio.sleep(POLL_INTERVAL)
+            continue
+        try:
+            await run_job(job)
+        except Exception as e:
+            # 작업 1건의 오류(결과 저장 실패 등)로 작업자가 종료되지 않도록
+            print(f"❌ [Jobs] Worker {os.getpid()} error on {job['job_id']}: {e}", file=sys.stderr)
+
+
+class WorkerPool:
+    """
+    작업자 프로세스 관리 (FastAPI lifespan 에서 start/stop)
+    종료된 작업자는 종료 코드를 기록하고 다시 띄움 (연달아 종료되면 재시작 간격을 늘림)
+    """
+
+    def __init__(self):
+        self.processes: List[subprocess.Popen] = []
+        self.restarts = 0
+        self._stopping = threading.Event()
+        self._monitor: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _spawn() -> subprocess.Popen:
+        root = os.path.dirname(os.path.abspath(__file__))
+        return subprocess.Popen([sys.executable, os.path.join(root, "job_worker.py"), "--worker"], cwd=root)
+
+    def start(self, workers: int = JOB_WORKERS):
+        if not workers:
+            return
+        self._stopping.clear()
+        with self._lock:
+            self.processes.extend(self._spawn() for _ in range(workers))
+        print(f"👷 [Jobs] Started {workers} job worker(s)", file=sys.stderr)
+        if self._monitor is None:
+            self._monitor = threading.Thread(target=self._watch, name="aura-job-monitor", daemon=True)
+            self._monitor.start()
+
+    def _watch(self):
+        backoff = MONITOR_INTERVAL
+        while not self._stopping.wait(backoff):
+            exited = []
+            with self._lock:
+                for i, process in enumerate(self.processes):
+                    if process.poll() is not None and not self._stopping.is_set():
+                        exited.append(process.returncode)
+                        self.processes[i] = self._spawn()
+            for code in exited:
+                print(f"⚠️ [Jobs] Job worker exited with code {code}, restarting", file=sys.stderr)
+            self.restarts += len(exited)
+            backoff = min(backoff * 2, RESTART_BACKOFF) if exited else MONITOR_INTERVAL
+
+    def stop(self, timeout: float = STOP_TIMEOUT):
+        # 처리 중이던 작업은 lease 가 만료되면 다른 작업자가 이어받음
+        self._stopping.set()
+        if self._monitor is not None:
+            self._monitor.join()
+            self._monitor = None
+        with self._lock:
+            processes, self.processes = self.processes, []
+        for process in processes:
+            if process.poll() is None:
+                process.send_signal(signal.SIGTERM)
+        deadline = time.monotonic() + timeout
+        for process in processes:
+            try:
+                process.wait(timeout=max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def alive(self) -> int:
+        with self._lock:
+            return sum(1 for process in self.processes if process.poll() is None)
+
+
+# 전역 인스턴스
+worker_pool = WorkerPool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AURA job worker")
+    parser.add_argument("--worker", action="store_true", help="run a single worker in this process")
+    parser.add_argument("--workers", type=int, default=max(JOB_WORKERS, 1), help="number of worker processes")
+    args = parser.parse_args()
+
+    if args.worker:
+        try:
+            asyncio.run(work())
+        except KeyboardInterrupt:
+            pass
+    else:
+        worker_pool.start(args.workers)
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker_pool.stop()
@@ -0,0 +1,254 @@
+"""
+[Layout Estimator Module]
+본문을 실제 글꼴 폭으로 줄바꿈하여 텍스트 높이를 추정하는 모듈입니다.
+
+고정값(한 줄 60/120자) 대신:
+1. 생성된 HTML 에서 본문 영역 폭, 단(columns) 수, 글자 크기, 행간을 읽고
+2. 글자별 advance width 로 단어/음절 단위 줄바꿈을 수행해
+3. 줄 수 x 행간으로 높이를 계산합니다.
+
+글꼴 폭은 Pillow ImageFont 로 측정합니다 (fonts/ 디렉터리 또는 AURA_FONT_PATH 의 TTF/OTF).
+글꼴 파일이 없으면 Times(serif) AFM 폭 표와 한글/CJK 전각(1em) 폭으로 계산합니다.
+"""
+
+import glob
+import math
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from PIL import ImageFont
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+from html_analyzer import HTMLAnalysis, TEXT_SIZES, LEADING_RATIOS
+from token_budget import is_wide_char
+
+
+PAGE_WIDTH = 794
+FONT_DIRS = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts"),
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+]
+
+# Times-Roman AFM 폭 (1000 단위, 본문 wrapper 가 font-serif)
+_TIMES_WIDTHS = {
+    " ": 250, "!": 333, '"': 408, "#": 500, "$": 500, "%": 833, "&": 778, "'": 180,
+    "(": 333, ")": 333, "*": 500, "+": 564, ",": 250, "-": 333, ".": 250, "/": 278,
+    ":": 278, ";": 278, "<": 564, "=": 564, ">": 564, "?": 444, "@": 921,
+    "[": 333, "]": 333, "_": 500, "‘": 333, "’": 333, "“": 444, "”": 444, "–": 500, "—": 1000, "…": 1000,
+    "A": 722, "B": 667, "C": 667, "D": 722, "E": 611, "F": 556, "G": 722, "H": 722, "I": 333,
+    "J": 389, "K": 722, "L": 611, "M": 889, "N": 722, "O": 722, "P": 556, "Q": 722, "R": 667,
+    "S": 556, "T": 611, "U": 722, "V": 722, "W": 944, "X": 722, "Y": 722, "Z": 611,
+    "a": 444, "b": 500, "c": 444, "d": 500, "e": 444, "f": 333, "g": 500, "h": 500, "i": 278,
+    "j": 278, "k": 500, "l": 278, "m": 778, "n": 500, "o": 500, "p": 500, "q": 500, "r": 333,
+    "s": 389, "t": 278, "u": 500, "v": 500, "w": 722, "x": 500, "y": 500, "z": 444,
+}
+_DEFAULT_WIDTH = 500   # 표에 없는 라틴 문자 (숫자 포함)
+_WIDE_WIDTH = 1000     # 한글/CJK 전각
+
+# 줄바꿈 단위: 공백 / 한글·CJK 음절 1자 / 그 외 연속 문자열(단어)
+_TOKEN_PATTERN = re.compile(r'\s+|[가-힣ᄀ-ᇿ㄰-㆏぀-ヿ一-鿿]|[^\s가-힣ᄀ-ᇿ㄰-㆏぀-ヿ一-鿿]+')
+
+
+def _find_font(names: List[str]) -> Optional[str]:
+    """AURA_FONT_PATH 또는 글꼴 디렉터리에서 이름이 맞는 첫 글꼴 파일"""
+    env_path = os.getenv("AURA_FONT_PATH")
+    if env_path and os.path.exists(env_path):
+        return env_path
+    for font_dir in FONT_DIRS:
+        if not os.path.isdir(font_dir):
+            continue
+        files = glob.glob(os.path.join(font_dir, "**", "*.[ot]t[fc]"), recursive=True)
+        for name in names:
+            for path in files:
+                if name.lower() in os.path.basename(path).lower():
+                    return path
+    return None
+
+
+class FontMetrics:
+    """
+    글자 폭 측정기 (font-size px 기준)
+    """
+
+    # 한글이 포함된 serif 계열 우선, 없으면 CJK sans
+    FONT_CANDIDATES = ["NotoSerifCJK", "NotoSerifKR", "NanumMyeongjo", "NotoSansCJK", "NotoSansKR", "NanumGothic"]
+
+    def __init__(self, font_path: Optional[str] = None):
+        self.font_path = font_path if font_path else (_find_font(self.FONT_CANDIDATES) if PIL_AVAILABLE else None)
+        self._fonts: Dict[int, Any] = {}
+
+    @property
+    def source(self) -> str:
+        return self.font_path or "builtin-times-table"
+
+    def _font(self, size: int):
+        if size not in self._fonts:
+            self._fonts[size] = ImageFont.truetype(self.font_path, size)
+        return self._fonts[size]
+
+    @lru_cache(maxsize=8192)
+    def char_width(self, ch: str, size: int) -> float:
+        if self.font_path:
+            try:
+                return float(self._font(size).getlength(ch))
+            except Exception:
+                pass
+        units = _WIDE_WIDTH if is_wide_char(ch) else _TIMES_WIDTHS.get(ch, _DEFAULT_WIDTH)
+        return units * size / 1000.0
+
+    def text_width(self, text: str, size: float) -> float:
+        size_key = int(round(size))
+        scale = size / size_key if size_key else 1.0
+        return sum(self.char_width(ch, size_key) for ch in text) * scale
+
+
+def wrap_lines(text: str, width_px: float, font_px: float, metrics: "FontMetrics",
+               float_width_px: float = 0.0, float_lines: int = 0) -> int:
+    """
+    본문을 width_px 폭으로 줄바꿈한 줄 수
+    - 한글/CJK 는 음절 단위, 라틴은 단어 단위로 줄바꿈 (브라우저 기본 word-break)
+    - 문단(\\n) 마다 새 줄에서 시작
+    - float 이미지 옆의 처음 float_lines 줄은 (width_px - float_width_px) 폭 사용
+    """
+    lines = 0
+    for paragraph in text.split("\n"):
+        if not paragraph.strip():
+            continue
+        current = 0.0
+        lines += 1
+        for token in _TOKEN_PATTERN.findall(paragraph.strip()):
+            line_width = width_px - float_width_px if lines <= float_lines else width_px
+            if token.isspace():
+                if current > 0:
+                    current += metrics.text_width(" ", font_px)
+                continue
+            token_width = metrics.text_width(token, font_px)
+            if current + token_width <= line_width or current == 0:
+                current += token_width
+                # 한 줄보다 긴 단어는 여러 줄 차지
+                while current > line_width and line_width > 0:
+                    lines += 1
+                    current -= line_width
+            else:
+                lines += 1
+                current = token_width
+    return lines
+
+
+def _content_width(element, page_width: float = PAGE_WIDTH) -> float:
+    """루트부터 요소까지 w-* 와 좌우 패딩을 반영한 내용 폭"""
+    chain = []
+    node = element
+    while node is not None and node.tag != "#root":
+        chain.append(node)
+        node = node.parent
+
+    width = page_width
+    for node in reversed(chain):
+        w = node.get("w")
+        if w is not None:
+            if w.percent is not None:
+                width = width * w.percent / 100
+            elif w.px is not None and w.value.startswith("["):
+                width = w.px
+        for prefix, sides in (("p", 2), ("px", 2), ("pl", 1), ("pr", 1)):
+            u = node.get(prefix)
+            if u is not None and u.px is not None:
+                width -= u.px * sides
+    return max(width, 40.0)
+
+
+def _floated_image(analysis: HTMLAnalysis, container, container_width: float) -> Tuple[float, float]:
+    """본문 영역 안/옆의 float 이미지 (폭 + 좌우 여백, 높이)"""
+    scope = container.parent if container is not None and container.parent is not None else analysis.root
+    for element in scope.iter():
+        if element.tag != "img" or not (element.has("float-left") or element.has("float-right")):
+            continue
+        w = element.get("w")
+        h = element.get("h")
+        if w is None or h is None or h.px is None:
+            continue
+        img_width = container_width * w.percent / 100 if w.percent is not None else (w.px or 0)
+        margin = sum((element.get(p).px or 0) for p in ("ml", "mr") if element.get(p) is not None)
+        return img_width + margin, h.px
+    return 0.0, 0.0
+
+
+class LayoutEstimator:
+    """
+    생성된 HTML 기준 본문 텍스트 높이 추정기
+    """
+
+    def __init__(self, metrics: Optional[FontMetrics] = None):
+        self.metrics = metrics or FontMetrics()
+
+    def estimate(self, body: str, analysis: HTMLAnalysis) -> Dict[str, Any]:
+        """
+        Returns:
+            {"text_height", "lines", "column_width", "columns", "font_px", "line_px", "font_source"}
+        """
+        container = analysis.main_text_element()
+        font_px, line_px = analysis.body_text_metrics()
+
+        # 본문을 감싼 단(columns) 컨테이너 탐색
+        columns, gap_px, column_owner = 1, 0.0, container
+        node = container
+        while node is not None:
+            u = node.get("columns")
+            if u is not None and u.scale:
+                columns = int(u.scale)
+                gap = node.get("gap")
+                gap_px = gap.px if gap is not None and gap.px is not None else 16.0
+                column_owner = node
+                break
+            node = node.parent
+
+        width = _content_width(column_owner) if column_owner is not None else PAGE_WIDTH - 48
+        column_width = (width - gap_px * (columns - 1)) / columns
+
+        float_width, float_height = (0.0, 0.0)
+        if columns == 1:
+            float_width, float_height = _floated_image(analysis, container, width)
+        float_lines = int(math.ceil(float_height / line_px)) if float_width else 0
+
+        lines = wrap_lines(body, column_width, font_px, self.metrics, float_width, float_lines)
+        text_height = int(math.ceil(lines / columns) * line_px)
+        # float 이미지가 본문보다 길면 이미지 높이만큼 차지
+        text_height = max(text_height, int(float_height)) if float_width else text_height
+
+        return {
+            "text_height": text_height,
+            "lines": lines,
+            "column_width": round(column_width, 1),
+            "columns": columns,
+            "font_px": font_px,
+            "line_px": round(line_px, 2),
+            "float_width": round(float_width, 1),
+            "font_source": self.metrics.source,
+        }
+
+    def recommend_text_size(self, body: str, text_width: float, columns: int,
+                            available_height: float, leading: str = "snug") -> str:
+        """
+        생성 전 크기 결정용: 주어진 폭/단 수에서 available_height 안에 들어가는 가장 큰 본문 크기
+        """
+        ratio = LEADING_RATIOS.get(leading, 1.375)
+        column_width = (text_width - 16 * (columns - 1)) / columns
+        candidates = [("text-lg", TEXT_SIZES["lg"][0]), ("text-base", TEXT_SIZES["base"][0]),
+                      ("text-sm", TEXT_SIZES["sm"][0]), ("text-xs", TEXT_SIZES["xs"][0]),
+                      ("text-[11px]", 11), ("text-[10px]", 10)]
+        for name, font_px in candidates:
+            lines = wrap_lines(body, column_width, font_px, self.metrics)
+            if math.ceil(lines / columns) * font_px * ratio <= available_height:
+                return name
+        return "text-[10px]"
+
+
+# 전역 인스턴스
+layout_estimator = LayoutEstimator()
@@ -0,0 +1,94 @@
+"""
+[Leader Lock Module]
+uvicorn 작업자 프로세스(AURA_WEB_WORKERS) 중 하나만 서버 전체 작업을 맡도록 하는 파일 잠금입니다.
+
+작업자마다 lifespan 이 실행되므로, 잠금 없이 작업 큐 작업자(AURA_JOB_WORKERS)와 asset 정리를 시작하면
+웹 작업자 N 개가 작업 큐 작업자 N×AURA_JOB_WORKERS 개를 띄우고 정리도 N 번 동시에 실행합니다.
+
+- 잠금 파일에 배타적 flock 을 걸 수 있는 프로세스가 리더 (잠금은 프로세스가 끝나면 OS 가 풀어 줌)
+- 리더가 아닌 작업자는 RETRY_INTERVAL 마다 다시 시도하므로, 리더가 죽으면 다른 작업자가 이어받음
+- fcntl 이 없는 환경(Windows)에서는 모든 프로세스가 리더 (작업자 1개로 실행하세요)
+
+상태 확인:
+    python leader_lock.py
+"""
+
+import os
+import sys
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+LOCK_PATH = os.getenv("AURA_LEADER_LOCK", "./.leader.lock")
+RETRY_INTERVAL = 5.0   # 초: 리더가 아닌 작업자의 잠금 재시도 간격
+
+
+class LeaderLock:
+    """
+    프로세스 수명 동안 유지되는 배타적 파일 잠금
+    """
+
+    def __init__(self, path: str = LOCK_PATH):
+        self.path = path
+        self._file = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._file is not None
+
+    def try_acquire(self) -> bool:
+        """잠금을 얻으면 True (이미 리더면 그대로 True, 기다리지 않음)"""
+        if self._file is not None:
+            return True
+        if fcntl is None:
+            print("⚠️ [Leader] fcntl unavailable: every process runs background work", file=sys.stderr)
+            self._file = open(os.devnull, "w")
+            return True
+        lock_file = open(self.path, "a+")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(f"{os.getpid()}\n")
+        lock_file.flush()
+        self._file = lock_file
+        print(f"👑 [Leader] pid {os.getpid()} holds {self.path}", file=sys.stderr)
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+    def holder(self) -> Optional[int]:
+        """잠금을 가진 프로세스 pid (없으면 None)"""
+        if fcntl is None or not os.path.exists(self.path):
+            return None
+        with open(self.path, "a+") as probe:
+            try:
+                fcntl.flock(probe.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                probe.seek(0)
+                pid = probe.read().strip()
+                return int(pid) if pid.isdigit() else None
+            fcntl.flock(probe.fileno(), fcntl.LOCK_UN)
+        return None
+
+
+# 전역 인스턴스
+leader_lock = LeaderLock()
+
+
+if __name__ == "__main__":
+    pid = leader_lock.holder()
+    print(f"{leader_lock.path}: " + (f"held by pid {pid}" if pid else "no leader"))
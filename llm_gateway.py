@@ -0,0 +1,637 @@
+"""
+[LLM Gateway Module]
+Gemini / Voyage 호출 전에 동시 실행 슬롯을 받아 호출량을 조절하는 공용 호출 계층입니다.
+
+AIMD (Additive Increase / Multiplicative Decrease) 적응형 동시성 제한:
+1. 응답 지연이 평소 수준이면 성공할 때마다 limit += 1/limit (대략 한 라운드에 +1)
+2. 429(할당량 초과) 또는 지연 급증 시 limit *= 0.5 (DECREASE_COOLDOWN 동안 한 번만)
+
+GeminiAnalyzer(FastAPI 프로세스), LangGraph 노드(요청마다 새 MCP 서버 프로세스), scripts/ 의 데이터셋 생성기가
+서로 다른 프로세스이므로 limit / 실행 중 슬롯(lease) / 지표는 sqlite 파일에 저장해 공유합니다.
+lease 는 만료 시간이 있어 프로세스가 비정상 종료해도 슬롯이 영구히 묶이지 않습니다.
+
+API 키 풀:
+- GOOGLE_API_KEYS / VOY_API_KEYS (쉼표 구분, 없으면 GOOGLE_API_KEY / VOY_API_KEY 하나)
+- 키별 최근 60초 요청 수/토큰 수를 기록해 RPM/TPM 여유가 가장 큰 키를 배정
+- 할당량 오류(429)를 낸 키는 KEY_COOLDOWN 동안 제외 (연속 오류 시 2배씩, 최대 KEY_COOLDOWN_MAX)
+- sqlite 에는 키 원문이 아닌 해시(key_id)만 저장
+
+우선순위 (priority):
+- interactive: 사용자가 기다리는 요청. 대기 중이면 batch 는 새 슬롯을 받지 못함
+- batch: interactive 가 남긴 용량만 사용. 최근 INTERACTIVE_WINDOW 안에 interactive 호출이 있었으면
+  슬롯의 BATCH_RESERVE 와 키별 BATCH_KEY_HEADROOM 을 interactive 몫으로 남겨 둠
+- 이미 실행 중인 batch 호출은 중단하지 않음 (생성 중인 출력이 버려지므로), 새 슬롯 배정에서만 양보
+- slot(priority=...) 을 생략하면 AURA_LLM_PRIORITY 환경변수 (MCP 서버 프로세스는 클라이언트가 설정)
+
+사용:
+    with llm_gateway.slot("gemini", "analyze_page", tokens=estimate) as lease:
+        response = gemini_model(MODEL_NAME, lease.api_key).generate_content(...)
+
+지표 확인:
+    python llm_gateway.py [--json]
+"""
+
+import asyncio
+import json
+import math
+import os
+import sqlite3
+import sys
+import hashlib
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from event_loop import blocking_pool
+
+
+DB_PATH = os.getenv("AURA_LLM_GATEWAY_DB", "./.llm_gateway.db")
+
+INITIAL_LIMIT = 4.0
+MIN_LIMIT = 1.0
+MAX_LIMIT = float(os.getenv("AURA_LLM_MAX_CONCURRENCY", "32"))
+DECREASE_FACTOR = 0.5
+DECREASE_COOLDOWN = 5.0       # 초: 한 번의 429 폭주에 여러 번 반감하지 않도록
+LATENCY_SPIKE_RATIO = 2.5     # 호출 종류별 평균 지연의 몇 배부터 급증으로 볼지
+LATENCY_MIN_SAMPLES = 5       # 평균 지연을 신뢰하기 위한 최소 성공 수
+LATENCY_EWMA_ALPHA = 0.2
+LEASE_TTL = 600.0             # 초: 슬롯 최대 보유 시간 (html_generator 스트리밍 포함)
+ACQUIRE_TIMEOUT = 300.0       # 초: 슬롯 대기 최대 시간
+POLL_INTERVAL = (0.05, 1.0)   # 대기 중 재확인 간격 (최소, 최대)
+
+# provider -> (키 목록 환경변수, 단일 키 환경변수)
+KEY_ENV = {
+    "gemini": ("GOOGLE_API_KEYS", "GOOGLE_API_KEY"),
+    "voyage": ("VOY_API_KEYS", "VOY_API_KEY"),
+}
+# provider -> 키 하나당 (RPM, TPM) 한도
+KEY_QUOTAS = {
+    "gemini": (int(os.getenv("AURA_GEMINI_RPM", "1000")), int(os.getenv("AURA_GEMINI_TPM", "1000000"))),
+    "voyage": (int(os.getenv("AURA_VOYAGE_RPM", "2000")), int(os.getenv("AURA_VOYAGE_TPM", "3000000"))),
+}
+QUOTA_WINDOW = 60.0           # 초: RPM/TPM 집계 구간
+KEY_COOLDOWN = 30.0           # 초: 할당량 오류를 낸 키를 제외하는 시간
+KEY_COOLDOWN_MAX = 600.0
+GEMINI_IMAGE_TOKENS = 258     # Gemini 가 이미지 1장을 세는 입력 토큰 수
+
+# 우선순위 클래스
+INTERACTIVE = "interactive"   # /analyze, /edit 등 사용자가 기다리는 요청
+BATCH = "batch"               # extra/publisher.py, scripts/ 데이터셋 생성
+PRIORITIES = (INTERACTIVE, BATCH)
+INTERACTIVE_WINDOW = 30.0     # 초: 마지막 interactive 호출 후 이 시간 동안은 batch 에 여유분을 남겨 둠
+BATCH_RESERVE = 0.25          # interactive 활동 중 batch 가 쓰지 못하는 슬롯 비율
+BATCH_KEY_HEADROOM = 0.2      # interactive 활동 중 batch 가 남겨 둘 키별 RPM/TPM 여유율
+WAITER_TTL = 3.0              # 초: interactive 대기 표시 유지 시간 (대기 루프가 주기적으로 갱신)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS limiter (
+    provider TEXT PRIMARY KEY,
+    limit_value REAL NOT NULL,
+    last_decrease REAL NOT NULL DEFAULT 0,
+    last_interactive REAL NOT NULL DEFAULT 0,
+    deferred INTEGER NOT NULL DEFAULT 0,
+    successes INTEGER NOT NULL DEFAULT 0,
+    throttled INTEGER NOT NULL DEFAULT 0,
+    latency_spikes INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    rejected INTEGER NOT NULL DEFAULT 0,
+    timeouts INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS latency (
+    provider TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    ewma REAL NOT NULL,
+    samples INTEGER NOT NULL,
+    PRIMARY KEY (provider, kind)
+);
+CREATE TABLE IF NOT EXISTS leases (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    provider TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    priority TEXT NOT NULL DEFAULT 'interactive',
+    pid INTEGER NOT NULL,
+    acquired_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS waiters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    provider TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS key_usage (
+    provider TEXT NOT NULL,
+    key_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    tokens INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS key_usage_ts ON key_usage (provider, key_id, ts);
+CREATE TABLE IF NOT EXISTS key_state (
+    provider TEXT NOT NULL,
+    key_id TEXT NOT NULL,
+    cooldown_until REAL NOT NULL DEFAULT 0,
+    strikes INTEGER NOT NULL DEFAULT 0,
+    calls INTEGER NOT NULL DEFAULT 0,
+    throttled INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (provider, key_id)
+);
+"""
+
+# 이전 버전 db 에 추가된 컬럼
+MIGRATIONS = [
+    "ALTER TABLE limiter ADD COLUMN last_interactive REAL NOT NULL DEFAULT 0",
+    "ALTER TABLE limiter ADD COLUMN deferred INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE leases ADD COLUMN priority TEXT NOT NULL DEFAULT 'interactive'",
+]
+
+
+class CapacityTimeout(TimeoutError):
+    """ACQUIRE_TIMEOUT 안에 슬롯을 받지 못함"""
+
+
+def key_id(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+def load_keys(provider: str) -> List[str]:
+    """환경변수의 provider 키 목록 (중복 제거, 순서 유지)"""
+    list_env, single_env = KEY_ENV.get(provider, ("", ""))
+    raw = os.getenv(list_env) or os.getenv(single_env) or ""
+    return list(dict.fromkeys(k.strip() for k in raw.split(",") if k.strip()))
+
+
+_model_cache: Dict[Tuple[str, Optional[str], bool], Any] = {}
+_model_lock = threading.Lock()
+
+
+def gemini_model(model_name: str, api_key: Optional[str] = None, async_client: bool = False):
+    """
+    api_key 로 호출하는 google.generativeai GenerativeModel (키별 캐시)
+    async_client: generate_content_async 용 (asyncio 채널은 이벤트 루프 안에서 만들어야 하므로 따로 캐시)
+
+    genai.configure 는 프로세스 전역이라, 한 프로세스에서 여러 키를 스레드별로 쓰려면 키마다 별도 client 가 필요함.
+    GenerativeModel 에는 client 를 넘기는 공개 인자가 없어 _client / _async_client 에 직접 넣음
+    (google-generativeai 0.8.x 기준, requirements.txt 에서 버전 고정). SDK 구조가 바뀌면 조용히 기본 키로
+    호출하지 않도록 속성이 없으면 바로 실패함.
+    """
+    import google.generativeai as genai
+
+    cache_key = (model_name, api_key, async_client)
+    with _model_lock:
+        model = _model_cache.get(cache_key)
+        if model is None:
+            model = genai.GenerativeModel(model_name)
+            if api_key:
+                import google.ai.generativelanguage as glm
+                attribute = "_async_client" if async_client else "_client"
+                if not hasattr(model, attribute):
+                    raise RuntimeError(
+                        f"google-generativeai {getattr(genai, '__version__', '?')} has no GenerativeModel.{attribute}; "
+                        "per-key clients need google-generativeai 0.8.x (see requirements.txt)"
+                    )
+                if async_client:
+                    model._async_client = glm.GenerativeServiceAsyncClient(client_options={"api_key": api_key})
+                else:
+                    model._client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+            _model_cache[cache_key] = model
+        return model
+
+
+def resolve_priority(priority: Optional[str] = None) -> str:
+    priority = (priority or os.getenv("AURA_LLM_PRIORITY") or INTERACTIVE).lower()
+    return priority if priority in PRIORITIES else INTERACTIVE
+
+
+def is_quota_error(error: BaseException) -> bool:
+    """429 / RESOURCE_EXHAUSTED / rate limit 계열 오류인지 (google.api_core, voyageai, langchain 공통)"""
+    name = type(error).__name__
+    message = str(error).lower()
+    return (
+        name in ("ResourceExhausted", "TooManyRequests", "RateLimitError")
+        or "429" in message
+        or "resource_exhausted" in message
+        or "resource exhausted" in message
+        or "rate limit" in message
+        or "quota" in message
+    )
+
+
+class Lease:
+    """slot() 이 돌려주는 실행 슬롯"""
+
+    def __init__(self, lease_id: int, provider: str, kind: str, api_key: Optional[str] = None,
+                 priority: str = "interactive"):
+        self.id = lease_id
+        self.provider = provider
+        self.kind = kind
+        self.priority = priority
+        self.api_key = api_key   # 키 풀이 비어 있으면 None (클라이언트 기본 설정 사용)
+        self.key_id = key_id(api_key) if api_key else None
+        self.started = time.monotonic()
+        self.throttled = False
+        self.partial = False
+
+    def mark_throttled(self):
+        """예외 없이 429 를 돌려주는 클라이언트용"""
+        self.throttled = True
+
+    def mark_partial(self):
+        """스트리밍을 중간에 끊은 호출: 지연 시간이 평소와 달라 평균/급증 판단에서 제외"""
+        self.partial = True
+
+
+class LLMGateway:
+    """
+    프로세스 간 공유되는 provider 별 AIMD 동시성 제한기
+    """
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        self._initialized = False
+        self._keys: Dict[str, List[str]] = {}
+
+    # ============ 저장소 ============
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            for statement in MIGRATIONS:
+                try:
+                    conn.execute(statement)
+                except sqlite3.OperationalError:
+                    pass  # 이미 있는 컬럼
+            self._initialized = True
+        return conn
+
+    def _limiter_row(self, conn: sqlite3.Connection, provider: str) -> sqlite3.Row:
+        conn.execute(
+            "INSERT OR IGNORE INTO limiter (provider, limit_value) VALUES (?, ?)", (provider, INITIAL_LIMIT)
+        )
+        conn.row_factory = sqlite3.Row
+        return conn.execute("SELECT * FROM limiter WHERE provider = ?", (provider,)).fetchone()
+
+    # ============ API 키 풀 ============
+    def keys(self, provider: str) -> List[str]:
+        # 호출 측 모듈의 load_dotenv() 이후에 읽도록 첫 사용 시점에 로드
+        if provider not in self._keys:
+            self._keys[provider] = load_keys(provider)
+        return self._keys[provider]
+
+    def _key_headroom(self, conn: sqlite3.Connection, provider: str, kid: str, tokens: int, now: float) -> float:
+        """남은 RPM/TPM 비율 중 작은 값 (이번 호출 포함, 음수면 한도 초과)"""
+        rpm, tpm = KEY_QUOTAS.get(provider, (0, 0))
+        requests, used_tokens = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(tokens), 0) FROM key_usage WHERE provider = ? AND key_id = ? AND ts >= ?",
+            (provider, kid, now - QUOTA_WINDOW),
+        ).fetchone()
+        headroom = 1.0
+        if rpm:
+            headroom = min(headroom, (rpm - requests - 1) / rpm)
+        if tpm:
+            headroom = min(headroom, (tpm - used_tokens - tokens) / tpm)
+        return headroom
+
+    def _pick_key(self, conn: sqlite3.Connection, provider: str, tokens: int, now: float,
+                  min_headroom: float = 0.0) -> Tuple[bool, Optional[str]]:
+        """(사용 가능 여부, 키). 풀이 비어 있으면 (True, None). 여유율이 min_headroom 미만인 키는 제외"""
+        keys = self.keys(provider)
+        if not keys:
+            return True, None
+        cooling = {
+            r[0] for r in conn.execute(
+                "SELECT key_id FROM key_state WHERE provider = ? AND cooldown_until > ?", (provider, now)
+            )
+        }
+        best, best_headroom = None, 0.0
+        for api_key in keys:
+            kid = key_id(api_key)
+            if kid in cooling:
+                continue
+            headroom = self._key_headroom(conn, provider, kid, tokens, now)
+            if headroom >= min_headroom and (best is None or headroom > best_headroom):
+                best, best_headroom = api_key, headroom
+        return best is not None, best
+
+    # ============ 슬롯 획득/반환 ============
+    def _capacity(self, conn: sqlite3.Connection, provider: str, priority: str, limit: float,
+                  now: float) -> Tuple[int, float]:
+        """
+        priority 별 사용 가능한 슬롯 수와 키 최소 여유율
+        batch 는 interactive 가 대기 중이면 새 슬롯을 받지 못하고, 최근 interactive 호출이 있었으면
+        BATCH_RESERVE 비율의 슬롯과 키별 BATCH_KEY_HEADROOM 여유를 남겨 둠
+        """
+        slots = int(max(MIN_LIMIT, math.floor(limit)))
+        if priority != BATCH:
+            return slots, 0.0
+        waiting = conn.execute(
+            "SELECT COUNT(*) FROM waiters WHERE provider = ? AND priority = ? AND expires_at >= ?",
+            (provider, INTERACTIVE, now),
+        ).fetchone()[0]
+        if waiting:
+            return 0, 0.0
+        last_interactive = conn.execute(
+            "SELECT last_interactive FROM limiter WHERE provider = ?", (provider,)
+        ).fetchone()[0]
+        if now - last_interactive > INTERACTIVE_WINDOW:
+            return slots, 0.0
+        return slots - math.ceil(slots * BATCH_RESERVE), BATCH_KEY_HEADROOM
+
+    def _try_acquire(self, provider: str, kind: str, tokens: int, priority: str,
+                     wait: Dict[str, Any]) -> Optional[Tuple[int, Optional[str]]]:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM leases WHERE expires_at < ?", (now,))
+            conn.execute("DELETE FROM waiters WHERE expires_at < ?", (now,))
+            conn.execute("DELETE FROM key_usage WHERE ts < ?", (now - QUOTA_WINDOW,))
+            row = self._limiter_row(conn, provider)
+            if priority == INTERACTIVE:
+                conn.execute("UPDATE limiter SET last_interactive = ? WHERE provider = ?", (now, provider))
+            in_flight = conn.execute(
+                "SELECT COUNT(*) FROM leases WHERE provider = ?", (provider,)
+            ).fetchone()[0]
+            capacity, min_headroom = self._capacity(conn, provider, priority, row["limit_value"], now)
+            has_key, api_key = self._pick_key(conn, provider, tokens, now, min_headroom)
+            if has_key and in_flight < capacity:
+                cursor = conn.execute(
+                    "INSERT INTO leases (provider, kind, priority, pid, acquired_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (provider, kind, priority, os.getpid(), now, now + LEASE_TTL),
+                )
+                if api_key:
+                    kid = key_id(api_key)
+                    conn.execute(
+                        "INSERT INTO key_usage (provider, key_id, ts, tokens) VALUES (?, ?, ?, ?)",
+                        (provider, kid, now, tokens),
+                    )
+                    conn.execute(
+                        "INSERT OR IGNORE INTO key_state (provider, key_id) VALUES (?, ?)", (provider, kid)
+                    )
+                    conn.execute(
+                        "UPDATE key_state SET calls = calls + 1 WHERE provider = ? AND key_id = ?", (provider, kid)
+                    )
+                if wait.get("waiter_id") is not None:
+                    conn.execute("DELETE FROM waiters WHERE id = ?", (wait["waiter_id"],))
+                conn.execute("COMMIT")
+                return cursor.lastrowid, api_key
+
+            if not wait.get("attempts"):
+                counter = "deferred" if priority == BATCH and in_flight < row["limit_value"] else "rejected"
+                conn.execute(f"UPDATE limiter SET {counter} = {counter} + 1 WHERE provider = ?", (provider,))
+            wait["attempts"] = wait.get("attempts", 0) + 1
+            # 대기 중인 interactive 호출은 batch 의 새 슬롯 획득을 막음 (heartbeat 가 끊기면 WAITER_TTL 후 만료)
+            if priority == INTERACTIVE:
+                if wait.get("waiter_id") is None:
+                    wait["waiter_id"] = conn.execute(
+                        "INSERT INTO waiters (provider, priority, pid, expires_at) VALUES (?, ?, ?, ?)",
+                        (provider, priority, os.getpid(), now + WAITER_TTL),
+                    ).lastrowid
+                else:
+                    conn.execute(
+                        "UPDATE waiters SET expires_at = ? WHERE id = ?", (now + WAITER_TTL, wait["waiter_id"])
+                    )
+            conn.execute("COMMIT")
+            return None
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _give_up(self, provider: str, kind: str, priority: str, timeout: float, wait: Dict[str, Any]):
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE limiter SET timeouts = timeouts + 1 WHERE provider = ?", (provider,))
+            if wait.get("waiter_id") is not None:
+                conn.execute("DELETE FROM waiters WHERE id = ?", (wait["waiter_id"],))
+        finally:
+            conn.close()
+        raise CapacityTimeout(f"No {provider} capacity for {kind} ({priority}) within {timeout:.0f}s")
+
+    def acquire(self, provider: str, kind: str = "default", tokens: int = 0, priority: Optional[str] = None,
+                timeout: float = ACQUIRE_TIMEOUT) -> Lease:
+        priority = resolve_priority(priority)
+        deadline = time.monotonic() + timeout
+        delay = POLL_INTERVAL[0]
+        wait: Dict[str, Any] = {}
+        while True:
+            acquired = self._try_acquire(provider, kind, tokens, priority, wait)
+            if acquired is not None:
+                return Lease(acquired[0], provider, kind, acquired[1], priority)
+            if time.monotonic() + delay > deadline:
+                self._give_up(provider, kind, priority, timeout, wait)
+            time.sleep(delay)
+            delay = min(delay * 2, POLL_INTERVAL[1])
+
+    async def acquire_async(self, provider: str, kind: str = "default", tokens: int = 0,
+                            priority: Optional[str] = None, timeout: float = ACQUIRE_TIMEOUT) -> Lease:
+        """이벤트 루프를 막지 않고 대기하는 acquire (sqlite 접근은 blocking_pool 에서 실행)"""
+        priority = resolve_priority(priority)
+        deadline = time.monotonic() + timeout
+        delay = POLL_INTERVAL[0]
+        wait: Dict[str, Any] = {}
+        while True:
+            acquired = await blocking_pool.run(self._try_acquire, provider, kind, tokens, priority, wait)
+            if acquired is not None:
+                return Lease(acquired[0], provider, kind, acquired[1], priority)
+            if time.monotonic() + delay > deadline:
+                await blocking_pool.run(self._give_up, provider, kind, priority, timeout, wait)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, POLL_INTERVAL[1])
+
+    def release(self, lease: Lease, error: Optional[BaseException] = None):
+        """슬롯 반환 + 키 냉각 + AIMD 갱신"""
+        latency = time.monotonic() - lease.started
+        throttled = lease.throttled or (error is not None and is_quota_error(error))
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM leases WHERE id = ?", (lease.id,))
+            row = self._limiter_row(conn, lease.provider)
+            limit = row["limit_value"]
+
+            stats = conn.execute(
+                "SELECT ewma, samples FROM latency WHERE provider = ? AND kind = ?", (lease.provider, lease.kind)
+            ).fetchone()
+            spike = (
+                error is None and not lease.partial and stats is not None and stats["samples"] >= LATENCY_MIN_SAMPLES
+                and latency > stats["ewma"] * LATENCY_SPIKE_RATIO
+            )
+
+            # 할당량 오류를 낸 키는 잠시 배정에서 제외
+            if throttled and lease.key_id:
+                state = conn.execute(
+                    "SELECT strikes FROM key_state WHERE provider = ? AND key_id = ?", (lease.provider, lease.key_id)
+                ).fetchone()
+                strikes = state["strikes"] if state else 0
+                cooldown = min(KEY_COOLDOWN_MAX, KEY_COOLDOWN * (2 ** strikes))
+                conn.execute(
+                    "UPDATE key_state SET cooldown_until = ?, strikes = strikes + 1, throttled = throttled + 1 "
+                    "WHERE provider = ? AND key_id = ?",
+                    (now + cooldown, lease.provider, lease.key_id),
+                )
+                print(f"🧊 [LLM Gateway] {lease.provider} key {lease.key_id} cooling off for {cooldown:.0f}s",
+                      file=sys.stderr)
+            elif error is None and lease.key_id:
+                conn.execute(
+                    "UPDATE key_state SET strikes = 0 WHERE provider = ? AND key_id = ?", (lease.provider, lease.key_id)
+                )
+
+            if throttled or spike:
+                counter = "throttled" if throttled else "latency_spikes"
+                conn.execute(f"UPDATE limiter SET {counter} = {counter} + 1 WHERE provider = ?", (lease.provider,))
+                if now - row["last_decrease"] >= DECREASE_COOLDOWN:
+                    new_limit = max(MIN_LIMIT, limit * DECREASE_FACTOR)
+                    conn.execute(
+                        "UPDATE limiter SET limit_value = ?, last_decrease = ? WHERE provider = ?",
+                        (new_limit, now, lease.provider),
+                    )
+                    print(f"📉 [LLM Gateway] {lease.provider} limit {limit:.1f} -> {new_limit:.1f} "
+                          f"({'429' if throttled else f'latency {latency:.1f}s'} on {lease.kind})", file=sys.stderr)
+            elif error is not None:
+                # 429 가 아닌 오류는 혼잡 신호로 보지 않음
+                conn.execute("UPDATE limiter SET errors = errors + 1 WHERE provider = ?", (lease.provider,))
+            else:
+                conn.execute(
+                    "UPDATE limiter SET limit_value = ?, successes = successes + 1 WHERE provider = ?",
+                    (min(MAX_LIMIT, limit + 1.0 / limit), lease.provider),
+                )
+
+            # 지연 급증 샘플은 평균에 섞지 않음 (기준선이 따라 올라가는 것 방지)
+            if error is None and not spike and not lease.partial:
+                if stats is None:
+                    conn.execute(
+                        "INSERT INTO latency (provider, kind, ewma, samples) VALUES (?, ?, ?, 1)",
+                        (lease.provider, lease.kind, latency),
+                    )
+                else:
+                    ewma = (1 - LATENCY_EWMA_ALPHA) * stats["ewma"] + LATENCY_EWMA_ALPHA * latency
+                    conn.execute(
+                        "UPDATE latency SET ewma = ?, samples = samples + 1 WHERE provider = ? AND kind = ?",
+                        (ewma, lease.provider, lease.kind),
+                    )
+            conn.execute("COMMIT")
+        except Exception as e:
+            conn.execute("ROLLBACK")
+            print(f"⚠️ [LLM Gateway] Failed to release lease: {e}", file=sys.stderr)
+        finally:
+            conn.close()
+
+    @contextmanager
+    def slot(self, provider: str, kind: str = "default", tokens: int = 0, priority: Optional[str] = None,
+             timeout: float = ACQUIRE_TIMEOUT):
+        """
+        tokens: 예상 입력+출력 토큰 수 (키별 TPM 집계용)
+        priority: "interactive" / "batch" (없으면 AURA_LLM_PRIORITY, 기본 interactive)
+        """
+        lease = self.acquire(provider, kind, tokens, priority, timeout)
+        try:
+            yield lease
+        except BaseException as e:
+            self.release(lease, e)
+            raise
+        else:
+            self.release(lease)
+
+    @asynccontextmanager
+    async def async_slot(self, provider: str, kind: str = "default", tokens: int = 0,
+                         priority: Optional[str] = None, timeout: float = ACQUIRE_TIMEOUT):
+        lease = await self.acquire_async(provider, kind, tokens, priority, timeout)
+        try:
+            yield lease
+        except BaseException as e:
+            await blocking_pool.run(self.release, lease, e)
+            raise
+        else:
+            await blocking_pool.run(self.release, lease)
+
+    # ============ 지표 ============
+    def metrics(self) -> Dict[str, Any]:
+        """provider 별 현재 limit, 실행 중 슬롯 수, 누적 카운터, 호출 종류별 평균 지연, 키별 사용량"""
+        now = time.time()
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        try:
+            result = {}
+            for row in conn.execute("SELECT * FROM limiter ORDER BY provider"):
+                provider = row["provider"]
+                in_flight = {priority: 0 for priority in PRIORITIES}
+                for r in conn.execute(
+                    "SELECT priority, COUNT(*) FROM leases WHERE provider = ? AND expires_at >= ? GROUP BY priority",
+                    (provider, now),
+                ):
+                    in_flight[r[0]] = r[1]
+                waiting = conn.execute(
+                    "SELECT COUNT(*) FROM waiters WHERE provider = ? AND expires_at >= ?", (provider, now)
+                ).fetchone()[0]
+                result[provider] = {
+                    "limit": round(row["limit_value"], 2),
+                    "in_flight": sum(in_flight.values()),
+                    "in_flight_by_priority": in_flight,
+                    "interactive_waiting": waiting,
+                    "batch_deferred": row["deferred"],
+                    "successes": row["successes"],
+                    "throttled": row["throttled"],
+                    "latency_spikes": row["latency_spikes"],
+                    "errors": row["errors"],
+                    "rejected": row["rejected"],
+                    "timeouts": row["timeouts"],
+                    "latency_ewma": {
+                        r["kind"]: round(r["ewma"], 3)
+                        for r in conn.execute("SELECT kind, ewma FROM latency WHERE provider = ?", (provider,))
+                    },
+                    "keys": self._key_metrics(conn, provider, now),
+                }
+            return result
+        finally:
+            conn.close()
+
+
+    def _key_metrics(self, conn: sqlite3.Connection, provider: str, now: float) -> List[Dict[str, Any]]:
+        rpm, tpm = KEY_QUOTAS.get(provider, (0, 0))
+        rows = []
+        for state in conn.execute("SELECT * FROM key_state WHERE provider = ? ORDER BY key_id", (provider,)):
+            requests, tokens = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tokens), 0) FROM key_usage "
+                "WHERE provider = ? AND key_id = ? AND ts >= ?",
+                (provider, state["key_id"], now - QUOTA_WINDOW),
+            ).fetchone()
+            rows.append({
+                "key_id": state["key_id"],
+                "rpm_used": requests,
+                "rpm_limit": rpm,
+                "tpm_used": tokens,
+                "tpm_limit": tpm,
+                "cooldown_s": round(max(0.0, state["cooldown_until"] - now), 1),
+                "calls": state["calls"],
+                "throttled": state["throttled"],
+            })
+        return rows
+
+
+# 전역 인스턴스
+llm_gateway = LLMGateway()
+
+
+if __name__ == "__main__":
+    metrics = llm_gateway.metrics()
+    if "--json" in sys.argv:
+        print(json.dumps(metrics, indent=2))
+    elif not metrics:
+        print(f"No LLM gateway activity yet ({llm_gateway.db_path})")
+    else:
+        print(f"{'provider':<10} {'limit':>6} {'in_flight':>9} {'batch':>5} {'ok':>6} {'429':>5} {'spikes':>6} "
+              f"{'errors':>6} {'rejected':>8} {'deferred':>8} {'timeouts':>8}")
+        for provider, m in metrics.items():
+            print(f"{provider:<10} {m['limit']:>6} {m['in_flight']:>9} {m['in_flight_by_priority']['batch']:>5} "
+                  f"{m['successes']:>6} {m['throttled']:>5} {m['latency_spikes']:>6} {m['errors']:>6} "
+                  f"{m['rejected']:>8} {m['batch_deferred']:>8} {m['timeouts']:>8}")
+            for key in m["keys"]:
+                cooldown = f" cooling {key['cooldown_s']}s" if key["cooldown_s"] else ""
+                print(f"  key {key['key_id']}: {key['rpm_used']}/{key['rpm_limit']} rpm, "
+                      f"{key['tpm_used']}/{key['tpm_limit']} tpm, {key['throttled']} x 429{cooldown}")
@@ -1,48 +1,92 @@
 
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Response
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, RedirectResponse, JSONResponse
+from fastapi.responses import FileResponse, RedirectResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.sessions import SessionMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import sys
+import os
 import json
-from typing import List, Optional
-import io
-import base64
-from PIL import Image
+from typing import Awaitable, Callable, List, Optional
 # import rag_modules
 import rag_voyage as rag_modules
+from token_budget import token_budget, estimate_tokens, BODY_SUMMARY_TOKENS
+from edit_session import edit_store, plan_rerender
+from llm_gateway import llm_gateway
+from event_loop import blocking_pool, loop_monitor
+from job_queue import job_store
+from job_worker import worker_pool, JOB_WORKERS
+from asset_store import asset_store, prune_stores, CACHE_CONTROL
+from image_pool import image_pool
+from upload_spool import spool_uploads, memory_tracker, UploadRejected, MAX_REQUEST_BYTES
+from user_store import user_store, SessionMiddleware
+from leader_lock import leader_lock, RETRY_INTERVAL as LEADER_RETRY_INTERVAL
+
+# Vision 분석 + HERO/순서 + 타이포그래피를 Gemini 멀티모달 요청 1회로 처리 (image_analyzer/typography_styler 노드 생략)
+MERGED_ANALYSIS = os.getenv("AURA_MERGED_ANALYSIS", "0").lower() in ("1", "true", "yes")
+
+# 페이지 동시 처리 한도: 요청 1건 안에서 / 서버 전체 (페이지마다 MCP 서버 프로세스가 하나씩 뜸)
+# 세마포어는 프로세스마다 있으므로 서버 전체 한도를 웹 작업자 수(AURA_WEB_WORKERS)로 나눠 작업자별로 적용
+# (uvicorn --workers 로 직접 띄우면 AURA_WEB_WORKERS 도 같은 값으로 지정해야 전체 한도가 유지됨)
+PAGE_CONCURRENCY = int(os.getenv("AURA_PAGE_CONCURRENCY", "4"))
+GLOBAL_PAGE_CONCURRENCY = int(os.getenv("AURA_GLOBAL_PAGE_CONCURRENCY", "12"))
+WEB_WORKERS = max(1, int(os.getenv("AURA_WEB_WORKERS", "1")))
+global_page_slots = asyncio.Semaphore(max(1, GLOBAL_PAGE_CONCURRENCY // WEB_WORKERS))
+
+# 페이지당 레이아웃 변형 최대 수 (mcp_server_langgraph.MAX_VARIANTS 와 같게 유지)
+MAX_VARIANTS = 4
+
+async def lead_background_work():
+    """
+    웹 작업자 중 leader_lock 을 얻은 하나만 asset 정리와 작업 큐 작업자를 맡음
+    (잠금을 못 얻으면 계속 재시도하므로 리더가 종료되면 다른 작업자가 이어받음)
+    """
+    while not leader_lock.try_acquire():
+        await asyncio.sleep(LEADER_RETRY_INTERVAL)
+    await blocking_pool.run(prune_stores)
+    worker_pool.start(JOB_WORKERS)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Load models on startup
     print("Startup: Initializing RAG Modules...")
     rag_modules.setup_rag()
+    loop_monitor.start()
+    leader_task = asyncio.create_task(lead_background_work())
     yield
     print("Shutdown: Cleaning up...")
+    leader_task.cancel()
+    if leader_lock.is_leader:
+        worker_pool.stop()
+        leader_lock.release()
+    image_pool.shutdown()
+    await loop_monitor.stop()
 
 app = FastAPI(lifespan=lifespan)
 
+# 업로드 제한: Content-Length 가 요청 한도(+ 폼 필드 여유분)를 넘으면 본문을 읽기 전에 거절
+UPLOAD_FORM_OVERHEAD = 1024 ** 2
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    if request.method == "POST":
+        try:
+            length = int(request.headers.get("content-length", "0"))
+        except ValueError:
+            length = 0
+        if length > MAX_REQUEST_BYTES + UPLOAD_FORM_OVERHEAD:
+            return JSONResponse({"detail": f"Request body exceeds {MAX_REQUEST_BYTES // 1024 ** 2}MB"},
+                                status_code=413)
+    return await call_next(request)
+
 # Add session middleware (required for login)
-app.add_middleware(SessionMiddleware, secret_key="aura-secret-key-change-in-production-2024")
+# 계정/세션은 sqlite(user_store)에 있으므로 uvicorn 작업자를 여러 개 띄워도 로그인 상태가 공유됨
+app.add_middleware(SessionMiddleware)
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Hardcoded credentials
-VALID_CREDENTIALS = {
-    'admin': 'admin123',
-    'user': 'user123',
-    'demo': 'demo123'
-}
-
-def image_to_base64(image: Image.Image) -> str:
-    buffered = io.BytesIO()
-    # Save as PNG to preserve quality/transparency
-    image.save(buffered, format="PNG")
-    return f"data:image/png;base64,{base64.b64encode(buffered.getvalue()).decode()}"
-
 def is_authenticated(request: Request) -> bool:
     """Check if user is logged in"""
     return request.session.get("authenticated", False)
@@ -61,7 +105,7 @@ async def login(request: Request):
         password = data.get("password", "")
         
         # Validate credentials
-        if username in VALID_CREDENTIALS and VALID_CREDENTIALS[username] == password:
+        if await blocking_pool.run(user_store.authenticate, username, password):
             # Set session
             request.session["authenticated"] = True
             request.session["username"] = username
@@ -115,15 +159,12 @@ async def signup(request: Request):
                 status_code=400
             )
         
-        # Check if username already exists
-        if username in VALID_CREDENTIALS:
+        # Add new user (fails if username already exists)
+        if not await blocking_pool.run(user_store.create_user, username, password, email):
             return JSONResponse(
                 {"status": "error", "message": "Username already exists"}, 
                 status_code=409
             )
-        
-        # Add new user to credentials (in-memory, will reset on restart)
-        VALID_CREDENTIALS[username] = password
         print(f"✅ New user registered: {username} (email: {email})")
         
         return JSONResponse({
@@ -146,40 +187,40 @@ async def read_index(request: Request):
         return RedirectResponse(url="/login", status_code=302)
     return FileResponse('static/index.html')
 
-@app.post("/analyze")
-async def analyze_pages(
-    request: Request,
-    files: List[UploadFile] = File(default=None),
-    pages_data: str = Form(...) 
-):
+@app.get("/assets/{asset_hash}")
+async def get_asset(request: Request, asset_hash: str):
     """
-    Handle multi-page analysis and layout generation.
-    Full workflow: Intent → Filter → Vision → RAG → MCP Generation
+    Content-addressed image referenced by rendered HTML.
+    The URL changes whenever the content does, so responses are cached as immutable.
+    Not session-checked: downloaded HTML files load images from here, and the 256-bit hash is the capability.
     """
-    # Check authentication
+    path = asset_store.path(asset_hash)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    etag = f'"{asset_hash}"'
+    headers = {"Cache-Control": CACHE_CONTROL, "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    media_type = await blocking_pool.run(asset_store.content_type, asset_hash)
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+@app.get("/metrics/llm")
+async def llm_metrics(request: Request):
+    """LLM 호출 계층 지표 (provider 별 동시성 limit, 실행 중 호출, 429/거절 횟수)"""
     if not is_authenticated(request):
         raise HTTPException(status_code=401, detail="Unauthorized - Please login")
-    
-    try:
-        pages_info = json.loads(pages_data)
-        if not pages_info:
-            raise HTTPException(status_code=400, detail="Pages data cannot be empty list")
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=400, detail="Invalid JSON in pages_data")
+    return JSONResponse(await blocking_pool.run(llm_gateway.metrics))
 
-    # Load images from uploaded files
-    # Store all images in order, will assign to pages based on order
-    uploaded_images = []
-    for file in (files or []):
-        try:
-            img_bytes = await file.read()
-            img = Image.open(io.BytesIO(img_bytes))
-            img_b64 = image_to_base64(img)
-            uploaded_images.append({'img': img, 'b64': img_b64, 'filename': file.filename})
-            print(f"✅ Loaded image: {file.filename}")
-        except Exception as e:
-            print(f"⚠️ Error loading image {file.filename}: {e}")
-    
+@app.get("/metrics/runtime")
+async def runtime_metrics(request: Request):
+    """이벤트 루프 지연과 blocking_pool / image_pool 사용량"""
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Unauthorized - Please login")
+    return JSONResponse({"event_loop": loop_monitor.metrics(), "blocking_pool": blocking_pool.metrics(),
+                         "image_pool": image_pool.metrics()})
+
+def assign_page_images(uploaded_images: list, pages_info: list) -> dict:
+    """이미지를 페이지별로 배분 ({page_id: [SourceImage, ...]})"""
     # Distribute images to pages based on image_indices from frontend
     # This respects which images were uploaded to each page card
     images_by_page = {}
@@ -196,57 +237,155 @@ async def analyze_pages(
             
             images_by_page[page_id] = page_images
             print(f"📄 Page {page_id}: Assigned {len(page_images)} image(s) from indices {image_indices}", file=sys.stderr)
+    return images_by_page
+
+async def spool_page_images(files: Optional[List[UploadFile]]) -> list:
+    """업로드를 디스크(upload_store)로 spool, 제한을 넘으면 413"""
+    try:
+        return await spool_uploads(files)
+    except UploadRejected as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+async def load_page_images(files: Optional[List[UploadFile]], pages_info: list) -> dict:
+    """업로드 이미지를 spool 해 페이지별로 배분 ({page_id: [SourceImage, ...]})"""
+    # Store all images in order, will assign to pages based on order
+    uploaded_images = await spool_page_images(files)
+    return assign_page_images(uploaded_images, pages_info)
 
+def parse_pages_data(pages_data: str) -> list:
+    try:
+        pages_info = json.loads(pages_data)
+        if not pages_info:
+            raise HTTPException(status_code=400, detail="Pages data cannot be empty list")
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON in pages_data")
+    return pages_info
+
+async def run_pages(jobs: List[Callable[[], Awaitable[dict]]]) -> List[dict]:
+    """
+    페이지 작업을 동시에 실행하고 입력 순서대로 결과 반환
+    요청별 한도(PAGE_CONCURRENCY)를 먼저 받은 뒤 서버 전체 한도를 받아, 한 요청이 전역 슬롯을 독점하지 않게 함
+    """
+    request_slots = asyncio.Semaphore(PAGE_CONCURRENCY)
+
+    async def run(job):
+        async with request_slots:
+            async with global_page_slots:
+                return await job()
 
-    results = []
+    return list(await asyncio.gather(*(run(job) for job in jobs)))
+
+async def process_page(page: dict, page_images: list, username: str, previous: Optional[dict] = None,
+                       issue_style: Optional[dict] = None, analysis: Optional[dict] = None,
+                       on_stage: Optional[Callable[[str], None]] = None) -> dict:
+    """
+    페이지 1장 처리: Intent → Filter → Vision → RAG → MCP Generation
+    previous(직전 기록)가 있으면 바뀐 입력에 의존하는 단계만 다시 실행합니다.
+    issue_style 이 있으면 이슈 공통 디자인/타이포그래피를 사용합니다.
+    page['style_override'] 는 이슈 모드가 아니어도 적용됩니다 (디자인/타이포그래피 일부 변경).
+    analysis 가 주어지면 Vision Analysis 를 건너뜁니다 (이슈 모드에서 미리 실행).
+    on_stage 는 각 단계 시작 시 "vision" / "rag" / "render" 로 호출됩니다 (/analyze/stream 진행 이벤트).
+    """
+    on_stage = on_stage or (lambda stage: None)
+    page_id = page.get('id')
+    headline = page.get('headline', '')
+    body = page.get('body', '')
+    layout_type = page.get('layout_type', 'article')
+    summary_task = None
     
-    # Process each page
-    for page in pages_info:
-        page_id = page.get('id')
-        headline = page.get('headline', '')
-        body = page.get('body', '')
-        layout_type = page.get('layout_type', 'article')
+    try:
+        # 변형 수는 클라이언트 입력이므로 여기서 검증 (잘못된 값은 이 페이지만 실패)
+        try:
+            variants = max(1, min(int(page.get('variants', 1) or 1), MAX_VARIANTS))
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid variants value: {page.get('variants')!r}")
         
-        page_images = images_by_page.get(page_id, [])
+        current = {
+            'headline': headline,
+            'body': body,
+            'layout_type': layout_type,
+            'variants': variants,
+            'style_override': page.get('style_override'),
+            'images': list(page_images)
+        }
+        rerender = plan_rerender(previous, current) if previous else None
+        if rerender:
+            print(f"✏️  [Edit] Page {page_id} changed fields: {rerender['changed'] or 'none'}", file=sys.stderr)
+            for reason in rerender['reasons']:
+                print(f"   - {reason}", file=sys.stderr)
+            if rerender['unchanged']:
+                return {**previous['result'], 'reused': True}
         
-        try:
-            # ============================================================
-            # STEP 1: Intent Classification (Guard)
-            # ============================================================
-            print(f"🎯 [Intent Classifier] Analyzing request for page {page_id}...", file=sys.stderr)
-            print(f"   📝 Headline: \"{headline[:30]}...\"", file=sys.stderr)
-            print(f"   🖼️  Images: {len(page_images)}", file=sys.stderr)
-            print(f"   ✅ Result: MAGAZINE_LAYOUT_REQUEST → PASS", file=sys.stderr)
-            
-            # ============================================================
-            # STEP 2: Content Filter (Guard)
-            # ============================================================
-            headline_len = len(headline)
-            body_len = len(body)
-            
-            print(f"🛡️  [Content Filter] Scanning content...", file=sys.stderr)
-            print(f"   📝 Headline length: {headline_len} chars", file=sys.stderr)
-            print(f"   📄 Body length: {body_len} chars", file=sys.stderr)
-            print(f"   🔍 PII Detection: CLEAR", file=sys.stderr)
-            print(f"   🔍 Inappropriate Content: CLEAR", file=sys.stderr)
-            print(f"   ✅ Result: CONTENT_SAFE → PASS", file=sys.stderr)
-            
-            # ============================================================
-            # STEP 3: Vision Analysis (Gemini)
-            # ============================================================
+        # ============================================================
+        # STEP 1: Intent Classification (Guard)
+        # ============================================================
+        print(f"🎯 [Intent Classifier] Analyzing request for page {page_id}...", file=sys.stderr)
+        print(f"   📝 Headline: \"{headline[:30]}...\"", file=sys.stderr)
+        print(f"   🖼️  Images: {len(page_images)}", file=sys.stderr)
+        print(f"   ✅ Result: MAGAZINE_LAYOUT_REQUEST → PASS", file=sys.stderr)
+        
+        # ============================================================
+        # STEP 2: Content Filter (Guard)
+        # ============================================================
+        headline_len = len(headline)
+        body_len = len(body)
+        
+        print(f"🛡️  [Content Filter] Scanning content...", file=sys.stderr)
+        print(f"   📝 Headline length: {headline_len} chars", file=sys.stderr)
+        print(f"   📄 Body length: {body_len} chars", file=sys.stderr)
+        print(f"   🔍 PII Detection: CLEAR", file=sys.stderr)
+        print(f"   🔍 Inappropriate Content: CLEAR", file=sys.stderr)
+        print(f"   ✅ Result: CONTENT_SAFE → PASS", file=sys.stderr)
+        
+        # typography_styler 가 실행될 페이지만 본문 요약을 Vision 분석/RAG 와 동시에 시작
+        # (이슈 스타일·이전 결과·병합 분석이 타이포그래피를 주면 요약하지 않음)
+        typography_reused = (
+            bool(issue_style and issue_style.get('typography'))
+            or bool(rerender and 'typography_style' in rerender['reuse_context'])
+            or (MERGED_ANALYSIS and analysis is None and (rerender is None or rerender['rerun_vision']))
+        )
+        if not typography_reused and estimate_tokens(body) > BODY_SUMMARY_TOKENS:
+            summary_task = rag_modules.analyzer.prefetch_summary(body)
+        
+        # ============================================================
+        # STEP 3: Vision Analysis (Gemini)
+        # ============================================================
+        on_stage("vision")
+        if analysis is not None:
+            print("♻️  [Vision Analysis] Using analysis from issue pre-pass", file=sys.stderr)
+        elif (rerender is None or rerender['rerun_vision']) and MERGED_ANALYSIS:
+            # Vision + HERO/순서 + 타이포그래피를 한 번의 멀티모달 요청으로
+            print("👁️  [Vision Analysis] Merged multimodal analysis with Gemini...", file=sys.stderr)
+            with memory_tracker.hold(sum(img.nbytes for img in page_images)):
+                analysis = await rag_modules.analyzer.analyze_page_merged_async(
+                    images=[img.gemini_part() for img in page_images],
+                    title=headline,
+                    body=body,
+                    layout_type=layout_type
+                )
+        elif rerender is None or rerender['rerun_vision']:
             print(f"👁️  [Vision Analysis] Analyzing images and content with Gemini...", file=sys.stderr)
-            analysis = rag_modules.analyzer.analyze_page(
-                images=[img['img'] for img in page_images],
-                title=headline,
-                body=body
-            )
-            print(f"   🎨 Mood: {analysis.get('mood', 'Unknown')}", file=sys.stderr)
-            print(f"   📂 Category: {analysis.get('category', 'Unknown')}", file=sys.stderr)
-            print(f"   ✅ Result: VISION_ANALYSIS_COMPLETE", file=sys.stderr)
-            
-            # ============================================================
-            # STEP 4: RAG Search (ChromaDB + Voyage)
-            # ============================================================
+            with memory_tracker.hold(sum(img.nbytes for img in page_images)):
+                analysis = await rag_modules.analyzer.analyze_page_async(
+                    images=[img.gemini_part() for img in page_images],
+                    title=headline,
+                    body=body
+                )
+        else:
+            print("♻️  [Vision Analysis] Reusing previous analysis", file=sys.stderr)
+            analysis = previous['analysis']
+        # 병합 분석 결과 중 그래프 노드 출력은 분리해서 reuse_context 로 전달
+        analysis = dict(analysis)
+        graph_context = analysis.pop('graph_context', None) or {}
+        print(f"   🎨 Mood: {analysis.get('mood', 'Unknown')}", file=sys.stderr)
+        print(f"   📂 Category: {analysis.get('category', 'Unknown')}", file=sys.stderr)
+        print(f"   ✅ Result: VISION_ANALYSIS_COMPLETE", file=sys.stderr)
+        
+        # ============================================================
+        # STEP 4: RAG Search (ChromaDB + Voyage)
+        # ============================================================
+        on_stage("rag")
+        if rerender is None or rerender['rerun_rag']:
             query = f"{analysis.get('mood', '')} {analysis.get('category', '')} {analysis.get('description', '')}"
             
             # Cascading fallback search
@@ -263,10 +402,14 @@ async def analyze_pages(
                 {}
             ]
             
+            # 필터만 바뀌므로 검색어 임베딩은 한 번만 계산
+            query_embedding = await rag_modules.retriever.embed_query_async(query)
             rag_results = []
             for filters in filter_attempts:
                 print(f"   🔍 Trying filters: {filters}", file=sys.stderr)
-                rag_results = rag_modules.retriever.search(query, filters=filters, top_k=5)
+                rag_results = await rag_modules.retriever.search_async(
+                    query, filters=filters, top_k=5, query_embedding=query_embedding
+                )
                 if len(rag_results) > 0:
                     print(f"   ✅ Found {len(rag_results)} results", file=sys.stderr)
                     break
@@ -277,41 +420,299 @@ async def analyze_pages(
                 print(f"   🎯 Best match: {rag_results[0]['image_id']}", file=sys.stderr)
             else:
                 print(f"   ⚠️ No RAG results found, using defaults", file=sys.stderr)
-            
-            # ============================================================
-            # STEP 5: MCP HTML Generation (LangGraph Pipeline)
-            # ============================================================
-            print(f"🍌 [MCP] Calling LangGraph pipeline for final HTML generation...", file=sys.stderr)
-            html = await rag_modules.analyzer.aura_render(
-                layout_data=best_layout or {},
-                user_content={
-                    'title': headline,
-                    'body': body,
-                    'images': [img['b64'] for img in page_images],
-                    'layout_type': layout_type,
-                    'analysis': analysis
-                }
-            )
-            
-            results.append({
-                'page_id': page_id,
+        else:
+            print("♻️  [RAG Retriever] Reusing previous search results", file=sys.stderr)
+            rag_results = previous['rag_results']
+            best_layout = previous['best_layout']
+        
+        # ============================================================
+        # STEP 5: MCP HTML Generation (LangGraph Pipeline)
+        # ============================================================
+        on_stage("render")
+        print(f"🍌 [MCP] Calling LangGraph pipeline for final HTML generation...", file=sys.stderr)
+        rendered = await rag_modules.analyzer.aura_render_page(
+            layout_data=best_layout or {},
+            user_content={
+                'title': headline,
+                'body': body,
+                'images': list(page_images),
+                'layout_type': layout_type,
                 'analysis': analysis,
-                'recommendations': rag_results,
-                'rendered_html': html
-            })
+                'variants': variants,
+                'issue_style': issue_style,
+                'style_override': page.get('style_override'),
+                'body_summary': summary_task
+            },
+            reuse_context={**graph_context, **(rerender['reuse_context'] if rerender else {})}
+        )
+        
+        result = {
+            'page_id': page_id,
+            'analysis': analysis,
+            'recommendations': rag_results,
+            'rendered_html': rendered['html']
+        }
+        if variants > 1:
+            # 첫 번째가 품질 점수가 가장 좋은 변형
+            result['rendered_variants'] = rendered['variants']
+        
+        # 다음 편집 요청에서 비교/재사용할 기록
+        edit_store.save(username, page_id, {
+            **current,
+            'analysis': analysis,
+            'rag_results': rag_results,
+            'best_layout': best_layout,
+            'context': rendered['context'],
+            'issue_style': issue_style,
+            'result': result
+        })
+        return result
+        
+    except Exception as e:
+        if summary_task is not None:
+            summary_task.cancel()
+        print(f"❌ Error processing page {page_id}: {e}", file=sys.stderr)
+        import traceback
+        traceback.print_exc()
+        return {
+            'page_id': page_id,
+            'error': str(e),
+            'rendered_html': f"<div style='color:red; padding:20px'>Error: {e}</div>"
+        }
+
+async def analyze_jobs(pages_info: list, images_by_page: dict, username: str, issue_mode: bool,
+                       issue_title: str, emit: Optional[Callable[[dict], None]] = None) -> list:
+    """
+    /analyze, /analyze/stream 공통: (이슈 모드면 사전 Vision 분석 + 공통 스타일 결정 후) 페이지별 작업 목록
+    emit 이 주어지면 진행 이벤트를 전달합니다.
+    """
+    emit = emit or (lambda event: None)
+    issue_style = None
+    analyses = [None] * len(pages_info)
+    if issue_mode and len(pages_info) > 1:
+        # 📚 Issue mode: 모든 페이지 Vision 분석 후 공통 스타일 1회 결정
+        async def analyze(page):
+            page_images = images_by_page.get(page.get('id'), [])
+            try:
+                with memory_tracker.hold(sum(img.nbytes for img in page_images)):
+                    return await rag_modules.analyzer.analyze_page_async(
+                        images=[img.gemini_part() for img in page_images],
+                        title=page.get('headline', ''),
+                        body=page.get('body', '')
+                    )
+            except Exception as e:
+                print(f"⚠️ [Issue] Vision analysis failed for page {page.get('id')}: {e}", file=sys.stderr)
+                return None
+        emit({'event': 'progress', 'stage': 'issue_vision'})
+        analyses = await run_pages([lambda page=page: analyze(page) for page in pages_info])
+        emit({'event': 'progress', 'stage': 'issue_style'})
+        issue_style = await rag_modules.analyzer.aura_issue_style(
+            issue_title, pages_info, [a for a in analyses if a]
+        )
+
+    def stage_callback(index: int, page: dict) -> Callable[[str], None]:
+        return lambda stage: emit({'event': 'progress', 'index': index, 'page_id': page.get('id'), 'stage': stage})
+
+    return [
+        lambda i=i, page=page: process_page(page, images_by_page.get(page.get('id'), []), username,
+                                            issue_style=issue_style, analysis=analyses[i],
+                                            on_stage=stage_callback(i, page))
+        for i, page in enumerate(pages_info)
+    ]
+
+@app.post("/analyze")
+async def analyze_pages(
+    request: Request,
+    files: List[UploadFile] = File(default=None),
+    pages_data: str = Form(...),
+    issue_mode: bool = Form(False),
+    issue_title: str = Form("")
+):
+    """
+    Handle multi-page analysis and layout generation.
+    Full workflow: Intent → Filter → Vision → RAG → MCP Generation
+    issue_mode: typography/color/accent are decided once for all pages and shared.
+    Any page (issue mode or not) may set 'style_override' (e.g. {"accent_color": "text-blue-600"}) in pages_data.
+    """
+    # Check authentication
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Unauthorized - Please login")
+    
+    pages_info = parse_pages_data(pages_data)
+    username = request.session.get('username', 'unknown')
+    memory_tracker.start_request(f"analyze:{username}")
+    images_by_page = await load_page_images(files, pages_info)
+
+    token_budget.start_request(f"analyze:{username}")
+    
+    # Process pages concurrently (results keep page order)
+    jobs = await analyze_jobs(pages_info, images_by_page, username, issue_mode, issue_title)
+    results = await run_pages(jobs)
+    
+    token_budget.report()
+    memory_tracker.report()
+    return {"results": results}
+
+@app.post("/analyze/stream")
+async def analyze_pages_stream(
+    request: Request,
+    files: List[UploadFile] = File(default=None),
+    pages_data: str = Form(...),
+    issue_mode: bool = Form(False),
+    issue_title: str = Form("")
+):
+    """
+    Streaming variant of /analyze (NDJSON, one event per line):
+      {"event": "start", "pages": N}
+      {"event": "progress", "index": i, "page_id": ..., "stage": "vision" | "rag" | "render"}
+      {"event": "progress", "stage": "issue_vision" | "issue_style"}   (issue mode only)
+      {"event": "page", "index": i, "result": {...same as /analyze results[i]...}}   (as soon as each page is done)
+      {"event": "done"} or {"event": "error", "detail": ...}
+    """
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Unauthorized - Please login")
+    
+    pages_info = parse_pages_data(pages_data)
+    username = request.session.get('username', 'unknown')
+    memory_tracker.start_request(f"analyze-stream:{username}")
+    images_by_page = await load_page_images(files, pages_info)
+
+    token_budget.start_request(f"analyze-stream:{username}")
+    
+    events: asyncio.Queue = asyncio.Queue()
+    emit = events.put_nowait
+    
+    async def produce():
+        try:
+            emit({'event': 'start', 'pages': len(pages_info)})
+            jobs = await analyze_jobs(pages_info, images_by_page, username, issue_mode, issue_title, emit)
+            
+            async def run_and_emit(index, job):
+                result = await job()
+                emit({'event': 'page', 'index': index, 'result': result})
+                return result
             
+            await run_pages([lambda i=i, job=job: run_and_emit(i, job) for i, job in enumerate(jobs)])
+            token_budget.report()
+            memory_tracker.report()
+            emit({'event': 'done'})
         except Exception as e:
-            print(f"❌ Error processing page {page_id}: {e}", file=sys.stderr)
-            import traceback
-            traceback.print_exc()
-            results.append({
-                'page_id': page_id,
-                'error': str(e),
-                'rendered_html': f"<div style='color:red; padding:20px'>Error: {e}</div>"
-            })
+            print(f"❌ [Stream] {e}", file=sys.stderr)
+            emit({'event': 'error', 'detail': str(e)})
+        finally:
+            emit(None)
+    
+    producer = asyncio.create_task(produce())
+    
+    async def stream():
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        finally:
+            # 클라이언트가 연결을 끊으면 남은 페이지 처리도 중단
+            if not producer.done():
+                producer.cancel()
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/jobs", status_code=202)
+async def create_job(
+    request: Request,
+    files: List[UploadFile] = File(default=None),
+    pages_data: str = Form(...),
+    issue_mode: bool = Form(False),
+    issue_title: str = Form("")
+):
+    """
+    Queue an analysis job (same form as /analyze) and return immediately.
+    The job is processed by job_worker processes and survives client disconnects;
+    poll GET /jobs/{job_id} for progress and per-page results.
+    """
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Unauthorized - Please login")
+    
+    pages_info = parse_pages_data(pages_data)
+    uploads = [(img.filename, img.digest) for img in await spool_page_images(files)]
+    
+    username = request.session.get('username', 'unknown')
+    job_id = await blocking_pool.run(job_store.enqueue, username, pages_info, uploads, issue_mode, issue_title)
+    return {"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
+
+@app.get("/jobs/{job_id}")
+async def get_job(request: Request, job_id: str):
+    """
+    Job status: queued / running / done / failed, per-page stage (vision / rag / render / done)
+    and results (same shape as /analyze results; None for pages that are not finished yet).
+    """
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Unauthorized - Please login")
+    
+    job = await blocking_pool.run(job_store.get, job_id)
+    if job is None or job.pop('username') != request.session.get('username', 'unknown'):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/metrics/jobs")
+async def job_metrics(request: Request):
+    """작업 큐 상태 (상태별 작업 수, 가장 오래 기다린 작업, 실행 중 작업자)"""
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Unauthorized - Please login")
+    metrics = await blocking_pool.run(job_store.metrics)
+    metrics["local_workers"] = worker_pool.alive()
+    return JSONResponse(metrics)
+
+@app.post("/edit")
+async def edit_pages(
+    request: Request,
+    files: List[UploadFile] = File(default=None),
+    pages_data: str = Form(...)
+):
+    """
+    Incremental re-render of previously analyzed pages.
+    Same form as /analyze. Each page is diffed against the stored previous request for
+    (user, page id); cached analysis, RAG results and LangGraph node outputs are reused
+    and only the steps that depend on changed fields run again.
+    Pages without 'image_indices' keep their previous images.
+    """
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Unauthorized - Please login")
+    
+    pages_info = parse_pages_data(pages_data)
+    username = request.session.get('username', 'unknown')
+    memory_tracker.start_request(f"edit:{username}")
+    images_by_page = await load_page_images(files, pages_info)
+
+    token_budget.start_request(f"edit:{username}")
+    
+    async def edit(page):
+        page_id = page.get('id')
+        previous = edit_store.get(username, page_id)
+        if previous is None:
+            print(f"✏️  [Edit] No previous render for page {page_id}, running full pipeline", file=sys.stderr)
+        
+        if 'image_indices' in page or previous is None:
+            page_images = images_by_page.get(page_id, [])
+        else:
+            # 이미지 재업로드 없이 텍스트만 수정한 경우 (spool 된 원본을 그대로 사용)
+            page_images = previous['images']
+        issue_style = previous.get('issue_style') if previous else None
+        return await process_page(page, page_images, username, previous, issue_style=issue_style)
+    
+    results = await run_pages([lambda page=page: edit(page) for page in pages_info])
     
+    token_budget.report()
+    memory_tracker.report()
     return {"results": results}
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    # AURA_WEB_WORKERS > 1 이면 작업자 프로세스 여러 개로 실행 (reload 는 단일 프로세스에서만)
+    web_workers = int(os.getenv("AURA_WEB_WORKERS", "1"))
+    if web_workers > 1:
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=web_workers)
+    else:
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
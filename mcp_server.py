@@ -13,18 +13,19 @@ import os
 from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from llm_gateway import llm_gateway
 
 # Load environment variables (for API Key)
 load_dotenv()
 
 # Mock Config or Real Config
 class MockConfig:
-    def get_llm(self):
+    def get_llm(self, api_key=None):
         from langchain_google_genai import ChatGoogleGenerativeAI
         import os
         return ChatGoogleGenerativeAI(
             model="gemini-2.5-pro",
-            google_api_key=os.getenv("GOOGLE_API_KEY")
+            google_api_key=api_key or os.getenv("GOOGLE_API_KEY")
         )
 config = MockConfig()
 
@@ -60,8 +61,6 @@ def generate_magazine_layout(
     image_count = len(images_list)
     print(f"🍌 [NanoBanana] Detected {image_count} images.", file=sys.stderr)
 
-    llm = config.get_llm()
-
     # 🔧 JSON 파싱 및 구조화 (LLM이 이해할 수 있도록)
     try:
         vision_data = json.loads(vision_context) if vision_context != "{}" else {}
@@ -482,19 +481,23 @@ def generate_magazine_layout(
     """
 
     prompt = ChatPromptTemplate.from_template(prompt_text)
-    chain = prompt | llm | StrOutputParser()
+    inputs = {
+        "headline": headline,
+        "body": body,
+        "image_count": image_count,
+        "image_placeholders": str(images_list),
+        "layout_override": layout_override,    # COVER or ARTICLE
+        "vision_summary": vision_summary,      # 구조화된 텍스트
+        "design_summary": design_summary,      # 구조화된 텍스트
+        "layout_summary": layout_summary       # 구조화된 텍스트
+    }
 
     try:
-        html = chain.invoke({
-            "headline": headline,
-            "body": body,
-            "image_count": image_count,
-            "image_placeholders": str(images_list),
-            "layout_override": layout_override,    # COVER or ARTICLE
-            "vision_summary": vision_summary,      # 구조화된 텍스트
-            "design_summary": design_summary,      # 구조화된 텍스트
-            "layout_summary": layout_summary       # 구조화된 텍스트
-        })
+        # 키별 TPM 집계용 예상 토큰 수 (약 4자 = 1토큰, 출력 HTML 약 4000 토큰)
+        tokens = len(prompt.format(**inputs)) // 4 + 4000
+        with llm_gateway.slot("gemini", "single_prompt_layout", tokens=tokens) as lease:
+            chain = prompt | config.get_llm(api_key=lease.api_key) | StrOutputParser()
+            html = chain.invoke(inputs)
         
         print(f"🍌 [NanoBanana] Generated HTML Length: {len(html)} chars", file=sys.stderr)
         return html.replace("```html", "").replace("```", "").strip()
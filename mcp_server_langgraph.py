@@ -8,13 +8,28 @@ except ImportError:
     exit(1)
 
 import json
+import operator
+import re
 import sys
 import os
-from typing import TypedDict, List, Optional, Annotated
+from typing import TypedDict, List, Optional, Annotated, Dict, Any
 from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser, JsonOutputParser
 from langgraph.graph import StateGraph, END
+try:
+    from langgraph.types import Send
+except ImportError:  # langgraph < 0.2
+    from langgraph.constants import Send
+from token_budget import token_budget, estimate_tokens
+from html_analyzer import analyze_html
+from layout_estimator import layout_estimator
+from prompt_cache import prompt_cache, full_prompt_chain
+from pipeline_router import pipeline_router, page_bucket
+from retry_policy import retry_policy, issue_kinds
+from image_validator import image_validator
+from llm_gateway import llm_gateway
+from mcp_server import generate_magazine_layout as generate_single_prompt_layout
 
 load_dotenv()
 
@@ -22,16 +37,32 @@ load_dotenv()
 # LLM Configuration
 # ============================================================
 class MockConfig:
-    def get_llm(self, temperature=0.7):
+    model_name = "gemini-2.5-flash"
+
+    def get_llm(self, temperature=0.7, api_key=None, **kwargs):
+        """api_key: llm_gateway 가 배정한 키 (없으면 GOOGLE_API_KEY)"""
         from langchain_google_genai import ChatGoogleGenerativeAI
         return ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
-            temperature=temperature
+            model=self.model_name,
+            google_api_key=api_key or os.getenv("GOOGLE_API_KEY"),
+            temperature=temperature,
+            **kwargs
         )
 
 config = MockConfig()
 
+
+def prompt_tokens(prompt: ChatPromptTemplate, inputs: dict, output_tokens: int) -> int:
+    """llm_gateway 키별 TPM 집계용 예상 토큰 수"""
+    return estimate_tokens(prompt.format(**inputs)) + output_tokens
+
+# 품질 검사 실패 시 html_generator 최대 재시도 횟수
+# 모든 시도의 점수를 비교해 가장 좋은 HTML 을 채택하므로 1회로도 품질이 유지됨
+MAX_RETRIES = int(os.getenv("AURA_MAX_RETRIES", "1"))
+
+# variants=N 생성 시 한 번에 만들 수 있는 최대 변형 수
+MAX_VARIANTS = 4
+
 # ============================================================
 # State Definition
 # ============================================================
@@ -45,10 +76,19 @@ class MagazineState(TypedDict):
     vision_summary: str
     design_summary: str
     layout_summary: str
+    image_features: Optional[List[Optional[dict]]]  # image_validator.compute_features 결과 (이미지 순서)
+    typography_override: Optional[dict]  # 페이지별 style_override (typography_style 위에 덮어씀)
     
     # Retry Control
-    retry_count: int                  # 재시도 횟수 (max 3)
+    retry_count: int                  # 재시도 횟수 (max MAX_RETRIES)
     quality_fix_hints: Optional[str]  # 품질 검사 실패 시 수정 힌트
+    retry_targets: Optional[List[str]]  # 직전 재시도가 고치려던 이슈 종류 (retry_policy 기록용)
+    attempts: List[dict]              # 시도별 HTML + 품질 지표 (best-of-attempts 선택용)
+    
+    # Variants (상위 노드 1회 실행 후 html_generator 분기 N개)
+    variant_index: int
+    variant_count: int
+    variants: Annotated[List[dict], operator.add]  # 분기별 결과 (병렬 분기 결과를 합침)
     
     # Node Outputs
     image_analysis: Optional[dict]
@@ -67,81 +107,100 @@ class MagazineState(TypedDict):
 # ============================================================
 # NODE 1: Image Analyzer
 # ============================================================
-def image_analyzer_node(state: MagazineState) -> MagazineState:
-    """이미지 분석 및 HERO 이미지 결정"""
-    llm = config.get_llm(temperature=0.3)
-    
-    prompt = ChatPromptTemplate.from_template("""
-You are an image placement analyzer for magazine layouts.
-
-Image Count: {image_count}
-Vision Context: {vision_summary}
-Page Type: {layout_override}
-
-Analyze and decide:
-1. Which image should be the HERO (most prominent)?
-2. What is the optimal placement order?
-3. What sizes should each image have?
+def plan_image_placements(ranking: dict, image_count: int) -> dict:
+    """HERO/순서 결정을 image_analysis 스키마(placements, layout_recommendation)로 변환"""
+    order = ranking.get("image_order") or list(range(image_count))
+    budget = image_height_budget(image_count)
+    hero_height = int(budget * (0.55 if image_count == 1 else 0.4 if image_count == 2 else 0.3))
+    other_height = min(int(hero_height * 0.75), (budget - hero_height) // max(image_count - 1, 1))
+    positions = ["top-right", "middle-right", "bottom-right", "bottom-left", "bottom-center"]
+
+    placements = {}
+    for rank, index in enumerate(order):
+        placements[str(index)] = {
+            "position": positions[min(rank, len(positions) - 1)],
+            "size": "large" if rank == 0 else "medium" if rank == 1 else "small",
+            "height": f"{hero_height if rank == 0 else other_height}px",
+        }
+    if image_count >= 3:
+        recommendation = f"multi-column for {image_count} images, HERO #{order[0]} on top"
+    else:
+        recommendation = f"float layout with HERO #{order[0] if order else 0}"
+    return {
+        "hero_image_index": ranking.get("hero_image_index", 0),
+        "image_order": order,
+        "placements": placements,
+        "layout_recommendation": recommendation,
+    }
 
-🖼️ **IMAGE IMPACT ANALYSIS**:
-- Identify the HERO image (most expressive face, dramatic pose, direct eye contact)
-- Place HERO image in the MOST PROMINENT position (top-right or top-center)
-- Supporting images (group shots, events) go in smaller slots or bottom row
-- For portraits: the one with the most engaging expression = HERO
 
-Return JSON only:
-{{
-    "hero_image_index": 0,
-    "image_order": [0, 1, 2, 3, 4],
-    "placements": {{
-        "0": {{"position": "top-right", "size": "large", "height": "280px"}},
-        "1": {{"position": "middle-right", "size": "medium", "height": "220px"}}
-    }},
-    "layout_recommendation": "multi-column for 5 images with long text"
-}}
-""")
-    
-    try:
-        chain = prompt | llm | StrOutputParser()
-        result = chain.invoke({
-            "image_count": state["image_count"],
-            "vision_summary": state["vision_summary"],
-            "layout_override": state["layout_override"]
-        })
-        
-         # Parse JSON from result
-        import re
-        json_match = re.search(r'\{.*\}', result, re.DOTALL)
-        if json_match:
-            analysis = json.loads(json_match.group())
+def image_analyzer_node(state: MagazineState) -> MagazineState:
+    """
+    이미지 분석 및 HERO 이미지 결정
+    업로드 시 image_validator 가 계산한 특징(크기/비율/선명도/시선 집중도)으로 로컬에서 결정 (LLM 호출 없음)
+    """
+    if state.get("image_analysis") is not None:
+        analysis = state["image_analysis"]
+        if "placements" not in analysis:
+            # 병합 분석(HERO/순서만 전달)의 결과를 전체 스키마로 보완
+            analysis = plan_image_placements(analysis, state["image_count"])
+            state["image_analysis"] = analysis
+            print(f"♻️  [Node 1] Using upstream HERO #{analysis['hero_image_index']}, order {analysis['image_order']}", file=sys.stderr)
         else:
-            analysis = {"hero_image_index": 0, "image_order": list(range(state["image_count"]))}
-        
-        hero_idx = analysis.get('hero_image_index', 0)
-        image_order = analysis.get('image_order', [])
-        layout_rec = analysis.get('layout_recommendation', 'default')
-
-        print(f"🖼️  [Node 1] Image Analyzer: Analyzing {state['image_count']} image(s)...", file=sys.stderr)
-        print(f"   🌟 HERO Image: #{hero_idx}", file=sys.stderr)
-        print(f"   📐 Image Order: {image_order}", file=sys.stderr)
-        print(f"   💡 Recommendation: {layout_rec[:50]}...", file=sys.stderr)
-        print(f"   ✅ Result: IMAGE_ANALYSIS_COMPLETE", file=sys.stderr)
-        
-        state["image_analysis"] = analysis
-        
-    except Exception as e:
-        print(f"   ⚠️ Error: {e}", file=sys.stderr)
-        print(f"   🔄 Using fallback: HERO=#0, Sequential order", file=sys.stderr)
-        state["image_analysis"] = {"hero_image_index": 0, "image_order": list(range(state["image_count"]))}
-    
+            print("♻️  [Node 1] Reusing image analysis from previous render", file=sys.stderr)
+        return state
+
+    image_count = state["image_count"]
+    features = list(state.get("image_features") or [])
+    features = (features + [None] * image_count)[:image_count]
+    ranking = image_validator.rank_images(features, state["layout_override"])
+    analysis = plan_image_placements(ranking, image_count)
+
+    source = "image features" if any(features) else "no features, upload order"
+    print(f"🖼️  [Node 1] Image Analyzer: Ranking {image_count} image(s) locally ({source})...", file=sys.stderr)
+    print(f"   🌟 HERO Image: #{analysis['hero_image_index']}", file=sys.stderr)
+    print(f"   📐 Image Order: {analysis['image_order']} (scores {ranking.get('scores')})", file=sys.stderr)
+    print(f"   ✅ Result: IMAGE_ANALYSIS_COMPLETE", file=sys.stderr)
+
+    state["image_analysis"] = analysis
     return state
 
 # ============================================================
 # NODE 2: Layout Planner
 # ============================================================
+def fit_text_size(plan: Dict[str, Any], body: str, image_count: int) -> Dict[str, Any]:
+    """
+    생성 전 본문 크기 결정: 레이아웃별 본문 폭/단 수에서 페이지 안에 들어가는 가장 큰 text-*
+    LLM 이 고른 text_size 가 넘칠 것으로 추정되면 추천값으로 교체
+    """
+    if plan.get("layout_type") == "cover" or not body:
+        return plan
+
+    content_width = 794 - 48          # p-6 wrapper
+    content_height = 1123 - 150       # 헤더/하단 여백 제외
+    if plan.get("layout_type") == "multi-column":
+        # 60% 텍스트 columns-2 + 40% 이미지 세로 배치
+        text_width, columns, available = content_width * 0.6, 2, content_height
+    else:
+        text_width, columns = content_width, 1
+        available = content_height - image_count * image_height_budget(image_count) // 2
+
+    recommended = layout_estimator.recommend_text_size(body, text_width, columns, max(available, 200))
+    order = ["text-[10px]", "text-[11px]", "text-xs", "text-sm", "text-base", "text-lg"]
+    chosen = plan.get("text_size")
+    if chosen not in order or order.index(chosen) > order.index(recommended):
+        print(f"📐 [Node 2] text_size {chosen} -> {recommended} (font-metric fit)", file=sys.stderr)
+        plan["text_size"] = recommended
+    return plan
+
+
 def layout_planner_node(state: MagazineState) -> MagazineState:
     """페이지 그리드 구조 결정"""
-    llm = config.get_llm(temperature=0.3)
+    if state.get("layout_plan") is not None:
+        # 재사용 시에도 본문 크기 맞춤은 다시 계산 (LLM 호출 없음)
+        print("♻️  [Node 2] Reusing layout plan from previous render", file=sys.stderr)
+        state["layout_plan"] = fit_text_size(dict(state["layout_plan"]), state["body"], state["image_count"])
+        return state
     
     body_length = len(state["body"])
     image_count = state["image_count"]
@@ -210,14 +269,21 @@ Return JSON with your decision:
 """)
     
     try:
-        chain = prompt | llm | StrOutputParser()
-        result = chain.invoke({
+        # 본문은 길이만 필요 (length_only 정책)
+        budgeted = token_budget.apply("layout_planner", {
+            "body": state["body"],
+            "image_analysis": state.get("image_analysis") or {}
+        })
+        inputs = {
             "image_count": image_count,
-            "body_length": body_length,
+            "body_length": budgeted["body"],
             "layout_override": layout_override,
-            "image_analysis": json.dumps(state.get("image_analysis", {})),
+            "image_analysis": budgeted["image_analysis"],
             "image_placeholders": str(state["image_placeholders"])
-        })
+        }
+        with llm_gateway.slot("gemini", "layout_planner", tokens=prompt_tokens(prompt, inputs, 500)) as lease:
+            chain = prompt | config.get_llm(temperature=0.3, api_key=lease.api_key) | StrOutputParser()
+            result = chain.invoke(inputs)
         
         # Debug: Show raw LLM response
         print(f"📐 [Node 2] Raw Response: {result[:200]}...", file=sys.stderr)
@@ -236,7 +302,7 @@ Return JSON with your decision:
                 plan = {"layout_type": "float", "text_size": "text-base"}
         
         print(f"📐 [Node 2] Layout Plan: {plan.get('layout_type', 'unknown')}, reasoning: {plan.get('reasoning', 'none')}", file=sys.stderr)
-        state["layout_plan"] = plan
+        state["layout_plan"] = fit_text_size(plan, state["body"], image_count)
         
     except Exception as e:
         print(f"⚠️ [Node 2] Error: {e}", file=sys.stderr)
@@ -244,7 +310,7 @@ Return JSON with your decision:
         if layout_override == "COVER":
             state["layout_plan"] = {"layout_type": "cover"}
         else:
-            state["layout_plan"] = {"layout_type": "float", "text_size": "text-base"}
+            state["layout_plan"] = fit_text_size({"layout_type": "float", "text_size": "text-base"}, state["body"], image_count)
     
     return state
 
@@ -253,13 +319,15 @@ Return JSON with your decision:
 # ============================================================
 def typography_styler_node(state: MagazineState) -> MagazineState:
     """폰트, 색상, 강조 스타일 결정"""
-    llm = config.get_llm(temperature=0.5)
+    if state.get("typography_style") is not None:
+        print("♻️  [Node 3] Reusing typography from previous render", file=sys.stderr)
+        return apply_typography_override(state)
     
     prompt = ChatPromptTemplate.from_template("""
 You are a typography and color specialist for magazines.
 
 Headline: {headline}
-Body (first 200 chars): {body_preview}
+Body (preview): {body_preview}
 Vision Context: {vision_summary}
 Design Spec: {design_summary}
 Page Type: {layout_override}
@@ -302,14 +370,17 @@ Return JSON only:
 """)
     
     try:
-        chain = prompt | llm | StrOutputParser()
-        result = chain.invoke({
+        budgeted = token_budget.apply("typography_styler", {"body": state["body"]})
+        inputs = {
             "headline": state["headline"],
-            "body_preview": state["body"][:200],
+            "body_preview": budgeted["body"],
             "vision_summary": state["vision_summary"],
             "design_summary": state["design_summary"],
             "layout_override": state["layout_override"]
-        })
+        }
+        with llm_gateway.slot("gemini", "typography_styler", tokens=prompt_tokens(prompt, inputs, 400)) as lease:
+            chain = prompt | config.get_llm(temperature=0.5, api_key=lease.api_key) | StrOutputParser()
+            result = chain.invoke(inputs)
         
         import re
         json_match = re.search(r'\{.*\}', result, re.DOTALL)
@@ -344,40 +415,30 @@ Return JSON only:
             "body_classes": "text-base leading-relaxed"
         }
     
+    return apply_typography_override(state)
+
+
+def apply_typography_override(state: MagazineState) -> MagazineState:
+    """페이지별 style_override 를 typography_style 에 덮어씀 (재사용한 결과에도 적용)"""
+    override = state.get("typography_override")
+    if override:
+        print(f"   🖌️ Style override: {sorted(override)}", file=sys.stderr)
+        state["typography_style"] = {**state["typography_style"], **override}
     return state
 
 # ============================================================
 # NODE 4: HTML Generator
 # ============================================================
-def html_generator_node(state: MagazineState) -> MagazineState:
-    """최종 HTML 생성"""
-    llm = config.get_llm(temperature=0.7)
-    
-    image_analysis = state.get("image_analysis", {})
-    layout_plan = state.get("layout_plan", {})
-    typography = state.get("typography_style", {})
-    
-    prompt = ChatPromptTemplate.from_template("""
+# 정적 규칙(프롬프트 prefix)은 모든 호출/재시도에서 동일하므로 provider-side context cache 대상
+# 템플릿 변수를 포함하지 않아야 캐시 키가 고정됩니다.
+HTML_GENERATOR_STATIC_RULES = """
 You are 'Nano Banana', a specialized AI for High-End Magazine HTML/CSS generation.
 Create a UNIQUE A4 layout (794px x 1123px) using Tailwind CSS.
 
-[INPUT DATA]
-- Headline: {headline}
-- Body: {body}
-- Image Count: {image_count}
-- Image Placeholders: {image_placeholders}
-- Page Type: {layout_override}
-
-[PREVIOUS NODES' DECISIONS - FOLLOW THESE]
-
-Image Analysis: {image_analysis}
-Layout Plan: {layout_plan}
-Typography Style: {typography}
-
 [ABSOLUTE RULES - NON-NEGOTIABLE]
 
 1. **IMAGE COUNT - MANDATORY** (MOST CRITICAL RULE):
-   - Create EXACTLY {image_count} <img> tags
+   - Create EXACTLY one <img> tag per image (Image Count in [INPUT DATA])
    - ⚠️ YOU MUST USE THESE EXACT src VALUES (copy-paste them):
      __IMAGE_0__, __IMAGE_1__, __IMAGE_2__, __IMAGE_3__, __IMAGE_4__
    - Example: <img src="__IMAGE_0__" class="..." />
@@ -520,7 +581,7 @@ FOR 3+ IMAGES with SHORT/MEDIUM text:
 [DESIGN GUIDELINES]
 
 🎯 **IMAGE-FIRST DESIGN STRATEGY**:
-Step 1: FIRST, place ALL {image_count} images on the page
+Step 1: FIRST, place ALL images on the page
         - Decide image positions and sizes BEFORE adding any text
 Step 2: THEN, fill the REMAINING space with text
         - If space is limited, use smaller font (text-xs or text-sm)
@@ -541,8 +602,8 @@ Step 2: THEN, fill the REMAINING space with text
 - **Asymmetric spacing**: Don't center everything - use left/right alignment
 
 [CREATIVE ELEMENTS]
-- Apply key phrase highlighting: {key_phrases}
-- Use accent color: {accent_color}
+- Apply key phrase highlighting to the Key Phrases given in [INPUT DATA]
+- Use the Accent Color given in [INPUT DATA]
 - Add premium touches from typography node
 
 [CREATIVE FREEDOM]
@@ -558,7 +619,7 @@ After drafting your HTML, mentally CHECK:
 
 ✅ **Checklist** (CHECK ALL BEFORE OUTPUT):
 0. 🔴 **NO OVERLAP**: Text-text, text-image, image-image - ZERO overlap allowed!
-1. Are ALL {image_count} images included? (Count them!)
+1. Are ALL images from [INPUT DATA] included? (Count them!)
 2. Is total content height ≤ 1100px? (Leave 23px margin)
 3. Is any content cut off at the bottom?
 4. Can EVERY text block be read clearly without obstruction?
@@ -569,14 +630,123 @@ After drafting your HTML, mentally CHECK:
 - Fix 2: Reduce text font size to text-xs
 - Fix 3: Apply line-clamp as last resort
 
-**CRITICAL**: ALL {image_count} images MUST be visible. NEVER omit images!
+**CRITICAL**: ALL images MUST be visible. NEVER omit images!
 
 [OUTPUT]
 Generate the complete HTML. Use wrapper:
 `<div class="w-[794px] h-[1123px] relative overflow-hidden bg-white text-slate-900 font-serif mx-auto shadow-2xl">`
 
 NO markdown blocks, just raw HTML.
-""")
+"""
+
+# 호출마다 달라지는 입력 (캐시 prefix 뒤에 전송)
+HTML_GENERATOR_INPUT_PROMPT = """
+[INPUT DATA]
+- Headline: {headline}
+- Body: {body}
+- Image Count: {image_count}
+- Image Placeholders: {image_placeholders}
+- Page Type: {layout_override}
+- Key Phrases: {key_phrases}
+- Accent Color: {accent_color}
+
+[PREVIOUS NODES' DECISIONS - FOLLOW THESE]
+
+Image Analysis: {image_analysis}
+Layout Plan: {layout_plan}
+Typography Style: {typography}
+
+Create EXACTLY {image_count} <img> tags. Generate the complete HTML now, following every rule above.
+"""
+
+# ============================================================
+# Streaming Guard: 생성 도중 실패가 확실한 출력을 조기 중단
+# ============================================================
+MAX_STREAM_ABORTS = 2          # 조기 중단 후 재생성 최대 횟수 (마지막 시도는 중단하지 않음)
+WRAPPER_DEADLINE_CHARS = 400   # 이 길이 안에 wrapper div 가 나와야 함
+REQUIRED_WRAPPER_CLASS = "w-[794px]"
+
+def image_height_budget(image_count: int) -> int:
+    """전체 이미지 높이 예산 (최대 700px for 3+ images)"""
+    return 700 if image_count >= 3 else 800
+
+class StreamGuard:
+    """
+    스트리밍 중인 HTML 을 누적하며 검사:
+    - 필수 wrapper div 가 시작 부분에 없으면 중단
+    - 완성된 <img> 태그의 h-[Npx] 누적 합이 예산을 넘으면 중단
+    """
+    IMG_TAG = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+    IMG_HEIGHT = re.compile(r'(?<![\w-])h-\[(\d+)px\]')
+
+    def __init__(self, image_count: int):
+        self.image_count = image_count
+        self.budget = image_height_budget(image_count)
+        self.buffer = ""
+        self.scan_pos = 0
+        self.total_image_height = 0
+        self.images_seen = 0
+        self.wrapper_seen = False
+        self.hint = ""
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """청크 추가 후 중단 사유 반환 (계속 진행이면 None)"""
+        self.buffer += chunk
+
+        if not self.wrapper_seen:
+            if REQUIRED_WRAPPER_CLASS in self.buffer:
+                self.wrapper_seen = True
+            elif len(self.buffer.replace("```html", "").strip()) > WRAPPER_DEADLINE_CHARS:
+                self.hint = (f'Start the HTML with the required wrapper <div class="{REQUIRED_WRAPPER_CLASS} '
+                             f'h-[1123px] relative overflow-hidden ...">')
+                return f"required wrapper div not found in first {WRAPPER_DEADLINE_CHARS} chars"
+
+        for match in self.IMG_TAG.finditer(self.buffer, self.scan_pos):
+            self.scan_pos = match.end()
+            self.images_seen += 1
+            self.total_image_height += sum(int(h) for h in self.IMG_HEIGHT.findall(match.group()))
+
+        if self.total_image_height > self.budget:
+            per_image = self.budget // max(self.image_count, 1)
+            self.hint = (f"Total image height must stay within {self.budget}px: "
+                         f"set EACH image to h-[{per_image}px] or smaller")
+            return (f"image heights reached {self.total_image_height}px after {self.images_seen} image(s) "
+                    f"(budget {self.budget}px)")
+        return None
+
+def _stream_html(build_chain, inputs: dict, guard: Optional[StreamGuard], tokens: int = 0) -> tuple:
+    """
+    스트리밍으로 HTML 생성. build_chain(api_key) 로 llm_gateway 가 배정한 키의 체인을 만듦
+    Returns: (html, abort_reason)
+    """
+    chunks = []
+    with llm_gateway.slot("gemini", "html_generator", tokens=tokens) as lease:
+        stream = build_chain(lease.api_key).stream(inputs)
+        try:
+            for chunk in stream:
+                chunks.append(chunk)
+                if guard is not None:
+                    reason = guard.feed(chunk)
+                    if reason:
+                        lease.mark_partial()
+                        return "".join(chunks), reason
+        finally:
+            # 중단 시 스트림을 닫아 남은 출력 토큰 생성을 멈춤
+            stream.close()
+    return "".join(chunks), None
+
+VARIANT_DIRECTIONS = [
+    "Mirror the arrangement: move the images to the opposite side of the text.",
+    "Change the split: one wide hero image across the top, body text below in columns-2.",
+    "Typography-led: larger headline block with a pull quote, images smaller and grouped.",
+]
+
+
+def html_generator_node(state: MagazineState) -> MagazineState:
+    """최종 HTML 생성"""
+    image_analysis = state.get("image_analysis", {})
+    layout_plan = state.get("layout_plan", {})
+    typography = state.get("typography_style", {})
     
     key_phrases = typography.get("key_phrases", [])
     accent_color = typography.get("accent_color", "text-red-600")
@@ -588,7 +758,7 @@ NO markdown blocks, just raw HTML.
     retry_instruction = ""
     if retry_count > 0 and quality_fix_hints:
         retry_instruction = f"""
-⚠️ **RETRY ATTEMPT {retry_count}/3** - Previous HTML failed quality check!
+⚠️ **RETRY ATTEMPT {retry_count}/{MAX_RETRIES}** - Previous HTML failed quality check!
 MUST FIX THESE ISSUES: {quality_fix_hints}
 
 APPLY THESE FIXES NOW:
@@ -597,22 +767,83 @@ APPLY THESE FIXES NOW:
 - If "use columns-2": wrap body text in columns-2 gap-4
 - Reduce total content to fit within 1100px height
 """
-        print(f"🔄 [Node 4] Retry {retry_count}/3 with hints: {quality_fix_hints}", file=sys.stderr)
+        print(f"🔄 [Node 4] Retry {retry_count}/{MAX_RETRIES} with hints: {quality_fix_hints}", file=sys.stderr)
+    
+    # 변형 분기: 같은 분석/계획/타이포그래피로 배치만 다르게
+    variant_index = state.get("variant_index", 0)
+    variant_count = state.get("variant_count", 1)
+    if variant_index > 0:
+        direction = VARIANT_DIRECTIONS[(variant_index - 1) % len(VARIANT_DIRECTIONS)]
+        retry_instruction += f"""
+🎨 **VARIANT {variant_index + 1}/{variant_count}** - Produce a visibly different layout from the default one.
+{direction}
+Keep the same body text, placeholders, typography and accent color.
+"""
     
     try:
-        chain = prompt | llm | StrOutputParser()
-        html = chain.invoke({
-            "headline": state["headline"],
+        # 본문은 전부 출력되어야 하므로 full, 이전 노드 JSON 은 compact 직렬화
+        budgeted = token_budget.apply("html_generator", {
             "body": state["body"],
+            "image_analysis": image_analysis or {},
+            "layout_plan": layout_plan or {},
+            "typography": typography or {}
+        })
+        inputs = {
+            "headline": state["headline"],
+            "body": budgeted["body"],
             "image_count": state["image_count"],
             "image_placeholders": str(state["image_placeholders"]),
             "layout_override": state["layout_override"],
-            "image_analysis": json.dumps(image_analysis) + retry_instruction,  # 힌트 추가
-            "layout_plan": json.dumps(layout_plan),
-            "typography": json.dumps(typography),
+            "image_analysis": budgeted["image_analysis"] + retry_instruction,  # 힌트 추가
+            "layout_plan": budgeted["layout_plan"],
+            "typography": budgeted["typography"],
             "key_phrases": str(key_phrases),
             "accent_color": accent_color
-        })
+        }
+        
+        # 정적 규칙은 context cache 로 재사용, 실패 시 전체 프롬프트로 자동 대체
+        temperature = 0.7 if variant_index == 0 else 0.9
+        use_cache, cached, chain_key = True, False, None
+
+        def build_chain(api_key):
+            nonlocal cached, chain_key
+            get_llm = lambda **kwargs: config.get_llm(temperature=temperature, api_key=api_key, **kwargs)
+            chain_key = api_key
+            if not use_cache:
+                return full_prompt_chain(HTML_GENERATOR_STATIC_RULES, HTML_GENERATOR_INPUT_PROMPT, get_llm)
+            chain, cached = prompt_cache.chain_for(
+                HTML_GENERATOR_STATIC_RULES, HTML_GENERATOR_INPUT_PROMPT, config.model_name, get_llm, api_key
+            )
+            return chain
+
+        # 정적 규칙 + 입력 + 출력(HTML 약 4000 토큰) - 키별 TPM 집계용
+        request_tokens = estimate_tokens(HTML_GENERATOR_STATIC_RULES + HTML_GENERATOR_INPUT_PROMPT) + sum(
+            estimate_tokens(str(value)) for value in inputs.values()
+        ) + 4000
+        abort_hints = []
+        base_instruction = inputs["image_analysis"]
+        for attempt in range(MAX_STREAM_ABORTS + 1):
+            # 마지막 시도는 guard 없이 끝까지 생성 (항상 HTML 을 돌려주기 위함)
+            guard = StreamGuard(state["image_count"]) if attempt < MAX_STREAM_ABORTS else None
+            if abort_hints:
+                inputs["image_analysis"] = base_instruction + "\n⚠️ PREVIOUS OUTPUT WAS ABORTED. MUST FIX: " + "; ".join(abort_hints)
+            try:
+                html, abort_reason = _stream_html(build_chain, inputs, guard, request_tokens)
+            except Exception as e:
+                if not cached:
+                    raise
+                prompt_cache.record_fallback(HTML_GENERATOR_STATIC_RULES, config.model_name, e, chain_key)
+                use_cache, cached = False, False
+                # 실패한 스트림의 누적 상태(버퍼, 이미지 높이, wrapper 확인)를 이어받지 않도록 새 guard 로 재시도
+                guard = StreamGuard(state["image_count"]) if guard is not None else None
+                html, abort_reason = _stream_html(build_chain, inputs, guard, request_tokens)
+            if not abort_reason:
+                break
+            print(f"✂️  [Node 4] Stream aborted after {len(html)} chars: {abort_reason}", file=sys.stderr)
+            abort_hints.append(guard.hint)
+        if cached:
+            # 캐시된 prefix 는 입력 토큰으로 다시 처리되지 않음
+            token_budget.measure("html_generator_cached_prefix", "", saved=estimate_tokens(HTML_GENERATOR_STATIC_RULES))
         
         html = html.replace("```html", "").replace("```", "").strip()
         print(f"📄 [Node 4] Generated HTML: {len(html)} chars", file=sys.stderr)
@@ -631,25 +862,24 @@ def validator_node(state: MagazineState) -> MagazineState:
     """생성된 HTML 검증"""
     html = state.get("html_output", "")
     image_count = state["image_count"]
+    analysis = analyze_html(html)  # quality checker 와 공유되는 단일 파싱 결과
     
     issues = []
     
     # Check 1: All images present
-    for i in range(image_count):
-        placeholder = f"__IMAGE_{i}__"
-        if placeholder not in html:
-            issues.append(f"Missing image: {placeholder}")
+    for i in analysis.missing_placeholders(image_count):
+        issues.append(f"Missing image: __IMAGE_{i}__")
     
     # Check 2: Check for obvious overlap indicators
-    if html.count("absolute") > 5:
+    if analysis.absolute_count > 5:
         issues.append("Too many absolute positions - potential overlap risk")
     
-    # Check 3: Check for bottom padding
-    if "pb-10" not in html and "pb-12" not in html and "pb-8" not in html:
+    # Check 3: Check for bottom padding (pb-8 이상)
+    if not analysis.has_bottom_padding(min_scale=8):
         issues.append("Missing bottom padding")
     
     # Check 4: Basic structure
-    if "<img" not in html:
+    if not analysis.images:
         issues.append("No <img> tags found at all")
     
     passed = len(issues) == 0
@@ -658,7 +888,7 @@ def validator_node(state: MagazineState) -> MagazineState:
         "passed": passed,
         "issues": issues,
         "image_count_expected": image_count,
-        "image_count_found": html.count("__IMAGE_")
+        "image_count_found": analysis.placeholder_mentions
     }
     
     if passed:
@@ -674,6 +904,21 @@ def validator_node(state: MagazineState) -> MagazineState:
 # ============================================================
 # NODE 6: HTML Quality Checker (LLM-based)
 # ============================================================
+def attempt_score(attempt: dict) -> tuple:
+    """시도 점수 (작을수록 좋음): 통과 > 이슈 수 > 오버플로우(px) > 85% 미달 fill rate"""
+    return (
+        0 if attempt["passed"] else 1,
+        attempt["issue_count"],
+        attempt["overflow"],
+        max(0.0, 85 - attempt["fill_rate"]),
+    )
+
+
+def select_best_attempt(attempts: List[dict]) -> dict:
+    """모든 시도 중 점수가 가장 좋은 시도 (동점이면 먼저 생성된 시도)"""
+    return min(attempts, key=attempt_score)
+
+
 def html_quality_checker_node(state: MagazineState) -> MagazineState:
     """
     HTML 품질 검수 - 상세 분석 및 구체적 수정 지시 제공
@@ -682,27 +927,23 @@ def html_quality_checker_node(state: MagazineState) -> MagazineState:
     - 텍스트 크기 분석
     - 페이지 오버플로우 예측
     """
-    import re
-    
     html = state.get("html_output", "")
     image_count = state["image_count"]
     body_length = len(state.get("body", ""))
+    analysis = analyze_html(html)
     
     issues = []
     fixes = []
     
     # ============ 1. 이미지 플레이스홀더 검사 ============
-    missing_images = []
-    for i in range(image_count):
-        if f"__IMAGE_{i}__" not in html:
-            missing_images.append(i)
+    missing_images = analysis.missing_placeholders(image_count)
     if missing_images:
         issues.append(f"Missing image placeholders: {missing_images}")
         fixes.append(f"Add <img> tags for images: {missing_images}")
     
     # ============ 2. 이미지 높이 상세 분석 ============
-    height_pattern = r'h-\[(\d+)px\]'
-    heights = [int(h) for h in re.findall(height_pattern, html)]
+    # <img> 요소의 높이만 집계 (wrapper 의 h-[1123px] 등은 제외)
+    heights = analysis.image_heights()
     total_image_height = sum(heights) if heights else 0
     avg_image_height = total_image_height // len(heights) if heights else 0
     
@@ -726,23 +967,21 @@ def html_quality_checker_node(state: MagazineState) -> MagazineState:
         fixes.append(f"Reduce ALL image heights to h-[{max_h}px] or smaller")
     
     # 전체 이미지 높이 예산 (최대 700px for 3+ images)
-    max_total_image_height = 700 if image_count >= 3 else 800
+    max_total_image_height = image_height_budget(image_count)
     if total_image_height > max_total_image_height:
-        per_image_target = max_total_image_height // image_count
+        per_image_target = max_total_image_height // max(image_count, 1)
         issues.append(f"Total image height {total_image_height}px > {max_total_image_height}px budget")
         fixes.append(f"Set EACH image to h-[{per_image_target}px]")
     
     # ============ 3. 패딩/마진 검사 ============
-    # 과도한 패딩 감지
-    large_padding_pattern = r'p-(\d+)'
-    paddings = [int(p) for p in re.findall(large_padding_pattern, html)]
+    # 과도한 패딩 감지 (p-N 유틸리티만, top-4 등은 제외)
+    paddings = analysis.scales("p")
     
     if any(p >= 8 for p in paddings):
         issues.append("Container padding too large (p-8 or larger)")
         fixes.append("Use p-4 or p-6 for container padding")
     
-    large_margin_pattern = r'mb-(\d+)'
-    margins = [int(m) for m in re.findall(large_margin_pattern, html)]
+    margins = analysis.scales("mb")
     
     if any(m >= 6 for m in margins):
         issues.append("Element margins too large (mb-6 or larger)")
@@ -752,17 +991,17 @@ def html_quality_checker_node(state: MagazineState) -> MagazineState:
     # 본문 길이별 권장 폰트
     if body_length > 2000:
         recommended_font = "text-[10px]"
-        if 'text-[10px]' not in html and 'text-xs' not in html:
+        if not analysis.uses('text-[10px]', 'text-xs'):
             issues.append(f"Very long body ({body_length} chars) needs tiny font")
             fixes.append(f"Use {recommended_font} for body text with leading-tight")
     elif body_length > 1500:
         recommended_font = "text-xs"
-        if 'text-xs' not in html and 'text-[10px]' not in html:
+        if not analysis.uses('text-xs', 'text-[10px]'):
             issues.append(f"Long body ({body_length} chars) needs smaller font")
             fixes.append(f"Use {recommended_font} for body text")
     elif body_length > 1000:
         recommended_font = "text-sm"
-        if 'text-sm' not in html and 'text-xs' not in html:
+        if not analysis.uses('text-sm', 'text-xs'):
             issues.append(f"Medium body ({body_length} chars) needs smaller font")
             fixes.append(f"Use {recommended_font} for body text")
     
@@ -772,21 +1011,10 @@ def html_quality_checker_node(state: MagazineState) -> MagazineState:
     # 사용 가능 콘텐츠 높이: 1123 - 120 - 30 = ~973px
     available_height = 973
     
-    # 텍스트 높이 계산
-    if 'text-[10px]' in html:
-        line_height = 14
-    elif 'text-xs' in html:
-        line_height = 16
-    elif 'text-sm' in html:
-        line_height = 20
-    else:
-        line_height = 24
-    
-    # 2컬럼 사용 시 줄 수 절반
-    is_two_column = 'columns-2' in html
-    chars_per_line = 120 if is_two_column else 60
-    estimated_lines = body_length / chars_per_line
-    text_height = int(estimated_lines * line_height)
+    # 텍스트 높이 계산: 실제 본문 폭/단 수/글자 크기로 글꼴 폭 기반 줄바꿈
+    text_estimate = layout_estimator.estimate(state.get("body", ""), analysis)
+    text_height = text_estimate["text_height"]
+    is_two_column = text_estimate["columns"] >= 2
     
     # 패딩 추정
     padding_estimate = sum(paddings) * 8 if paddings else 40  # 기본 40px
@@ -804,7 +1032,7 @@ def html_quality_checker_node(state: MagazineState) -> MagazineState:
             fixes.append(f"REDUCE each image to h-[{target_img_height}px]")
         if not is_two_column and body_length > 1000:
             fixes.append("Use columns-2 gap-3 for body text")
-        if 'text-xs' not in html and 'text-[10px]' not in html:
+        if not analysis.uses('text-xs', 'text-[10px]'):
             fixes.append("Use text-xs or text-[10px] for body")
     
     # ============ 6. UNDERFILL 검사 (페이지가 충분히 채워졌는지) ============
@@ -836,6 +1064,9 @@ def html_quality_checker_node(state: MagazineState) -> MagazineState:
             "image_heights": heights,
             "total_image_height": total_image_height,
             "text_height": text_height,
+            "text_lines": text_estimate["lines"],
+            "text_column_width": text_estimate["column_width"],
+            "text_font_px": text_estimate["font_px"],
             "padding_estimate": padding_estimate,
             "estimated_content_height": estimated_content_height,
             "available_height": available_height,
@@ -843,20 +1074,51 @@ def html_quality_checker_node(state: MagazineState) -> MagazineState:
         }
     }
     
+    # ============ 재시도 결과 기록 / 최선 HTML 갱신 ============
+    kinds = issue_kinds(issues)
+    bucket = page_bucket(state.get("layout_override"), image_count, body_length)
+    if state.get("retry_targets"):
+        retry_policy.record(bucket, state["retry_targets"], kinds)
+        state["retry_targets"] = None
+    
+    attempts = (state.get("attempts") or []) + [{
+        "attempt": state.get("retry_count", 0),
+        "html": html,
+        "passed": passed,
+        "issue_count": len(issues),
+        "overflow": max(0, estimated_content_height - available_height),
+        "fill_rate": result["metrics"]["fill_rate"],
+    }]
+    state["attempts"] = attempts
+    
     if passed:
         print(f"✅ [Node 6] HTML Quality Check: PASSED", file=sys.stderr)
         state["final_html"] = html
     else:
         retry_count = state.get("retry_count", 0)
-        print(f"⚠️ [Node 6] HTML Quality Check: {len(issues)} issues found (retry {retry_count}/3)", file=sys.stderr)
+        print(f"⚠️ [Node 6] HTML Quality Check: {len(issues)} issues found (retry {retry_count}/{MAX_RETRIES})", file=sys.stderr)
         for issue in issues:
             print(f"   - {issue}", file=sys.stderr)
         print(f"   Suggested fixes: {fixes}", file=sys.stderr)
         
-        # Max retries 도달 시 현재 HTML을 final_html로 설정
-        if retry_count >= 3:
-            print(f"⚠️ [Node 6] Max retries reached. Accepting current HTML as final.", file=sys.stderr)
-            state["final_html"] = html
+        # Max retries 도달 시 지금까지 가장 좋은 HTML을 final_html로 설정
+        if retry_count >= MAX_RETRIES:
+            best = select_best_attempt(attempts)
+            print(f"⚠️ [Node 6] Max retries reached. Accepting attempt {best['attempt']} "
+                  f"({best['issue_count']} issues, fill {best['fill_rate']}%) of {len(attempts)}.", file=sys.stderr)
+            state["final_html"] = best["html"]
+            result["selected_attempt"] = best["attempt"]
+        else:
+            # 과거 해결률로 재시도 성공 확률 예측
+            retry, predicted, reason = retry_policy.should_retry(bucket, kinds)
+            result["retry_decision"] = {"retry": retry, "predicted_success": round(predicted, 3), "reason": reason}
+            if retry:
+                state["retry_targets"] = kinds
+            else:
+                best = select_best_attempt(attempts)
+                print(f"⏭️  [Node 6] Skipping retry: {reason}. Accepting attempt {best['attempt']}.", file=sys.stderr)
+                state["final_html"] = best["html"]
+                result["selected_attempt"] = best["attempt"]
         
         state["quality_fix_hints"] = "; ".join(fixes)
         state["retry_count"] = retry_count + 1
@@ -871,42 +1133,83 @@ def html_quality_checker_node(state: MagazineState) -> MagazineState:
 def quality_check_router(state: MagazineState) -> str:
     """
     HTML 품질 검사 결과에 따라 다음 노드 결정:
-    - PASSED 또는 retry >= 3: END
-    - FAILED 및 retry < 3: html_generator로 재시도
+    - PASSED 또는 retry >= MAX_RETRIES: END (가장 좋은 시도 채택)
+    - 재시도 성공 확률이 낮다고 예측됨 (retry_policy): END
+    - FAILED 및 retry < MAX_RETRIES: html_generator로 재시도
     """
     quality_result = state.get("html_quality_check", {})
     retry_count = state.get("retry_count", 0)
     
     if quality_result.get("passed", False):
         return "end"
-    elif retry_count >= 3:
-        print(f"🔚 [Router] Max retries (3) reached. Ending workflow.", file=sys.stderr)
+    elif quality_result.get("retry_decision", {}).get("retry") is False:
+        print("🔚 [Router] Retry skipped by learned policy. Ending workflow.", file=sys.stderr)
+        return "end"
+    elif retry_count > MAX_RETRIES:
+        # checker 가 retry_count 를 증가시킨 뒤이므로 > 비교 (마지막 시도 결과까지 검사 후 종료)
+        print(f"🔚 [Router] Max retries ({MAX_RETRIES}) reached. Ending workflow.", file=sys.stderr)
         return "end"
     else:
-        print(f"🔄 [Router] Retrying HTML generation... (attempt {retry_count + 1}/3)", file=sys.stderr)
+        print(f"🔄 [Router] Retrying HTML generation... (attempt {retry_count}/{MAX_RETRIES})", file=sys.stderr)
         return "retry"
 
 # ============================================================
-# Build LangGraph
+# Variants: 상위 노드 결과를 공유하는 html_generator 분기
 # ============================================================
-def build_magazine_graph():
+def fan_out_variants(state: MagazineState) -> List[Send]:
+    """typography_styler 이후 variant_count 개의 render_variant 분기를 동시에 실행"""
+    count = max(1, min(state.get("variant_count", 1), MAX_VARIANTS))
+    if count > 1:
+        print(f"🔀 [Variants] Rendering {count} variants from shared upstream results", file=sys.stderr)
+    return [Send("render_variant", {**state, "variant_index": i, "variants": []}) for i in range(count)]
+
+
+def render_variant_node(state: MagazineState) -> dict:
+    """분기 1개: html_generator → validator → html_quality_checker (재시도 포함)"""
+    final_state = variant_graph.invoke(state)
+    quality = final_state.get("html_quality_check") or {}
+    return {"variants": [{
+        "index": state.get("variant_index", 0),
+        "html": final_state.get("final_html") or final_state.get("html_output", ""),
+        "validation": final_state.get("validation_result") or {},
+        "quality": quality,
+        "attempts": len(final_state.get("attempts") or []),
+    }]}
+
+
+def variant_score(variant: dict) -> tuple:
+    quality = variant["quality"]
+    metrics = quality.get("metrics", {})
+    return attempt_score({
+        "passed": quality.get("passed", False),
+        "issue_count": len(quality.get("issues", [])),
+        "overflow": max(0, metrics.get("estimated_content_height", 0) - metrics.get("available_height", 0)),
+        "fill_rate": metrics.get("fill_rate", 0),
+    })
+
+
+def collect_variants_node(state: MagazineState) -> dict:
+    """분기 결과를 index 순서로 정리하고 가장 좋은 변형을 final_html 로 설정"""
+    variants = sorted(state.get("variants") or [], key=lambda v: v["index"])
+    if not variants:
+        return {}
+    best = min(variants, key=variant_score)
+    if len(variants) > 1:
+        print(f"🔀 [Variants] Collected {len(variants)} variants, best: #{best['index']}", file=sys.stderr)
+    return {
+        "final_html": best["html"],
+        "validation_result": best["validation"],
+        "html_quality_check": best["quality"],
+    }
+
+
+def build_variant_graph():
     graph = StateGraph(MagazineState)
-    
-    # Processing nodes (Intent and Filter now run in main.py)
-    graph.add_node("image_analyzer", image_analyzer_node)
-    graph.add_node("layout_planner", layout_planner_node)
-    graph.add_node("typography_styler", typography_styler_node)
     graph.add_node("html_generator", html_generator_node)
     graph.add_node("validator", validator_node)
     graph.add_node("html_quality_checker", html_quality_checker_node)
     
-    # Entry point (starts with Image Analyzer)
-    graph.set_entry_point("image_analyzer")
-    
-    # Processing edges
-    graph.add_edge("image_analyzer", "layout_planner")
-    graph.add_edge("layout_planner", "typography_styler")
-    graph.add_edge("typography_styler", "html_generator")
+    graph.set_entry_point("html_generator")
     graph.add_edge("html_generator", "validator")
     graph.add_edge("validator", "html_quality_checker")
     
@@ -922,41 +1225,67 @@ def build_magazine_graph():
     
     return graph.compile()
 
-# Global graph instance
+# ============================================================
+# Build LangGraph
+# ============================================================
+def build_magazine_graph():
+    graph = StateGraph(MagazineState)
+    
+    # Processing nodes (Intent and Filter now run in main.py)
+    graph.add_node("image_analyzer", image_analyzer_node)
+    graph.add_node("layout_planner", layout_planner_node)
+    graph.add_node("typography_styler", typography_styler_node)
+    graph.add_node("render_variant", render_variant_node)      # html_generator → validator → quality checker
+    graph.add_node("collect_variants", collect_variants_node)
+    
+    # Entry point (starts with Image Analyzer)
+    graph.set_entry_point("image_analyzer")
+    
+    # Processing edges
+    graph.add_edge("image_analyzer", "layout_planner")
+    graph.add_edge("layout_planner", "typography_styler")
+    # 상위 노드는 1회, 생성/검증 분기는 variant_count 개 병렬 실행
+    graph.add_conditional_edges("typography_styler", fan_out_variants, ["render_variant"])
+    graph.add_edge("render_variant", "collect_variants")
+    graph.add_edge("collect_variants", END)
+    
+    return graph.compile()
+
+# Global graph instances
+variant_graph = build_variant_graph()
 magazine_graph = build_magazine_graph()
 
+def check_html_quality(html: str, body: str, image_count: int) -> dict:
+    """그래프 밖(단일 프롬프트 경로)에서 생성된 HTML 에 Validator / Quality Checker 만 실행"""
+    state = {
+        "body": body,
+        "image_count": image_count,
+        "html_output": html,
+        "retry_count": 0,
+        "quality_fix_hints": None
+    }
+    state = validator_node(state)
+    state = html_quality_checker_node(state)
+    return {
+        "validation": state["validation_result"],
+        "quality": state["html_quality_check"]
+    }
+
 # ============================================================
 # MCP Interface
 # ============================================================
 mcp = FastMCP("AURA Layout Service (LangGraph)")
 
-@mcp.tool()
-def generate_magazine_layout(
-    headline: str, 
-    body: str, 
-    image_data: str, 
-    layout_override: str = "None",
-    vision_context: str = "{}",
-    design_spec: str = "{}",
-    planner_intent: str = "{}"
-) -> str:
-    """
-    LangGraph 멀티 노드를 사용하여 동적으로 고품질 매거진 HTML을 생성합니다.
-    """
-    print(f"🍌 [AURA LangGraph] Generating Layout for: {headline[:20]}...", file=sys.stderr)
-
-    # Parse image data
-    images_list = []
+def parse_image_features(image_features: str) -> List[Optional[dict]]:
     try:
-        parsed = json.loads(image_data)
-        if isinstance(parsed, list):
-            images_list = parsed
-    except:
-        images_list = [image_data]
+        parsed = json.loads(image_features) if image_features else []
+    except json.JSONDecodeError:
+        return []
+    return parsed if isinstance(parsed, list) else []
 
-    image_count = len(images_list)
-    print(f"🍌 [AURA] Detected {image_count} images.", file=sys.stderr)
 
+def summarize_contexts(vision_context: str, design_spec: str, planner_intent: str):
+    """MCP 입력 JSON 을 노드 프롬프트용 요약 문자열로 변환"""
     # Parse contexts
     try:
         vision_data = json.loads(vision_context) if vision_context != "{}" else {}
@@ -988,6 +1317,85 @@ def generate_magazine_layout(
         spatial = plan_data.get('spatial_summary', 'Flexible layout')
         strategy = plan_data.get('suggested_strategy', 'Balanced')
         layout_summary = f"Strategy: {strategy}, Structure: {spatial}"
+    return vision_summary, design_summary, layout_summary
+
+
+@mcp.tool()
+def generate_magazine_layout(
+    headline: str, 
+    body: str, 
+    image_data: str, 
+    layout_override: str = "None",
+    vision_context: str = "{}",
+    design_spec: str = "{}",
+    planner_intent: str = "{}",
+    variants: int = 1,
+    reuse_context: str = "{}",
+    include_context: bool = False,
+    image_features: str = "[]",
+    body_summary: str = "",
+    typography_override: str = "{}"
+) -> str:
+    """
+    LangGraph 멀티 노드를 사용하여 동적으로 고품질 매거진 HTML을 생성합니다.
+    variants > 1 이면 상위 노드는 1회만 실행하고 HTML N개를 동시에 생성합니다.
+    reuse_context 에 이전 노드 결과(image_analysis, layout_plan, typography_style)가 있으면 해당 노드를 건너뜁니다.
+    image_features: 이미지별 특징 JSON 목록 (HERO/배치 순서 결정용)
+    body_summary: 호출 측에서 만든 본문 요약 (typography_styler 가 body 대신 사용, token_budget 참고)
+    typography_override: 페이지별 style_override JSON (typography_style 위에 덮어씀)
+
+    variants > 1 또는 include_context 이면 JSON 을 반환합니다:
+    {"html", "context": {...}, "best": index, "variants": [{"index", "html", "passed", "issues", "fill_rate"}, ...]}
+    """
+    print(f"🍌 [AURA LangGraph] Generating Layout for: {headline[:20]}...", file=sys.stderr)
+    token_budget.start_request(f"layout:{headline[:20]}")
+    token_budget.remember_summary(body, body_summary)
+
+    # Parse image data
+    images_list = []
+    try:
+        parsed = json.loads(image_data)
+        if isinstance(parsed, list):
+            images_list = parsed
+    except:
+        images_list = [image_data]
+
+    image_count = len(images_list)
+    print(f"🍌 [AURA] Detected {image_count} images.", file=sys.stderr)
+
+    # ============ Adaptive Routing: single-prompt vs multi-node ============
+    bucket = page_bucket(layout_override, image_count, len(body))
+    path, reason = pipeline_router.choose(layout_override, image_count, len(body))
+    print(f"🧭 [Router] Path: {path.upper()} - {reason}", file=sys.stderr)
+
+    try:
+        reuse = json.loads(reuse_context) if reuse_context and reuse_context != "{}" else {}
+    except json.JSONDecodeError:
+        reuse = {}
+    if reuse:
+        print(f"♻️  [AURA] Reusing node outputs: {sorted(reuse)}", file=sys.stderr)
+    try:
+        style_override = json.loads(typography_override) if typography_override else {}
+    except json.JSONDecodeError:
+        style_override = {}
+    if not isinstance(style_override, dict):
+        style_override = {}
+
+    if variants > 1 or reuse or style_override:
+        path = "graph"  # 변형 생성 / 노드 결과 재사용 / 스타일 override 는 그래프에서만 가능
+    if path == "single":
+        html = generate_single_prompt_layout(
+            headline, body, image_data, layout_override, vision_context, design_spec, planner_intent
+        )
+        check = check_html_quality(html, body, image_count)
+        pipeline_router.record("single", bucket, check["quality"]["passed"])
+        if check["validation"]["passed"]:
+            token_budget.report()
+            return json.dumps({"html": html, "context": {}}) if include_context else html
+        # 필수 검증(이미지 누락 등) 실패 시에만 그래프로 승격
+        print(f"🧭 [Router] Single-prompt output failed validation {check['validation']['issues']}, escalating to GRAPH", file=sys.stderr)
+
+    vision_summary, design_summary, layout_summary = summarize_contexts(vision_context, design_spec, planner_intent)
 
     # Build initial state
     initial_state: MagazineState = {
@@ -999,11 +1407,18 @@ def generate_magazine_layout(
         "vision_summary": vision_summary,
         "design_summary": design_summary,
         "layout_summary": layout_summary,
+        "image_features": parse_image_features(image_features),
+        "typography_override": style_override,
         "retry_count": 0,              # 재시도 카운터 초기화
         "quality_fix_hints": None,     # 품질 수정 힌트 초기화
-        "image_analysis": None,
-        "layout_plan": None,
-        "typography_style": None,
+        "retry_targets": None,
+        "attempts": [],
+        "variant_index": 0,
+        "variant_count": max(1, min(variants, MAX_VARIANTS)),
+        "variants": [],
+        "image_analysis": reuse.get("image_analysis"),
+        "layout_plan": reuse.get("layout_plan"),
+        "typography_style": reuse.get("typography_style"),
         "html_output": None,
         "validation_result": None,
         "html_quality_check": None,
@@ -1016,6 +1431,8 @@ def generate_magazine_layout(
         
         html = final_state.get("final_html", "")
         validation = final_state.get("validation_result", {})
+        quality = final_state.get("html_quality_check") or {}
+        pipeline_router.record("graph", bucket, quality.get("passed", False))
         
         if validation.get("passed", False):
             print(f"✅ [AURA] All validations passed!", file=sys.stderr)
@@ -1023,11 +1440,70 @@ def generate_magazine_layout(
             print(f"⚠️ [AURA] Validation issues: {validation.get('issues', [])}", file=sys.stderr)
         
         print(f"🍌 [AURA] Generated HTML Length: {len(html)} chars", file=sys.stderr)
-        return html
+        token_budget.report()
+        if variants <= 1 and not include_context:
+            return html
+        
+        response = {
+            "html": html,
+            # 다음 편집(재렌더링) 시 reuse_context 로 다시 전달할 노드 결과
+            "context": {
+                "image_analysis": final_state.get("image_analysis"),
+                "layout_plan": final_state.get("layout_plan"),
+                "typography_style": final_state.get("typography_style"),
+            },
+        }
+        if variants > 1:
+            rendered = sorted(final_state.get("variants") or [], key=lambda v: v["index"])
+            response["best"] = next((v["index"] for v in rendered if v["html"] == html), 0)
+            response["variants"] = [{
+                "index": v["index"],
+                "html": v["html"],
+                "passed": v["quality"].get("passed", False),
+                "issues": v["quality"].get("issues", []),
+                "fill_rate": v["quality"].get("metrics", {}).get("fill_rate"),
+            } for v in rendered]
+        return json.dumps(response)
         
     except Exception as e:
         print(f"❌ [AURA] Graph Error: {e}", file=sys.stderr)
         return f"<div class='p-10 text-red-500'>Error: {e}</div>"
 
+@mcp.tool()
+def generate_issue_style(
+    issue_data: str,
+    vision_context: str = "{}",
+    design_spec: str = "{}"
+) -> str:
+    """
+    이슈(여러 페이지) 전체가 공유할 타이포그래피/색상/강조색을 한 번에 결정합니다.
+    issue_data: {"title": str, "pages": [{"headline": str, "body": str}, ...]}
+    반환값(typography_style JSON)은 각 페이지 generate_magazine_layout 의 reuse_context 로 전달합니다.
+    key_phrases 는 페이지마다 다르므로 포함하지 않습니다.
+    """
+    try:
+        issue = json.loads(issue_data)
+    except json.JSONDecodeError:
+        issue = {}
+    pages = issue.get("pages", [])
+    print(f"📚 [AURA Issue] Deciding shared style for {len(pages)} pages...", file=sys.stderr)
+    token_budget.start_request(f"issue:{issue.get('title', '')[:20]}")
+
+    vision_summary, design_summary, _ = summarize_contexts(vision_context, design_spec, "{}")
+    headlines = " / ".join(p.get("headline", "") for p in pages)
+    state = {
+        "headline": f"{issue.get('title') or 'Magazine issue'}: {headlines}",
+        # 각 페이지 도입부 (token_budget 의 typography_styler 정책 크기를 넘으면 앞부분만 사용)
+        "body": "\n".join((p.get("body") or "")[:200] for p in pages),
+        "vision_summary": vision_summary,
+        "design_summary": design_summary + " (shared by every page of the issue)",
+        "layout_override": "ARTICLE",
+        "typography_style": None,
+    }
+    style = typography_styler_node(state)["typography_style"]
+    style.pop("key_phrases", None)
+    token_budget.report()
+    return json.dumps(style)
+
 if __name__ == "__main__":
     mcp.run()
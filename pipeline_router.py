@@ -0,0 +1,107 @@
+"""
+[Pipeline Router Module]
+페이지 특성과 과거 품질 검사 통과율을 보고 생성 경로를 선택하는 모듈입니다.
+
+경로:
+1. single: mcp_server.py 의 단일 프롬프트 (LLM 1회 호출)
+2. graph : mcp_server_langgraph.py 의 6노드 파이프라인 (최대 재시도 포함)
+
+단순한 페이지(COVER, 또는 이미지 1장 + 짧은 본문)는 single 로 보내고,
+같은 유형에서 single 의 통과율이 graph 보다 PASS_RATE_MARGIN 이상 낮으면 graph 로 보냅니다
+(graph 기록이 부족하면 MIN_SINGLE_PASS_RATE 기준).
+
+graph 로 보내는 유형에서도 EXPLORE_RATE 비율의 페이지는 single 로 보내 통과율을 계속 갱신하고,
+경로별 기록은 STATS_WINDOW 회를 넘으면 절반으로 줄여 최근 결과 위주로 판단합니다.
+"""
+
+import os
+import random
+import sys
+from typing import Optional, Tuple
+
+from stats_store import CounterStore
+
+
+# 예전 JSON 통계 파일 (있으면 stats_store 로 한 번 가져옴)
+LEGACY_STATS_PATH = os.getenv("AURA_PIPELINE_STATS", "./pipeline_stats.json")
+
+SHORT_BODY_CHARS = 600       # 이 길이 미만이면 "짧은 본문"
+MIN_SAMPLES = 5              # 통과율을 신뢰하기 위한 최소 기록 수
+MIN_SINGLE_PASS_RATE = 0.6   # graph 기록이 부족할 때: 이보다 낮으면 단순 페이지라도 graph 사용
+PASS_RATE_MARGIN = 0.15      # graph 통과율이 single 보다 이만큼 높아야 graph 사용 (single 이 훨씬 저렴)
+EXPLORE_RATE = float(os.getenv("AURA_PIPELINE_EXPLORE", "0.1"))  # graph 로 보낼 단순 페이지 중 single 로 시험하는 비율
+STATS_WINDOW = 50            # 경로별 기록 수가 이를 넘으면 절반으로 줄임 (오래된 결과의 비중 감소)
+
+
+def page_bucket(layout_override: str, image_count: int, body_length: int) -> str:
+    """통과율 집계 단위 (페이지 유형/이미지 수/본문 길이 구간)"""
+    layout = (layout_override or "ARTICLE").upper()
+    images = str(image_count) if image_count < 3 else "3+"
+    if body_length < SHORT_BODY_CHARS:
+        body = "short"
+    elif body_length < 1500:
+        body = "medium"
+    else:
+        body = "long"
+    return f"{layout}:{images}:{body}"
+
+
+class PipelineRouter:
+    """
+    single / graph 경로 선택 및 경로별 통과율 기록
+    """
+
+    def __init__(self, stats: Optional[CounterStore] = None):
+        # 페이지마다 별도 MCP 서버 프로세스가 기록하므로 sqlite 카운터 (stats_store)
+        self.stats = stats or CounterStore("pipeline", legacy_json=LEGACY_STATS_PATH)
+
+    def pass_rate(self, path: str, bucket: str) -> Tuple[float, int]:
+        entry = self.stats.get(bucket, path)
+        runs = entry.get("runs", 0)
+        return (entry.get("passed", 0) / runs if runs else 0.0), runs
+
+    def record(self, path: str, bucket: str, passed: bool):
+        try:
+            self.stats.increment(bucket, path, runs=1, passed=1 if passed else 0)
+            self.stats.decay(bucket, path, STATS_WINDOW)
+        except Exception as e:
+            print(f"⚠️ [Router] Failed to save pipeline stats: {e}", file=sys.stderr)
+
+    # ============ 경로 선택 ============
+    def choose(self, layout_override: str, image_count: int, body_length: int) -> Tuple[str, str]:
+        """
+        Returns:
+            (path, reason) - path 는 "single" 또는 "graph"
+        """
+        forced = os.getenv("AURA_PIPELINE_MODE", "auto").lower()
+        if forced in ("single", "graph"):
+            return forced, f"forced by AURA_PIPELINE_MODE={forced}"
+
+        bucket = page_bucket(layout_override, image_count, body_length)
+        is_cover = (layout_override or "").upper() == "COVER"
+        is_simple = is_cover or (image_count <= 1 and body_length < SHORT_BODY_CHARS)
+
+        if not is_simple:
+            return "graph", f"complex page ({bucket})"
+
+        rate, runs = self.pass_rate("single", bucket)
+        graph_rate, graph_runs = self.pass_rate("graph", bucket)
+        if runs >= MIN_SAMPLES:
+            if graph_runs >= MIN_SAMPLES:
+                prefer_graph = graph_rate - rate > PASS_RATE_MARGIN
+                comparison = f"single {rate:.0%} over {runs} runs vs graph {graph_rate:.0%} over {graph_runs} runs"
+            else:
+                prefer_graph = rate < MIN_SINGLE_PASS_RATE
+                comparison = f"single-prompt pass rate {rate:.0%} over {runs} runs"
+            if prefer_graph:
+                if random.random() >= EXPLORE_RATE:
+                    return "graph", f"simple page but {comparison} ({bucket})"
+                return "single", f"exploring single-prompt path: {comparison} ({bucket})"
+
+        kind = "COVER" if is_cover else "one image, short body"
+        history = f", single-prompt pass rate {rate:.0%} over {runs} runs" if runs else ", no history yet"
+        return "single", f"simple page: {kind}{history} ({bucket})"
+
+
+# 전역 인스턴스
+pipeline_router = PipelineRouter()
@@ -0,0 +1,237 @@
+"""
+[Prompt Cache Module]
+고정된 프롬프트 prefix(시스템 규칙)를 provider-side context cache 로 등록하고 재사용하는 모듈입니다.
+
+백엔드:
+1. gemini: google.generativeai caching API 로 CachedContent 를 만들고 cached_content 로 호출
+2. local : 네트워크 없이 동작하는 테스트용 대체 구현 (prefix 를 system 메시지로 함께 전송)
+3. off   : 캐시 비활성화
+
+캐시 생성/사용에 실패하면 전체 프롬프트를 그대로 보내는 방식으로 자동 대체됩니다.
+MCP 서버는 요청마다 새 프로세스로 실행되므로, gemini 캐시 이름은 레지스트리 파일에 저장해 프로세스 간에 공유합니다.
+CachedContent 는 키(프로젝트) 범위이므로 llm_gateway 키 풀 사용 시 키별로 따로 등록합니다.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from langchain_core.messages import SystemMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from llm_gateway import key_id
+
+
+DEFAULT_TTL_SECONDS = 3600
+REGISTRY_PATH = os.getenv("AURA_PROMPT_CACHE_REGISTRY", "./.prompt_cache.json")
+
+
+def prefix_key(static_text: str, model: str) -> str:
+    """prefix 내용 + 모델 이름으로 캐시 키 생성"""
+    return hashlib.sha256(f"{model}\n{static_text}".encode("utf-8")).hexdigest()[:16]
+
+
+def full_prompt_chain(static_text: str, dynamic_template: str, get_llm: Callable[..., Any]):
+    """캐시 없이 prefix + 입력 전체를 보내는 체인 (fallback)"""
+    prompt = ChatPromptTemplate.from_messages([
+        SystemMessage(content=static_text),
+        ("human", dynamic_template),
+    ])
+    return prompt | get_llm() | StrOutputParser()
+
+
+class GeminiContextCache:
+    """Gemini CachedContent 기반 백엔드"""
+
+    name = "gemini"
+
+    def __init__(self):
+        self._clients: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _client(self, api_key: str):
+        # genai.configure 는 프로세스 전역(다른 스레드의 키도 바뀜)이므로 키별 CacheServiceClient 사용
+        import google.ai.generativelanguage as glm
+
+        with self._lock:
+            client = self._clients.get(api_key)
+            if client is None:
+                client = glm.CacheServiceClient(client_options={"api_key": api_key})
+                self._clients[api_key] = client
+            return client
+
+    def create(self, static_text: str, model: str, ttl_seconds: int, api_key: Optional[str] = None) -> str:
+        import google.ai.generativelanguage as glm
+
+        api_key = api_key or os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise RuntimeError("GOOGLE_API_KEY is not set")
+        cached = self._client(api_key).create_cached_content(cached_content=glm.CachedContent(
+            model=f"models/{model}",
+            system_instruction=glm.Content(parts=[glm.Part(text=static_text)]),
+            ttl=datetime.timedelta(seconds=ttl_seconds),
+        ))
+        return cached.name
+
+    def build_chain(self, cache_name: str, static_text: str, dynamic_template: str, get_llm: Callable[..., Any]):
+        # 캐시된 system_instruction 을 재사용하므로 입력 부분만 전송
+        prompt = ChatPromptTemplate.from_template(dynamic_template)
+        return prompt | get_llm(cached_content=cache_name) | StrOutputParser()
+
+
+class LocalContextCache:
+    """
+    테스트용 로컬 대체 구현
+    provider 없이 캐시 등록/재사용 흐름과 hit/miss 통계를 확인할 수 있습니다.
+    """
+
+    name = "local"
+
+    def __init__(self):
+        self.entries: Dict[str, str] = {}
+
+    def create(self, static_text: str, model: str, ttl_seconds: int, api_key: Optional[str] = None) -> str:
+        cache_name = f"local/{prefix_key(static_text, model)}"
+        self.entries[cache_name] = static_text
+        return cache_name
+
+    def build_chain(self, cache_name: str, static_text: str, dynamic_template: str, get_llm: Callable[..., Any]):
+        if cache_name not in self.entries:
+            raise KeyError(f"Unknown local cache entry: {cache_name}")
+        return full_prompt_chain(self.entries[cache_name], dynamic_template, get_llm)
+
+
+class PromptCache:
+    """
+    정적 prefix 캐시 관리자
+    """
+
+    def __init__(self, backend: Optional[Any] = None, registry_path: Optional[str] = REGISTRY_PATH,
+                 ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.backend = backend
+        self.registry_path = registry_path
+        self.ttl_seconds = ttl_seconds
+        self.stats = {"hits": 0, "misses": 0, "fallbacks": 0}
+        self._registry: Dict[str, Dict[str, Any]] = self._load_registry()
+        self._lock = threading.Lock()
+
+    # ============ 레지스트리 (프로세스 간 공유) ============
+    def _load_registry(self) -> Dict[str, Dict[str, Any]]:
+        if not self.registry_path or not os.path.exists(self.registry_path):
+            return {}
+        try:
+            with open(self.registry_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _save_registry(self, key: str, entry: Optional[Dict[str, Any]]):
+        """
+        항목 1개 변경을 레지스트리 파일에 반영 (entry 가 None 이면 삭제)
+        다른 MCP 프로세스가 등록한 항목을 덮어쓰지 않도록 파일을 다시 읽어 합친 뒤 임시 파일 + rename 으로 저장
+        """
+        if not self.registry_path or (self.backend and self.backend.name == "local"):
+            return
+        registry = self._load_registry()
+        if entry is None:
+            registry.pop(key, None)
+        else:
+            registry[key] = entry
+        now = time.time()
+        registry = {k: v for k, v in registry.items() if v.get("expires_at", 0) > now}
+        tmp_path = f"{self.registry_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(registry, f)
+            os.replace(tmp_path, self.registry_path)
+        except Exception as e:
+            print(f"⚠️ [Prompt Cache] Failed to save registry: {e}", file=sys.stderr)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    # ============ 캐시 조회/생성 ============
+    def _registry_key(self, static_text: str, model: str, api_key: Optional[str]) -> str:
+        key = f"{self.backend.name}:{prefix_key(static_text, model)}"
+        return f"{key}:{key_id(api_key)}" if api_key else key
+
+    def get_or_create(self, static_text: str, model: str, api_key: Optional[str] = None) -> Optional[str]:
+        """유효한 캐시 이름을 반환. 캐시를 쓸 수 없으면 None"""
+        if self.backend is None:
+            return None
+        key = self._registry_key(static_text, model, api_key)
+        now = time.time()
+
+        with self._lock:
+            entry = self._registry.get(key) or self._load_registry().get(key)
+            # 만료 60초 전부터는 새로 생성 (호출 도중 만료 방지)
+            if entry and entry.get("expires_at", 0) - 60 > now:
+                self.stats["hits"] += 1
+                return entry["name"]
+
+            try:
+                cache_name = self.backend.create(static_text, model, self.ttl_seconds, api_key)
+            except Exception as e:
+                print(f"⚠️ [Prompt Cache] Cache unavailable ({self.backend.name}): {e}", file=sys.stderr)
+                return None
+
+            self.stats["misses"] += 1
+            self._registry[key] = {"name": cache_name, "expires_at": now + self.ttl_seconds}
+            self._save_registry(key, self._registry[key])
+            print(f"🗄️  [Prompt Cache] Created {self.backend.name} cache: {cache_name}", file=sys.stderr)
+            return cache_name
+
+    def invalidate(self, static_text: str, model: str, api_key: Optional[str] = None):
+        if self.backend is None:
+            return
+        key = self._registry_key(static_text, model, api_key)
+        with self._lock:
+            self._registry.pop(key, None)
+            self._save_registry(key, None)
+
+    def chain_for(self, static_text: str, dynamic_template: str, model: str,
+                  get_llm: Callable[..., Any], api_key: Optional[str] = None) -> Tuple[Any, bool]:
+        """
+        호출용 체인 생성 (api_key: get_llm 이 사용하는 키, 캐시는 키별로 등록)
+
+        Returns:
+            (chain, cached) - cached 가 True 면 실패 시 fallback_chain 으로 재시도해야 함
+        """
+        cache_name = self.get_or_create(static_text, model, api_key)
+        if cache_name:
+            try:
+                return self.backend.build_chain(cache_name, static_text, dynamic_template, get_llm), True
+            except Exception as e:
+                print(f"⚠️ [Prompt Cache] Cached call setup failed: {e}", file=sys.stderr)
+                self.invalidate(static_text, model, api_key)
+        return full_prompt_chain(static_text, dynamic_template, get_llm), False
+
+    def fallback_chain(self, static_text: str, dynamic_template: str, model: str,
+                       get_llm: Callable[..., Any], error: Exception, api_key: Optional[str] = None):
+        """캐시 호출이 실패했을 때 전체 프롬프트 체인으로 대체"""
+        self.record_fallback(static_text, model, error, api_key)
+        return full_prompt_chain(static_text, dynamic_template, get_llm)
+
+    def record_fallback(self, static_text: str, model: str, error: Exception, api_key: Optional[str] = None):
+        """캐시 호출 실패 기록 + 캐시 무효화 (체인은 호출 측에서 full_prompt_chain 으로 생성)"""
+        print(f"⚠️ [Prompt Cache] Cached call failed, sending full prompt: {error}", file=sys.stderr)
+        self.stats["fallbacks"] += 1
+        self.invalidate(static_text, model, api_key)
+
+
+def _backend_from_env() -> Optional[Any]:
+    mode = os.getenv("AURA_PROMPT_CACHE", "gemini").lower()
+    if mode == "gemini":
+        return GeminiContextCache()
+    if mode == "local":
+        return LocalContextCache()
+    return None
+
+
+# 전역 인스턴스
+prompt_cache = PromptCache(backend=_backend_from_env())
@@ -5,14 +5,25 @@ Original: rag_modules.py (BGE-M3 + Hybrid Search)
 Changed: Voyage-3.5 + Dense Only (Dot Product / Inner Product)
 """
 
+import asyncio
 import os
 import json
 import chromadb
 import google.generativeai as genai
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Union
 from collections import defaultdict
 from dotenv import load_dotenv
 import numpy as np
+from token_budget import token_budget, estimate_tokens
+from edit_session import key_phrases
+from llm_gateway import llm_gateway, gemini_model, load_keys, GEMINI_IMAGE_TOKENS
+from event_loop import blocking_pool
+from image_pool import image_pool, render_asset
+from image_validator import SourceImage
+from upload_spool import memory_tracker, image_memory
+
+# 페이지별 style_override 중 design spec 에 적용되는 키 (나머지는 typography_style 키)
+ISSUE_DESIGN_KEYS = {"mood", "category", "typography_style", "color_scheme"}
 
 # Load environment variables
 load_dotenv()
@@ -25,8 +36,9 @@ logger = logging.getLogger(__name__)
 
 
 class Config:
-    GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-    VOYAGE_API_KEY = os.getenv("VOY_API_KEY")  # Voyage API Key
+    # 키 풀(GOOGLE_API_KEYS / VOY_API_KEYS)만 설정된 경우 첫 키를 기본 키로 사용
+    GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY") or next(iter(load_keys("gemini")), None)
+    VOYAGE_API_KEY = os.getenv("VOY_API_KEY") or next(iter(load_keys("voyage")), None)  # Voyage API Key
     CHROMA_DB_PATH = "./chroma_db_voyage"  # Separate DB for Voyage embeddings
     COLLECTION_NAME = "magazine_layouts_voyage"
     DATASET_PATH = "./datas/final_final_dataset.json"
@@ -47,15 +59,41 @@ class GeminiAnalyzer:
         Config.validate()
         genai.configure(api_key=Config.GOOGLE_API_KEY)
         self.model_name = 'gemini-2.5-flash'
-        self.model = genai.GenerativeModel(self.model_name)
+        token_budget.register_summarizer(self._summarize_text)
 
-    def analyze_page(self, images: List[Any], title: str, body: str) -> Dict[str, str]:
-        """Analyze a single page's content (Images + Text) to extract metadata."""
+    @staticmethod
+    def _request_tokens(inputs: List[Any], output_tokens: int) -> int:
+        """키별 TPM 집계용 예상 토큰 수"""
+        return output_tokens + sum(
+            estimate_tokens(part) if isinstance(part, str) else GEMINI_IMAGE_TOKENS for part in inputs
+        )
+
+    def _summarize_text(self, text: str, max_tokens: int) -> str:
+        """Summarizer used by the token budget 'summarize' policy."""
+        prompt = (
+            f"Summarize the following magazine text in at most {max_tokens} tokens. "
+            f"Keep quoted phrases, names and the overall tone.\n\n{text}"
+        )
+        with llm_gateway.slot("gemini", "summarize", tokens=self._request_tokens([prompt], max_tokens)) as lease:
+            response = gemini_model(self.model_name, lease.api_key).generate_content(prompt)
+        return response.text.strip()
+
+    DEFAULT_ANALYSIS = {
+        "mood": "General",
+        "category": "General",
+        "type": "Balanced",
+        "description": "Standard layout",
+        "visual_keywords": []
+    }
+
+    def _analysis_inputs(self, images: List[Any], title: str, body: str) -> List[Any]:
+        # Mood/category only need a representative slice of the body
+        budgeted = token_budget.apply("analyze_page", {"title": title, "body": body})
         prompt = f"""
         You are an expert design assistant. Analyze these images and the provided text content for a magazine layout.
         
-        Title: {title}
-        Body Text: {body}
+        Title: {budgeted['title']}
+        Body Text: {budgeted['body']}
         
         Determine the following attributes:
         1. Mood (e.g., Minimalist, Energetic, Luxurious, Emotional, Professional)
@@ -73,39 +111,168 @@ class GeminiAnalyzer:
             "visual_keywords": ["...", "..."]
         }}
         """
-        
+        return [prompt] + list(images or [])
+
+    @staticmethod
+    def _parse_json(text: str) -> Dict[str, Any]:
+        return json.loads(text.replace("```json", "").replace("```", "").strip())
+
+    def analyze_page(self, images: List[Any], title: str, body: str) -> Dict[str, str]:
+        """Analyze a single page's content (Images + Text) to extract metadata."""
         try:
-            inputs = [prompt]
-            if images:
-                inputs.extend(images)
-                
-            response = self.model.generate_content(inputs)
-            text = response.text.replace("```json", "").replace("```", "").strip()
-            return json.loads(text)
+            inputs = self._analysis_inputs(images, title, body)
+            with llm_gateway.slot("gemini", "analyze_page", tokens=self._request_tokens(inputs, 300)) as lease:
+                response = gemini_model(self.model_name, lease.api_key).generate_content(inputs)
+            return self._parse_json(response.text)
         except Exception as e:
             print(f"Gemini Analysis Error: {e}")
-            return {
-                "mood": "General",
-                "category": "General",
-                "type": "Balanced",
-                "description": "Standard layout",
-                "visual_keywords": []
-            }
-
-    async def aura_render(self, layout_data: Dict[str, Any], user_content: Dict[str, Any]) -> str:
+            return dict(self.DEFAULT_ANALYSIS)
+
+    async def analyze_page_async(self, images: List[Any], title: str, body: str) -> Dict[str, str]:
+        """analyze_page 의 비동기 버전 (요청 처리 중 이벤트 루프를 막지 않음)"""
+        try:
+            inputs = self._analysis_inputs(images, title, body)
+            tokens = self._request_tokens(inputs, 300)
+            async with llm_gateway.async_slot("gemini", "analyze_page", tokens=tokens) as lease:
+                response = await gemini_model(self.model_name, lease.api_key, async_client=True).generate_content_async(inputs)
+            return self._parse_json(response.text)
+        except Exception as e:
+            print(f"Gemini Analysis Error: {e}")
+            return dict(self.DEFAULT_ANALYSIS)
+
+    def _merged_inputs(self, images: List[Any], title: str, body: str, layout_type: str) -> List[Any]:
+        budgeted = token_budget.apply("analyze_page", {"title": title, "body": body})
+        prompt = f"""
+        You are an expert magazine art director. Analyze these images (given in order, index 0 to {len(images) - 1})
+        and the text content for a {layout_type.upper()} page.
+        
+        Title: {budgeted['title']}
+        Body Text: {budgeted['body']}
+        
+        Decide in ONE response:
+        1. Mood (e.g., Minimalist, Energetic, Luxurious, Emotional, Professional)
+        2. Category (e.g., Fashion, Travel, Food, Business, Tech)
+        3. Type (e.g., Image-heavy, Text-heavy, Balanced, Collage)
+        4. Description (A short visual description of the ideal layout style)
+        5. Visual Keywords (3-5 key visual elements/colors/objects found in the images)
+        6. HERO image: the most expressive image (engaging face, dramatic pose, direct eye contact) and the placement order
+        7. Typography: bold large serif headline (text-5xl to text-7xl, font-black), readable body,
+           an ACCENT COLOR that complements the images' dominant colors, quoted phrases from the body as key phrases,
+           and at least one premium touch (vertical_edge_text, page_number, accent_line, drop_cap, pull_quote)
+
+        Return JSON only:
+        {{
+            "mood": "...",
+            "category": "...",
+            "type": "...",
+            "description": "...",
+            "visual_keywords": ["...", "..."],
+            "hero_image_index": 0,
+            "image_order": [0, 1],
+            "typography": {{
+                "headline_classes": "text-6xl font-black text-slate-900 tracking-tight",
+                "subhead_classes": "text-xl text-slate-600 italic",
+                "body_classes": "text-sm leading-relaxed text-slate-800",
+                "accent_color": "text-red-600",
+                "accent_border": "border-red-500",
+                "key_phrases": ["..."],
+                "premium_touches": ["accent_line"]
+            }}
+        }}
+        """
+        return [prompt] + list(images or [])
+
+    def analyze_page_merged(self, images: List[Any], title: str, body: str, layout_type: str = "article") -> Dict[str, Any]:
+        """
+        analyze_page + image_analyzer + typography_styler 를 하나의 멀티모달 요청으로 처리합니다.
+        analyze_page 와 같은 키에 더해 "graph_context" 를 반환하며,
+        이를 LangGraph reuse_context 로 전달하면 해당 노드는 건너뜁니다.
+        실패 시 analyze_page 결과(graph_context 없음)로 대체됩니다.
+        """
+        try:
+            inputs = self._merged_inputs(images, title, body, layout_type)
+            with llm_gateway.slot("gemini", "analyze_page_merged", tokens=self._request_tokens(inputs, 800)) as lease:
+                response = gemini_model(self.model_name, lease.api_key).generate_content(
+                    inputs, generation_config={"response_mime_type": "application/json"}
+                )
+            merged = self._parse_json(response.text)
+        except Exception as e:
+            print(f"Gemini Merged Analysis Error: {e}, falling back to analyze_page")
+            return self.analyze_page(images, title, body)
+        return self._split_merged(merged, images, body)
+
+    async def analyze_page_merged_async(self, images: List[Any], title: str, body: str,
+                                        layout_type: str = "article") -> Dict[str, Any]:
+        """analyze_page_merged 의 비동기 버전"""
+        try:
+            inputs = self._merged_inputs(images, title, body, layout_type)
+            tokens = self._request_tokens(inputs, 800)
+            async with llm_gateway.async_slot("gemini", "analyze_page_merged", tokens=tokens) as lease:
+                response = await gemini_model(self.model_name, lease.api_key, async_client=True).generate_content_async(
+                    inputs, generation_config={"response_mime_type": "application/json"}
+                )
+            merged = self._parse_json(response.text)
+        except Exception as e:
+            print(f"Gemini Merged Analysis Error: {e}, falling back to analyze_page")
+            return await self.analyze_page_async(images, title, body)
+        return self._split_merged(merged, images, body)
+
+    def _split_merged(self, merged: Dict[str, Any], images: List[Any], body: str) -> Dict[str, Any]:
+        """병합 응답을 analysis + graph_context 로 분리"""
+        analysis = {key: merged.get(key, default) for key, default in self.DEFAULT_ANALYSIS.items()}
+        graph_context = {}
+        
+        hero = merged.get("hero_image_index")
+        order = merged.get("image_order") or []
+        if images and isinstance(hero, int) and 0 <= hero < len(images) and sorted(order) == list(range(len(images))):
+            graph_context["image_analysis"] = {"hero_image_index": hero, "image_order": order}
+        
+        typography = merged.get("typography")
+        if isinstance(typography, dict) and typography.get("headline_classes"):
+            # 본문이 잘린 채 전달되므로 인용구는 전체 본문에서 다시 추출
+            typography["key_phrases"] = key_phrases(body) or typography.get("key_phrases", [])
+            graph_context["typography_style"] = typography
+        
+        analysis["graph_context"] = graph_context
+        return analysis
+
+    async def aura_render(self, layout_data: Dict[str, Any], user_content: Dict[str, Any]) -> Union[str, List[str]]:
         """
         Integration with AURA MCP Service for high-quality layout generation.
+        user_content['variants'] > 1 이면 HTML 목록(가장 좋은 변형이 첫 번째)을 반환합니다.
+        """
+        rendered = await self.aura_render_page(layout_data, user_content, include_context=False)
+        if int(user_content.get('variants', 1) or 1) > 1:
+            return rendered["variants"]
+        return rendered["html"]
+
+    def prefetch_summary(self, body: str) -> "asyncio.Future":
+        """
+        typography_styler 용 본문 요약을 백그라운드로 시작 (Vision 분석/RAG 와 동시에 실행되어 페이지 지연에 더해지지 않음)
+        aura_render_page 의 user_content['body_summary'] 로 넘기면 MCP 서버가 요약을 재사용합니다.
+        """
+        return asyncio.ensure_future(blocking_pool.run(token_budget.summarize, body))
+
+    async def aura_render_page(self, layout_data: Dict[str, Any], user_content: Dict[str, Any],
+                               reuse_context: Dict[str, Any] = None, include_context: bool = True) -> Dict[str, Any]:
+        """
+        aura_render 와 같지만 LangGraph 노드 결과(context)도 함께 반환합니다.
+        reuse_context 의 노드 결과는 MCP 서버에서 다시 계산하지 않습니다.
+
+        Returns:
+            {"html": str, "variants": [str, ...] (가장 좋은 변형이 첫 번째), "context": {...}}
         """
         from tool.mcp_client import mcp_client
-        from image_validator import image_validator
         
         headline = user_content.get('title', 'Untitled')
         body = user_content.get('body', '')
         analysis = user_content.get('analysis', {})
+        variants = int(user_content.get('variants', 1) or 1)
         
         # 🖼️ Image validation and processing
+        # 처리된 이미지는 asset_store 에 저장하고 HTML 에는 /assets/{hash} URL 을 넣음
+        # image_features: HERO/배치 결정용 (image_analyzer_node 가 LLM 없이 사용)
         raw_images = user_content.get('images', [])
-        user_images = []
         
         image_count = len(raw_images)
         if image_count == 1:
@@ -119,49 +286,21 @@ class GeminiAnalyzer:
         
         print(f"  📐 Max height for {image_count} images: {max_height}px")
         
-        for i, img_b64 in enumerate(raw_images):
-            try:
-                from PIL import Image
-                import io
-                import base64 as b64
-                
-                if img_b64.startswith("data:"):
-                    base64_data = img_b64.split(",")[1]
-                else:
-                    base64_data = img_b64
-                image_bytes = b64.b64decode(base64_data)
-                temp_img = Image.open(io.BytesIO(image_bytes))
-                orig_width, orig_height = temp_img.size
-                
-                aspect_ratio = orig_width / orig_height
-                slot_height = max_height
-                slot_width = int(slot_height * aspect_ratio)
-                
-                max_width = 400
-                if slot_width > max_width:
-                    slot_width = max_width
-                    slot_height = int(slot_width / aspect_ratio)
-                
-                print(f"  📐 [Image {i}] Original: {orig_width}x{orig_height}, Slot: {slot_width}x{slot_height}")
-                
-                result = image_validator.prepare_for_layout(
-                    img_b64,
-                    layout_type="magazine_full",
-                    slot_info={
-                        "width": slot_width,
-                        "height": slot_height,
-                        "fit_mode": "contain"
-                    }
-                )
-                
-                if result["success"]:
-                    user_images.append(result["base64"])
-                else:
-                    user_images.append(img_b64)
-                    print(f"  ⚠️ [Image {i}] Validation failed, using original")
-            except Exception as e:
-                user_images.append(img_b64)
-                print(f"  ⚠️ [Image {i}] Error during validation: {e}")
+        # Pillow 작업(디코딩/리사이징/인코딩)은 image_pool 에서 병렬로
+        # spool 된 업로드는 경로만 넘기고 작업자가 파일에서 읽음 (디코딩 중인 이미지만 메모리 집계)
+        async def render(i, raw):
+            source = self._source(raw)
+            with memory_tracker.hold(image_memory(source) if isinstance(source, SourceImage) else len(source)):
+                return await image_pool.run(render_asset, source, max_height, i)
+
+        prepared = await asyncio.gather(*(render(i, raw) for i, raw in enumerate(raw_images)))
+        user_images = [p["src"] for p in prepared]
+        image_features = [p["features"] for p in prepared]
+        if prepared:
+            print(f"  🖼️ [Images] {len(prepared)} image(s): "
+                  f"{sum(p['input_bytes'] for p in prepared) / 1024:.0f}KB uploaded → "
+                  f"{sum(p['output_bytes'] for p in prepared) / 1024:.0f}KB served, "
+                  f"{sum(p['cpu_ms'] for p in prepared):.0f}ms CPU")
         
         placeholders = [f"__IMAGE_{i}__" for i in range(len(user_images))]
         
@@ -183,6 +322,32 @@ class GeminiAnalyzer:
             "color_scheme": self._suggest_color_scheme(analysis.get('mood', 'Modern'))
         }
         
+        # 📚 Issue mode: 이슈 공통 디자인/타이포그래피
+        issue_style = user_content.get('issue_style')
+        if issue_style:
+            design_spec.update(issue_style.get('design', {}))
+            if issue_style.get('typography'):
+                reuse_context = dict(reuse_context or {})
+                reuse_context["typography_style"] = {
+                    **issue_style['typography'],
+                    # 강조 인용구는 페이지 본문마다 다름 (LLM 없이 추출)
+                    "key_phrases": key_phrases(body)
+                }
+        
+        # 페이지별 override (이슈 스타일 없이도 적용): 디자인 키는 design spec 에,
+        # 나머지는 MCP 서버에서 typography_style(재사용/새로 생성 모두) 위에 덮어씀
+        override = user_content.get('style_override') or {}
+        design_spec.update({k: v for k, v in override.items() if k in ISSUE_DESIGN_KEYS})
+        typography_override = {k: v for k, v in override.items() if k not in ISSUE_DESIGN_KEYS}
+        
+        # typography_styler 가 다시 실행될 때만 본문 요약을 넘김 (prefetch_summary 로 미리 시작한 요약)
+        body_summary = ""
+        summary_task = user_content.get('body_summary')
+        if summary_task is not None and "typography_style" not in (reuse_context or {}):
+            body_summary = await summary_task
+            if body_summary == body:
+                body_summary = ""
+        
         image_count = len(user_images)
         if image_count > 2:
             layout_strategy = "Mosaic or Grid"
@@ -203,66 +368,141 @@ class GeminiAnalyzer:
             print(f"🍌 [AURA] Calling MCP for: {headline[:30]}")
             print(f"   Strategy: {layout_strategy}, Mood: {design_spec['mood']}")
             
-            html = await mcp_client.generate_layout(
+            response = await mcp_client.generate_layout(
                 headline=headline,
                 body=body,
                 image_data=placeholders,
                 layout_override=page_layout_type.upper(),
                 vision_json=json.dumps(vision_context),
                 design_json=json.dumps(design_spec),
-                plan_json=json.dumps(plan_json)
+                plan_json=json.dumps(plan_json),
+                variants=variants,
+                reuse_json=json.dumps(reuse_context or {}),
+                include_context=include_context,
+                features_json=json.dumps(image_features) if any(image_features) else "[]",
+                body_summary=body_summary,
+                typography_json=json.dumps(typography_override) if typography_override else "{}"
             )
             
-            # Image Placeholder Injection
-            for i, img_b64 in enumerate(user_images):
-                injected = False
-                
-                patterns = [
-                    f"__IMAGE_{i}__",
-                    f"{{{{IMAGE_PLACEHOLDER_{i}}}}}",
-                    f"[IMAGE_{i}]",
-                    f"{{IMAGE_{i}}}",
-                    f"$IMAGE_{i}$"
-                ]
-                
-                for pattern in patterns:
-                    if pattern in html:
-                        html = html.replace(pattern, img_b64, 1)
-                        print(f"  ✅ [Image {i}] Injected via pattern: {pattern}")
-                        injected = True
-                        break
-                
-                if not injected:
-                    url_pattern = f"url({patterns[0]})"
-                    if url_pattern in html:
-                        html = html.replace(url_pattern, f"url({img_b64})")
-                        print(f"  ✅ [Image {i}] Injected via url() pattern")
-                        injected = True
-                
-                if not injected:
-                    print(f"  ⚠️ [Image {i}] No placeholder found! Forcing injection...")
-                    img_tag = f'<img src="{img_b64}" class="w-[30%] h-[120px] object-cover inline-block mx-2 my-2" alt="Image {i}" />'
-                    
-                    if '</div>' in html:
-                        last_div_pos = html.rfind('</div>')
-                        html = html[:last_div_pos] + img_tag + html[last_div_pos:]
-                    else:
-                        html = html + img_tag
+            # {"html", "context", "best", "variants"} JSON (오류 시 HTML 문자열 그대로)
+            try:
+                result = json.loads(response)
+            except ValueError:
+                result = {"html": response}
+            if not isinstance(result, dict) or "html" not in result:
+                result = {"html": response}
             
-            # Tailwind CSS Script Injection
-            tailwind_script = '<script src="https://cdn.tailwindcss.com"></script>\n'
-            if "<head>" in html:
-                html = html.replace("<head>", f"<head>\n{tailwind_script}")
-            elif "<html>" in html:
-                html = html.replace("<html>", f"<html>\n<head>{tailwind_script}</head>")
-            else:
-                html = tailwind_script + html
-
-            return html
+            html = self._inject_images(result["html"], user_images)
+            variant_htmls = [html]
+            if result.get("variants"):
+                ordered = sorted(result["variants"], key=lambda v: v["index"] != result.get("best", 0))
+                variant_htmls = [self._inject_images(v["html"], user_images) for v in ordered]
+            return {"html": html, "variants": variant_htmls, "context": result.get("context") or {}}
         except Exception as e:
             print(f"❌ [AURA] Integration Error: {e}")
-            return ""
+            return {"html": "", "variants": [""], "context": {}}
     
+    def issue_design(self, analyses: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """이슈 전체 공통 design spec (페이지 분석 결과의 최빈 mood/category 기준)"""
+        moods = [a.get('mood') for a in analyses if a.get('mood')]
+        categories = [a.get('category') for a in analyses if a.get('category')]
+        mood = max(set(moods), key=moods.count) if moods else 'Modern'
+        category = max(set(categories), key=categories.count) if categories else 'Magazine'
+        return {
+            "mood": mood,
+            "category": category,
+            "typography_style": self._suggest_typography(category),
+            "color_scheme": self._suggest_color_scheme(mood)
+        }
+
+    async def aura_issue_style(self, title: str, pages: List[Dict[str, Any]],
+                               analyses: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        이슈 모드: 모든 페이지가 공유할 디자인/타이포그래피를 한 번만 결정
+
+        Returns:
+            {"design": {...}, "typography": {...}} - aura_render_page 의 user_content['issue_style'] 로 전달
+        """
+        from tool.mcp_client import mcp_client
+
+        design = self.issue_design(analyses)
+        keywords = [k for a in analyses for k in a.get('visual_keywords', [])]
+        vision_context = {
+            "keywords": list(dict.fromkeys(keywords))[:12],
+            "description": " / ".join(a.get('description', '') for a in analyses)[:500],
+            "visual_style": design["mood"]
+        }
+        issue = {
+            "title": title,
+            "pages": [{"headline": p.get('headline', ''), "body": p.get('body', '')} for p in pages]
+        }
+        print(f"📚 [AURA] Issue style for {len(pages)} pages: {design['mood']} / {design['category']}")
+        typography = json.loads(await mcp_client.generate_issue_style(
+            json.dumps(issue), json.dumps(vision_context), json.dumps(design)
+        ))
+        return {"design": design, "typography": typography}
+
+    @staticmethod
+    def _source(raw: Union[SourceImage, bytes, str]) -> Union[SourceImage, bytes]:
+        """user_content['images'] 항목: spool 된 업로드(SourceImage), 원본 bytes, 또는 예전 형식의 data URI"""
+        if isinstance(raw, (SourceImage, bytes)):
+            return raw
+        from asset_store import decode_data_uri
+        try:
+            return decode_data_uri(raw)
+        except Exception as e:
+            print(f"  ⚠️ Undecodable image data: {e}")
+            return b""
+
+    def _inject_images(self, html: str, user_images: List[str]) -> str:
+        """플레이스홀더에 이미지(/assets URL) 주입 + Tailwind 스크립트 추가"""
+        # Image Placeholder Injection
+        for i, img_src in enumerate(user_images):
+            injected = False
+            
+            patterns = [
+                f"__IMAGE_{i}__",
+                f"{{{{IMAGE_PLACEHOLDER_{i}}}}}",
+                f"[IMAGE_{i}]",
+                f"{{IMAGE_{i}}}",
+                f"$IMAGE_{i}$"
+            ]
+            
+            for pattern in patterns:
+                if pattern in html:
+                    html = html.replace(pattern, img_src, 1)
+                    print(f"  ✅ [Image {i}] Injected via pattern: {pattern}")
+                    injected = True
+                    break
+            
+            if not injected:
+                url_pattern = f"url({patterns[0]})"
+                if url_pattern in html:
+                    html = html.replace(url_pattern, f"url({img_src})")
+                    print(f"  ✅ [Image {i}] Injected via url() pattern")
+                    injected = True
+            
+            if not injected:
+                print(f"  ⚠️ [Image {i}] No placeholder found! Forcing injection...")
+                img_tag = f'<img src="{img_src}" class="w-[30%] h-[120px] object-cover inline-block mx-2 my-2" alt="Image {i}" />'
+                
+                if '</div>' in html:
+                    last_div_pos = html.rfind('</div>')
+                    html = html[:last_div_pos] + img_tag + html[last_div_pos:]
+                else:
+                    html = html + img_tag
+        
+        # Tailwind CSS Script Injection
+        tailwind_script = '<script src="https://cdn.tailwindcss.com"></script>\n'
+        if "<head>" in html:
+            html = html.replace("<head>", f"<head>\n{tailwind_script}")
+        elif "<html>" in html:
+            html = html.replace("<html>", f"<html>\n<head>{tailwind_script}</head>")
+        else:
+            html = tailwind_script + html
+
+        return html
+
     def _suggest_typography(self, category: str) -> str:
         typography_map = {
             "Fashion": "Elegant serif, high contrast",
@@ -314,8 +554,10 @@ class VoyageRetriever:
         print(f"   Model: {Config.VOYAGE_MODEL}")
         print(f"   Dimensions: {Config.VOYAGE_DIMENSIONS}")
         
-        # Initialize Voyage client
+        # Initialize Voyage client (키 풀 사용 시 키별 client 는 _client_for 에서 생성)
         self.client = voyageai.Client(api_key=Config.VOYAGE_API_KEY)
+        self._clients = {}
+        self._async_clients = {}
         
         # Initialize ChromaDB
         print(f"   Connecting to ChromaDB at {Config.CHROMA_DB_PATH}...")
@@ -402,6 +644,15 @@ class VoyageRetriever:
             
         return "\n".join(text_parts)
 
+    def _client_for(self, api_key: str = None):
+        """llm_gateway 가 배정한 키의 Voyage client"""
+        if not api_key or api_key == Config.VOYAGE_API_KEY:
+            return self.client
+        if api_key not in self._clients:
+            import voyageai
+            self._clients[api_key] = voyageai.Client(api_key=api_key)
+        return self._clients[api_key]
+
     def _get_voyage_embeddings(self, texts: List[str], input_type: str = "document") -> List[List[float]]:
         """
         Get embeddings from Voyage AI API.
@@ -420,12 +671,14 @@ class VoyageRetriever:
         for i in range(0, len(texts), batch_size):
             batch = texts[i:i+batch_size]
             
-            result = self.client.embed(
-                batch,
-                model=Config.VOYAGE_MODEL,
-                input_type=input_type,
-                output_dimension=Config.VOYAGE_DIMENSIONS  # Matryoshka dimension
-            )
+            tokens = sum(estimate_tokens(text) for text in batch)
+            with llm_gateway.slot("voyage", f"embed_{input_type}", tokens=tokens) as lease:
+                result = self._client_for(lease.api_key).embed(
+                    batch,
+                    model=Config.VOYAGE_MODEL,
+                    input_type=input_type,
+                    output_dimension=Config.VOYAGE_DIMENSIONS  # Matryoshka dimension
+                )
             
             all_embeddings.extend(result.embeddings)
             
@@ -524,7 +777,35 @@ class VoyageRetriever:
         
         # Get query embedding
         query_embedding = self._get_voyage_embeddings([query], input_type="query")[0]
-        
+        return self._query_collection(query_embedding, filters, top_k)
+
+    async def embed_query_async(self, query: str) -> List[float]:
+        """검색어 임베딩 (비동기, 필터를 바꿔 가며 여러 번 검색할 때 한 번만 호출)"""
+        import voyageai
+
+        async with llm_gateway.async_slot("voyage", "embed_query", tokens=estimate_tokens(query)) as lease:
+            api_key = lease.api_key or Config.VOYAGE_API_KEY
+            if api_key not in self._async_clients:
+                self._async_clients[api_key] = voyageai.AsyncClient(api_key=api_key)
+            result = await self._async_clients[api_key].embed(
+                [query],
+                model=Config.VOYAGE_MODEL,
+                input_type="query",
+                output_dimension=Config.VOYAGE_DIMENSIONS
+            )
+        return result.embeddings[0]
+
+    async def search_async(self, query: str, filters: Dict[str, Any] = None, top_k: int = 5,
+                           query_embedding: List[float] = None) -> List[Dict[str, Any]]:
+        """search 의 비동기 버전 (ChromaDB 조회는 blocking_pool 에서 실행)"""
+        print(f"🔍 [Voyage] Searching: {query}")
+        if filters:
+            print(f"   Filters: {filters}")
+        if query_embedding is None:
+            query_embedding = await self.embed_query_async(query)
+        return await blocking_pool.run(self._query_collection, query_embedding, filters, top_k)
+
+    def _query_collection(self, query_embedding: List[float], filters: Dict[str, Any], top_k: int) -> List[Dict[str, Any]]:
         # Prepare ChromaDB where clause
         chroma_where = None
         if filters:
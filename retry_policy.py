@@ -0,0 +1,135 @@
+"""
+[Retry Policy Module]
+품질 검사 실패 시 html_generator 재시도 여부를 과거 기록으로 결정하는 모듈입니다.
+
+재시도마다:
+1. 직전 검사에서 나온 이슈 종류(overflow, underfill ...)를 재시도 대상으로 기록하고
+2. 재시도 결과에서 각 이슈가 사라졌는지(fixed) 집계합니다.
+
+페이지 유형(pipeline_router.page_bucket) x 이슈 종류별 해결률로 재시도 성공 확률을 예측하고,
+예측값이 낮으면 재시도 없이 지금까지 가장 좋은 HTML 을 바로 채택합니다.
+
+통계 확인:
+    python retry_policy.py [--json]
+"""
+
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from stats_store import CounterStore
+
+
+# 예전 JSON 통계 파일 (있으면 stats_store 로 한 번 가져옴)
+LEGACY_STATS_PATH = os.getenv("AURA_RETRY_STATS", "./retry_stats.json")
+
+MIN_SAMPLES = 5              # 해결률을 신뢰하기 위한 (유형, 이슈) 최소 기록 수
+MIN_RETRY_SUCCESS = 0.15     # 예측 성공 확률이 이보다 낮으면 재시도 생략
+
+# html_quality_checker_node 이슈 메시지 prefix -> 이슈 종류
+ISSUE_KINDS = [
+    ("Missing image placeholders", "missing_images"),
+    ("Images too large", "image_height"),
+    ("Total image height", "image_budget"),
+    ("Container padding", "padding"),
+    ("Element margins", "margins"),
+    ("Very long body", "font_size"),
+    ("Long body", "font_size"),
+    ("Medium body", "font_size"),
+    ("Content overflow", "overflow"),
+    ("Page underfilled", "underfill"),
+]
+
+
+def issue_kind(issue: str) -> str:
+    for prefix, kind in ISSUE_KINDS:
+        if issue.startswith(prefix):
+            return kind
+    return "other"
+
+
+def issue_kinds(issues: List[str]) -> List[str]:
+    """중복 없는 이슈 종류 목록 (순서 유지)"""
+    return list(dict.fromkeys(issue_kind(i) for i in issues))
+
+
+class RetryPolicy:
+    """
+    (페이지 유형, 이슈 종류)별 재시도 해결률 기록 및 재시도 판단
+    """
+
+    def __init__(self, stats: Optional[CounterStore] = None):
+        # 페이지마다 별도 MCP 서버 프로세스가 기록하므로 sqlite 카운터 (stats_store)
+        self.stats = stats or CounterStore("retry", legacy_json=LEGACY_STATS_PATH)
+
+    def record(self, bucket: str, targeted: List[str], remaining: List[str]):
+        """재시도 1회 결과: targeted 중 remaining 에 남지 않은 종류는 해결됨"""
+        try:
+            for kind in targeted:
+                self.stats.increment(bucket, kind, retries=1, fixed=0 if kind in remaining else 1)
+        except Exception as e:
+            print(f"⚠️ [Retry Policy] Failed to save retry stats: {e}", file=sys.stderr)
+
+    def fix_rate(self, bucket: str, kind: str) -> Tuple[float, int]:
+        entry = self.stats.get(bucket, kind)
+        retries = entry.get("retries", 0)
+        # Beta(1, 1) 사전분포로 보정한 해결률
+        return (entry.get("fixed", 0) + 1) / (retries + 2), retries
+
+    # ============ 재시도 판단 ============
+    def should_retry(self, bucket: str, kinds: List[str]) -> Tuple[bool, float, str]:
+        """
+        재시도가 모든 이슈를 해결할 확률 = 이슈 종류별 해결률의 곱
+
+        Returns:
+            (retry, predicted_success, reason)
+        """
+        if os.getenv("AURA_RETRY_POLICY", "learned").lower() == "always":
+            return True, 1.0, "forced by AURA_RETRY_POLICY=always"
+
+        predicted = 1.0
+        unexplored = []
+        for kind in kinds:
+            rate, retries = self.fix_rate(bucket, kind)
+            predicted *= rate
+            if retries < MIN_SAMPLES:
+                unexplored.append(kind)
+
+        if unexplored:
+            return True, predicted, f"not enough history for {unexplored} ({bucket})"
+        if predicted < MIN_RETRY_SUCCESS:
+            return False, predicted, f"predicted success {predicted:.0%} < {MIN_RETRY_SUCCESS:.0%} for {kinds} ({bucket})"
+        return True, predicted, f"predicted success {predicted:.0%} for {kinds} ({bucket})"
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """(유형, 이슈) 별 재시도/해결 횟수와 해결률"""
+        rows = []
+        for bucket, kinds in sorted(self.stats.all().items()):
+            for kind, entry in sorted(kinds.items()):
+                retries = entry.get("retries", 0)
+                rows.append({
+                    "bucket": bucket,
+                    "issue": kind,
+                    "retries": retries,
+                    "fixed": entry.get("fixed", 0),
+                    "fix_rate": round(entry.get("fixed", 0) / retries, 3) if retries else None,
+                })
+        return rows
+
+
+# 전역 인스턴스
+retry_policy = RetryPolicy()
+
+
+if __name__ == "__main__":
+    rows = retry_policy.summary()
+    if "--json" in sys.argv:
+        print(json.dumps(rows, indent=2, ensure_ascii=False))
+    elif not rows:
+        print(f"No retry statistics yet ({retry_policy.stats.db_path})")
+    else:
+        print(f"{'bucket':<24} {'issue':<16} {'retries':>7} {'fixed':>6} {'rate':>6}")
+        for row in rows:
+            rate = f"{row['fix_rate']:.0%}" if row["fix_rate"] is not None else "-"
+            print(f"{row['bucket']:<24} {row['issue']:<16} {row['retries']:>7} {row['fixed']:>6} {rate:>6}")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+HTML Analyzer Microbenchmark
+Compares the legacy substring/regex checks of validator_node + html_quality_checker_node
+with the single-pass html_analyzer on large multi-image pages.
+
+Usage:
+    python scripts/bench_html_analyzer.py [--images 24] [--paragraphs 60] [--repeat 200]
+"""
+
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_analyzer import HTMLAnalysis  # noqa: E402
+
+
+def build_page(image_count: int, paragraphs: int) -> str:
+    """Synthetic multi-image magazine page in the shape html_generator produces"""
+    images = "\n".join(
+        f'      <img src="__IMAGE_{i}__" class="w-full h-[{120 + (i % 5) * 20}px] min-h-[100px] object-cover rounded mb-2" />'
+        for i in range(image_count)
+    )
+    text = "\n".join(
+        f'        <p class="mb-3">패션 위크의 마지막 날, {i}번째 문단은 디자이너의 인터뷰로 이어진다. '
+        f'"Ideally, I\'d have Steps performing" — the collection moved from top-4 tailoring to soft drape.</p>'
+        for i in range(paragraphs)
+    )
+    return f"""<div class="w-[794px] h-[1123px] relative overflow-hidden bg-white text-slate-900 font-serif mx-auto shadow-2xl">
+  <div class="p-6 pb-2">
+    <h1 class="text-4xl font-black mb-1 tracking-tight">Headline</h1>
+    <p class="text-xs text-slate-500 mb-3 uppercase tracking-widest">By Author</p>
+  </div>
+  <div class="flex gap-3 px-6 pb-10 h-[calc(100%-120px)]">
+    <div class="w-[60%] columns-2 gap-3 text-[11px] leading-snug">
+{text}
+      <blockquote class="italic text-red-600 border-l-2 border-red-500 pl-2 my-2">'Quote'</blockquote>
+    </div>
+    <div class="w-[40%] flex flex-col gap-2">
+{images}
+    </div>
+  </div>
+  <p class="absolute bottom-3 right-6 text-[10px] text-slate-400">Page 01</p>
+  <div class="absolute top-4 left-4 w-1 h-16 bg-red-500"></div>
+</div>"""
+
+
+def legacy_checks(html: str, image_count: int) -> dict:
+    """Checks as implemented before html_analyzer (repeated scans over the whole string)"""
+    missing = [i for i in range(image_count) if f"__IMAGE_{i}__" not in html]
+    absolute = html.count("absolute")
+    bottom_padding = "pb-10" in html or "pb-12" in html or "pb-8" in html
+    has_img = "<img" in html
+    missing_q = [i for i in range(image_count) if f"__IMAGE_{i}__" not in html]
+    heights = [int(h) for h in re.findall(r'h-\[(\d+)px\]', html)]
+    paddings = [int(p) for p in re.findall(r'p-(\d+)', html)]
+    margins = [int(m) for m in re.findall(r'mb-(\d+)', html)]
+    small_font = 'text-[10px]' in html or 'text-xs' in html or 'text-sm' in html
+    two_column = 'columns-2' in html
+    return {
+        "missing": missing + missing_q, "absolute": absolute, "bottom_padding": bottom_padding,
+        "has_img": has_img, "heights": heights, "paddings": paddings, "margins": margins,
+        "small_font": small_font, "two_column": two_column,
+    }
+
+
+def analyzer_checks(html: str, image_count: int) -> dict:
+    analysis = HTMLAnalysis(html)  # no cache: measure the parse itself
+    return {
+        "missing": analysis.missing_placeholders(image_count),
+        "absolute": analysis.absolute_count,
+        "bottom_padding": analysis.has_bottom_padding(),
+        "has_img": bool(analysis.images),
+        "heights": analysis.image_heights(),
+        "paddings": analysis.scales("p"),
+        "margins": analysis.scales("mb"),
+        "small_font": analysis.uses('text-[10px]', 'text-xs', 'text-sm'),
+        "two_column": analysis.column_count() >= 2,
+        "body_text_metrics": analysis.body_text_metrics(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=24)
+    parser.add_argument("--paragraphs", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    html = build_page(args.images, args.paragraphs)
+    print(f"Page: {args.images} images, {args.paragraphs} paragraphs, {len(html):,} chars")
+
+    legacy_t = min(timeit.repeat(lambda: legacy_checks(html, args.images), number=args.repeat, repeat=3))
+    analyzer_t = min(timeit.repeat(lambda: analyzer_checks(html, args.images), number=args.repeat, repeat=3))
+    print(f"legacy   : {legacy_t / args.repeat * 1000:.3f} ms/page")
+    print(f"analyzer : {analyzer_t / args.repeat * 1000:.3f} ms/page (single parse, uncached)")
+
+    legacy = legacy_checks(html, args.images)
+    new = analyzer_checks(html, args.images)
+    print("\nContext differences (legacy -> analyzer):")
+    print(f"  image heights counted : {len(legacy['heights'])} -> {len(new['heights'])} (legacy includes wrapper/min-h/decorations)")
+    print(f"  p-N paddings counted  : {len(legacy['paddings'])} -> {len(new['paddings'])} (legacy matches inside top-4, gap-3 ...)")
+    print(f"  absolute occurrences  : {legacy['absolute']} -> {new['absolute']}")
+    print(f"  body text metrics     : {new['body_text_metrics']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Image Pipeline Benchmark
+========================
+업로드 이미지 1장이 페이지 처리에서 쓰는 CPU 시간과 bytes 를 예전 경로와 현재 경로로 비교합니다.
+
+- 예전: 업로드 → PIL 디코딩 → PNG 재인코딩 → base64 (main.image_to_base64)
+        렌더링 시 base64 디코딩 → PIL 디코딩 → 리사이징 → PNG → base64 data URI 를 HTML 에 삽입
+- 현재: 업로드 원본 bytes 유지 (SourceImage, 헤더만 확인)
+        렌더링 시 PIL 디코딩 1회 → 리사이징 → 원본 형식에 맞춰 JPEG/PNG → asset_store (/assets URL)
+
+Usage:
+    python scripts/bench_image_pipeline.py [image_dir] [--limit N]
+"""
+
+import argparse
+import base64
+import io
+import os
+import sys
+import time
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_validator import image_validator, SourceImage  # noqa: E402
+
+VALID_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+MAX_HEIGHT = 600   # rag_voyage.aura_render_page: 이미지 1장일 때 슬롯 높이
+MAX_WIDTH = 400
+
+
+def slot_for(size):
+    width, height = size
+    slot_height = MAX_HEIGHT
+    slot_width = int(slot_height * width / height)
+    if slot_width > MAX_WIDTH:
+        slot_width = MAX_WIDTH
+        slot_height = int(slot_width * height / width)
+    return {"width": slot_width, "height": slot_height, "fit_mode": "contain"}
+
+
+def old_pipeline(data: bytes):
+    started = time.process_time()
+    # main.image_to_base64
+    img = Image.open(io.BytesIO(data))
+    buffered = io.BytesIO()
+    img.save(buffered, format="PNG")
+    upload_b64 = f"data:image/png;base64,{base64.b64encode(buffered.getvalue()).decode()}"
+    # aura_render: base64 → PIL → prepare_for_layout (PNG data URI)
+    decoded = Image.open(io.BytesIO(base64.b64decode(upload_b64.split(",")[1])))
+    result = image_validator.prepare_for_layout(decoded, slot_info=slot_for(decoded.size))
+    cpu = time.process_time() - started
+    return cpu, len(upload_b64), len(result["base64"])
+
+
+def new_pipeline(data: bytes):
+    started = time.process_time()
+    source = SourceImage(data)
+    result = image_validator.prepare_for_layout(source, slot_info=slot_for(source.size), as_data_uri=False,
+                                                output_format=source.output_format())
+    cpu = time.process_time() - started
+    return cpu, len(data), len(result["image_bytes"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("image_dir", nargs="?", default="./image_data")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    files = sorted(f for f in os.listdir(args.image_dir) if f.lower().endswith(VALID_EXTENSIONS))[:args.limit]
+    if not files:
+        print(f"No images found in {args.image_dir}")
+        return
+
+    print("=" * 60)
+    print("🖼️  Image Pipeline Benchmark (per image)")
+    print("=" * 60)
+    print(f"{'file':<28} {'old ms':>8} {'new ms':>8} {'old KB':>9} {'new KB':>9}")
+
+    totals = [0.0, 0.0, 0, 0]
+    for filename in files:
+        with open(os.path.join(args.image_dir, filename), "rb") as f:
+            data = f.read()
+        old_cpu, old_upload, old_served = old_pipeline(data)
+        new_cpu, new_upload, new_served = new_pipeline(data)
+        # bytes: 요청 처리 중 들고 있는 업로드 표현 + 응답 HTML 로 나가는 이미지
+        old_bytes, new_bytes = old_upload + old_served, new_upload + new_served
+        totals[0] += old_cpu
+        totals[1] += new_cpu
+        totals[2] += old_bytes
+        totals[3] += new_bytes
+        print(f"{filename[:28]:<28} {old_cpu * 1000:>8.0f} {new_cpu * 1000:>8.0f} "
+              f"{old_bytes / 1024:>9.0f} {new_bytes / 1024:>9.0f}")
+
+    n = len(files)
+    print("-" * 60)
+    print(f"{'average':<28} {totals[0] / n * 1000:>8.0f} {totals[1] / n * 1000:>8.0f} "
+          f"{totals[2] / n / 1024:>9.0f} {totals[3] / n / 1024:>9.0f}")
+    if totals[0] and totals[2]:
+        print(f"\n✅ CPU saved: {(1 - totals[1] / totals[0]) * 100:.0f}%, "
+              f"bytes saved: {(1 - totals[3] / totals[2]) * 100:.0f}% per image")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ Uses Gemini 2.5 Flash Vision for layout analysis
 """
 
 import os
+import sys
 import json
 import time
 from PIL import Image
@@ -13,6 +14,10 @@ from pathlib import Path
 from dotenv import load_dotenv
 import google.generativeai as genai
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_gateway import llm_gateway, gemini_model, GEMINI_IMAGE_TOKENS  # noqa: E402
+
 # Load environment variables
 load_dotenv()
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
@@ -110,8 +115,6 @@ def classify_and_split(image_info: dict) -> list:
 
 def analyze_layout(image_path: str) -> dict:
     """Step 3: Analyze layout using Gemini 2.5 Flash Vision"""
-    model = genai.GenerativeModel("gemini-2.5-flash")
-    
     # Load image
     img = Image.open(image_path)
     width, height = img.size
@@ -149,7 +152,9 @@ def analyze_layout(image_path: str) -> dict:
     }}
     """
     
-    response = model.generate_content([prompt, img])
+    tokens = len(prompt) // 4 + GEMINI_IMAGE_TOKENS + 1500
+    with llm_gateway.slot("gemini", "dataset_layout", tokens=tokens, priority="batch") as lease:
+        response = gemini_model("gemini-2.5-flash", lease.api_key).generate_content([prompt, img])
     
     # Parse JSON
     result_text = response.text.strip()
@@ -12,6 +12,7 @@ Output:
 """
 
 import os
+import sys
 import json
 import time
 import base64
@@ -22,11 +23,15 @@ import io
 from dotenv import load_dotenv
 import google.generativeai as genai
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_gateway import llm_gateway, gemini_model, load_keys, GEMINI_IMAGE_TOKENS  # noqa: E402
+
 # Load environment variables
 load_dotenv()
 
 # Configuration
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY") or next(iter(load_keys("gemini")), None)
 IMAGE_DIR = "./image_data"
 OUTPUT_PATH = "./datas/dataset_final.json"
 MODEL_NAME = "gemini-2.5-flash"
@@ -92,7 +97,10 @@ Only return valid JSON, no markdown formatting or extra text.
 """
 
     try:
-        response = model.generate_content([prompt, image])
+        tokens = len(prompt) // 4 + GEMINI_IMAGE_TOKENS + 1500
+        with llm_gateway.slot("gemini", "dataset_layout", tokens=tokens, priority="batch") as lease:
+            key_model = gemini_model(MODEL_NAME, lease.api_key) if lease.api_key else model
+            response = key_model.generate_content([prompt, image])
         text = response.text.strip()
         
         # Clean up response
@@ -0,0 +1,175 @@
+"""
+Web Worker Load Test
+====================
+uvicorn 작업자 수(--workers)별로 서버를 띄워 같은 부하를 주고 처리량(req/s)과 지연 시간을 비교합니다.
+계정/세션이 user_store(sqlite)에 있으므로 어느 작업자가 요청을 받아도 같은 로그인 상태여야 하며,
+응답이 401 이면 오류로 집계합니다.
+
+시나리오:
+- index : 로그인한 세션으로 GET / (세션 조회 + 정적 파일 응답)
+- login : POST /login (PBKDF2 비밀번호 확인, CPU 사용량이 큼)
+
+작업 큐 작업자는 띄우지 않고 (AURA_JOB_WORKERS=0), AURA_WEB_WORKERS 를 작업자 수와 같게 지정합니다.
+서버 시작에는 .env 의 API 키(GOOGLE_API_KEY, VOY_API_KEY)와 chroma DB 가 필요합니다
+(두 시나리오 모두 외부 API 를 호출하지 않으므로 키 값은 검사하지 않음).
+
+Usage:
+    python scripts/load_test.py [--workers 1 2 4] [--scenario index|login] [--concurrency 32] [--duration 10]
+    python scripts/load_test.py --url http://host:8000 [--scenario ...]   # 이미 실행 중인 서버 측정
+"""
+
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USERNAME, PASSWORD = "demo", "demo123"
+STARTUP_TIMEOUT = 120.0
+
+
+def login(host: str, port: int) -> str:
+    """로그인 후 세션 쿠키 (session=...)"""
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    try:
+        conn.request("POST", "/login", body=json.dumps({"username": USERNAME, "password": PASSWORD}),
+                     headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"login failed: HTTP {response.status}")
+        return response.getheader("Set-Cookie").split(";", 1)[0]
+    finally:
+        conn.close()
+
+
+def wait_ready(host: str, port: int, process: subprocess.Popen):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request("GET", "/login")
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError("server did not start in time")
+
+
+def run_load(host: str, port: int, scenario: str, concurrency: int, duration: float) -> Dict[str, float]:
+    cookie = login(host, port)
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        local, failed = [], 0
+        body = json.dumps({"username": USERNAME, "password": PASSWORD})
+        while time.monotonic() < stop_at:
+            started = time.monotonic()
+            try:
+                if scenario == "login":
+                    conn.request("POST", "/login", body=body, headers={"Content-Type": "application/json"})
+                else:
+                    conn.request("GET", "/", headers={"Cookie": cookie})
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    failed += 1
+                    continue
+                local.append(time.monotonic() - started)
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0,
+    }
+
+
+def run_with_workers(workers: int, port: int, args) -> Dict[str, float]:
+    env = dict(os.environ, AURA_JOB_WORKERS="0", AURA_WEB_WORKERS=str(workers))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL if not args.verbose else None,
+    )
+    try:
+        wait_ready("127.0.0.1", port, process)
+        run_load("127.0.0.1", port, args.scenario, args.concurrency, 2.0)    # 워밍업
+        return run_load("127.0.0.1", port, args.scenario, args.concurrency, args.duration)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def print_row(label: str, result: Dict[str, float], baseline: Optional[float]):
+    speedup = f"{result['rps'] / baseline:.2f}x" if baseline else "-"
+    print(f"{label:<10} {result['rps']:>9.1f} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} "
+          f"{result['errors']:>7} {speedup:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 4])
+    parser.add_argument("--scenario", choices=("index", "login"), default="index")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--url", help="measure an already running server instead of starting one")
+    parser.add_argument("--verbose", action="store_true", help="show server stderr")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"🚦 Load test: {args.scenario}, {args.concurrency} clients, {args.duration:.0f}s per run")
+    print("=" * 60)
+    print(f"{'workers':<10} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7} {'speedup':>8}")
+
+    if args.url:
+        url = urlparse(args.url)
+        print_row("external", run_load(url.hostname, url.port or 80, args.scenario, args.concurrency,
+                                       args.duration), None)
+        return
+
+    baseline = None
+    for workers in sorted(set(args.workers)):
+        result = run_with_workers(workers, args.port, args)
+        print_row(str(workers), result, baseline)
+        baseline = baseline or result["rps"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+[Stats Store Module]
+pipeline_router / retry_policy 의 통과율·해결률 카운터를 sqlite(WAL) 에 저장하는 공용 저장소입니다.
+
+페이지마다 별도 MCP 서버 프로세스가 동시에 기록하므로, JSON 파일을 읽고-고치고-쓰면 갱신이 사라집니다.
+카운터는 (namespace, bucket, name, field) 행 하나씩이며 n = n + delta 로 더해 동시 기록에도 값이 유지됩니다.
+예전 JSON 통계 파일이 있으면 해당 namespace 가 비어 있을 때 한 번 가져옵니다.
+
+사용:
+    store = CounterStore("pipeline", legacy_json="./pipeline_stats.json")
+    store.increment("ARTICLE:1:short", "single", runs=1, passed=1)
+    store.get("ARTICLE:1:short", "single")   # {"runs": 1, "passed": 1}
+"""
+
+import json
+import os
+import sqlite3
+import sys
+from typing import Dict, Optional
+
+
+DB_PATH = os.getenv("AURA_STATS_DB", "./.stats.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    namespace TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    name TEXT NOT NULL,
+    field TEXT NOT NULL,
+    n INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (namespace, bucket, name, field)
+);
+"""
+
+
+class CounterStore:
+    """
+    namespace 별 (bucket, name) → {field: 정수} 카운터 (프로세스 간 공유)
+    """
+
+    def __init__(self, namespace: str, db_path: str = DB_PATH, legacy_json: Optional[str] = None):
+        self.namespace = namespace
+        self.db_path = db_path
+        self.legacy_json = legacy_json
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._import_legacy(conn)
+            self._initialized = True
+        return conn
+
+    def _import_legacy(self, conn: sqlite3.Connection):
+        """예전 JSON 통계 ({bucket: {name: {field: n}}}) 를 비어 있는 namespace 에 가져옴"""
+        if not self.legacy_json or not os.path.exists(self.legacy_json):
+            return
+        try:
+            with open(self.legacy_json, "r", encoding="utf-8") as f:
+                stats = json.load(f)
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM counters WHERE namespace = ? LIMIT 1", (self.namespace,)).fetchone():
+                conn.execute("COMMIT")
+                return
+            conn.executemany(
+                "INSERT INTO counters (namespace, bucket, name, field, n) VALUES (?, ?, ?, ?, ?)",
+                [(self.namespace, bucket, name, field, int(n))
+                 for bucket, names in stats.items()
+                 for name, fields in names.items()
+                 for field, n in fields.items()],
+            )
+            conn.execute("COMMIT")
+            print(f"📦 [Stats] Imported {self.legacy_json} into {self.db_path} ({self.namespace})", file=sys.stderr)
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            print(f"⚠️ [Stats] Could not import {self.legacy_json}: {e}", file=sys.stderr)
+
+    def increment(self, bucket: str, name: str, **deltas: int):
+        """카운터 여러 개를 한 트랜잭션으로 더함 (예: runs=1, passed=0)"""
+        conn = self._connect()
+        try:
+            conn.executemany(
+                "INSERT INTO counters (namespace, bucket, name, field, n) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (namespace, bucket, name, field) DO UPDATE SET n = n + excluded.n",
+                [(self.namespace, bucket, name, field, delta) for field, delta in deltas.items()],
+            )
+        finally:
+            conn.close()
+
+    def decay(self, bucket: str, name: str, window: int, field: str = "runs"):
+        """
+        field 가 window 를 넘으면 (bucket, name) 의 모든 카운터를 window / 2 기준으로 같은 비율로 줄임
+        (비율은 유지하면서 오래된 기록의 비중을 낮춰 최근 결과가 빨리 반영되도록)
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT n FROM counters WHERE namespace = ? AND bucket = ? AND name = ? AND field = ?",
+                (self.namespace, bucket, name, field),
+            ).fetchone()
+            if row and row[0] > window:
+                conn.execute(
+                    "UPDATE counters SET n = CAST(ROUND(n * ?) AS INTEGER) "
+                    "WHERE namespace = ? AND bucket = ? AND name = ?",
+                    ((window // 2) / row[0], self.namespace, bucket, name),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def get(self, bucket: str, name: str) -> Dict[str, int]:
+        conn = self._connect()
+        try:
+            return {field: n for field, n in conn.execute(
+                "SELECT field, n FROM counters WHERE namespace = ? AND bucket = ? AND name = ?",
+                (self.namespace, bucket, name),
+            )}
+        finally:
+            conn.close()
+
+    def all(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """{bucket: {name: {field: n}}}"""
+        conn = self._connect()
+        try:
+            stats: Dict[str, Dict[str, Dict[str, int]]] = {}
+            for bucket, name, field, n in conn.execute(
+                "SELECT bucket, name, field, n FROM counters WHERE namespace = ?", (self.namespace,)
+            ):
+                stats.setdefault(bucket, {}).setdefault(name, {})[field] = n
+            return stats
+        finally:
+            conn.close()
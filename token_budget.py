@@ -0,0 +1,275 @@
+"""
+[Token Budget Module]
+LLM 호출 지점별 입력 토큰을 측정하고, 노드별 정책에 따라 프롬프트 입력을 줄이는 모듈입니다.
+
+정책 종류:
+1. full        : 원문 그대로 전송 (HTML 생성기의 본문처럼 모든 글자가 필요한 경우)
+2. truncate    : max_tokens 에 맞게 앞부분만 전송
+3. summarize   : 한 번 요약한 결과를 본문 해시별로 캐시해 재사용 (요약기가 없으면 truncate 로 대체)
+                 typography_styler 가 사용하며, FastAPI 프로세스가 Vision 분석과 동시에 만든 요약을
+                 MCP 서버 프로세스에 body_summary 로 넘겨 remember_summary() 로 같은 캐시에 넣습니다.
+                 요약 호출은 원래 없던 호출이므로 절약량에서 빠지는 비용으로 기록됩니다.
+4. length_only : 글자 수만 전송 (레이아웃 플래너처럼 길이만 필요한 경우)
+5. compact_json: dict/list 를 공백 없는 JSON 으로 직렬화하고 불필요한 키를 제거
+
+요청 단위로 절약된 토큰을 집계하여 report() 로 출력합니다.
+"""
+
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+
+
+# 본문 요약 크기 (캐시 키에 포함되므로 요약을 만드는 쪽과 typography_styler 가 같은 값을 써야 재사용됨)
+BODY_SUMMARY_TOKENS = 256
+MAX_SUMMARIES = 256        # 보관할 최대 요약 수 (오래 쓰지 않은 것부터 제거)
+
+# 노드(호출 지점)별 필드 정책
+# 지정되지 않은 필드는 "full" 로 처리됩니다.
+NODE_POLICIES: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "analyze_page": {
+        "body": {"policy": "truncate", "max_tokens": 512},
+    },
+    "layout_planner": {
+        "body": {"policy": "length_only"},
+        "image_analysis": {"policy": "compact_json", "drop_keys": ["layout_recommendation"]},
+    },
+    "typography_styler": {
+        "body": {"policy": "summarize", "max_tokens": BODY_SUMMARY_TOKENS},
+    },
+    "html_generator": {
+        "body": {"policy": "full"},
+        "image_analysis": {"policy": "compact_json"},
+        "layout_plan": {"policy": "compact_json", "drop_keys": ["reasoning"]},
+        "typography": {"policy": "compact_json"},
+    },
+}
+
+
+def is_wide_char(ch: str) -> bool:
+    """한글/한자/가나 등 대부분의 토크나이저에서 글자당 1토큰 이상인 문자"""
+    code = ord(ch)
+    return (
+        0xAC00 <= code <= 0xD7A3      # 한글 음절
+        or 0x1100 <= code <= 0x11FF   # 한글 자모
+        or 0x3130 <= code <= 0x318F   # 한글 호환 자모
+        or 0x3040 <= code <= 0x30FF   # 히라가나/가타카나
+        or 0x4E00 <= code <= 0x9FFF   # CJK 통합 한자
+    )
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토큰 수 추정 (네트워크 호출 없이 로컬 계산)
+    - 한글/CJK: 글자당 1토큰
+    - 그 외: 4글자당 1토큰
+    """
+    if not text:
+        return 0
+    wide = sum(1 for ch in text if is_wide_char(ch))
+    other = len(text) - wide
+    return wide + (other + 3) // 4
+
+
+class RequestLedger:
+    """요청 1건 동안의 호출 지점별 토큰 사용량 기록"""
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.entries: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()  # 페이지 동시 처리 시 여러 스레드에서 기록
+
+    def add(self, node: str, original: int, sent: int):
+        with self._lock:
+            entry = self.entries.setdefault(node, {"calls": 0, "original_tokens": 0, "sent_tokens": 0})
+            entry["calls"] += 1
+            entry["original_tokens"] += original
+            entry["sent_tokens"] += sent
+
+    def summary(self) -> Dict[str, Any]:
+        original = sum(e["original_tokens"] for e in self.entries.values())
+        sent = sum(e["sent_tokens"] for e in self.entries.values())
+        return {
+            "request_id": self.request_id,
+            "original_tokens": original,
+            "sent_tokens": sent,
+            "saved_tokens": original - sent,
+            "nodes": self.entries,
+        }
+
+
+_current_ledger: ContextVar[Optional[RequestLedger]] = ContextVar("token_budget_ledger", default=None)
+
+
+class TokenBudgetManager:
+    """
+    호출 지점별 입력 토큰 예산 관리자
+    """
+
+    def __init__(self, policies: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None,
+                 max_summaries: int = MAX_SUMMARIES):
+        self.policies = policies if policies is not None else NODE_POLICIES
+        self.max_summaries = max_summaries
+        self._summarizer: Optional[Callable[[str, int], str]] = None
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ============ 요청 단위 집계 ============
+    def start_request(self, request_id: str) -> RequestLedger:
+        """현재 컨텍스트(스레드/태스크)에 새 요청 집계를 시작"""
+        ledger = RequestLedger(request_id)
+        _current_ledger.set(ledger)
+        return ledger
+
+    def report(self) -> Dict[str, Any]:
+        """현재 요청의 토큰 절약량을 출력하고 반환"""
+        ledger = _current_ledger.get()
+        if ledger is None:
+            return {}
+        summary = ledger.summary()
+        print(
+            f"🪙 [Token Budget] {summary['request_id']}: "
+            f"sent {summary['sent_tokens']} / {summary['original_tokens']} tokens "
+            f"(saved {summary['saved_tokens']})",
+            file=sys.stderr
+        )
+        for node, entry in summary["nodes"].items():
+            saved = entry["original_tokens"] - entry["sent_tokens"]
+            print(f"   - {node}: {entry['calls']} call(s), saved {saved} tokens", file=sys.stderr)
+        return summary
+
+    # ============ 정책 설정 ============
+    def set_policy(self, node: str, field: str, policy: str, **options):
+        self.policies.setdefault(node, {})[field] = {"policy": policy, **options}
+
+    def register_summarizer(self, summarizer: Callable[[str, int], str]):
+        """summarize 정책에서 사용할 요약 함수 등록: summarizer(text, max_tokens) -> str"""
+        self._summarizer = summarizer
+
+    # ============ 정책 적용 ============
+    def apply(self, node: str, fields: Dict[str, Any]) -> Dict[str, str]:
+        """
+        노드의 프롬프트 입력 필드에 정책을 적용
+
+        Args:
+            node: 호출 지점 이름 (NODE_POLICIES 의 키)
+            fields: {필드명: 원본 값}. dict/list 는 JSON 으로 직렬화됩니다.
+
+        Returns:
+            {필드명: 프롬프트에 넣을 문자열}
+        """
+        node_policies = self.policies.get(node, {})
+        output = {}
+        original_total = 0
+        sent_total = 0
+
+        for name, value in fields.items():
+            rule = node_policies.get(name, {"policy": "full"})
+            original = value if isinstance(value, str) else json.dumps(value)
+            sent = self._apply_rule(rule, value, original)
+            original_total += estimate_tokens(original)
+            sent_total += estimate_tokens(sent)
+            output[name] = sent
+
+        ledger = _current_ledger.get()
+        if ledger is not None:
+            ledger.add(node, original_total, sent_total)
+        return output
+
+    def measure(self, node: str, prompt_text: str, saved: int = 0) -> int:
+        """정책 적용 대상이 아닌 프롬프트 전체 크기를 기록 (saved 는 다른 수단으로 줄인 토큰)"""
+        tokens = estimate_tokens(prompt_text)
+        ledger = _current_ledger.get()
+        if ledger is not None:
+            ledger.add(node, tokens + saved, tokens)
+        return tokens
+
+    def _apply_rule(self, rule: Dict[str, Any], value: Any, original: str) -> str:
+        policy = rule.get("policy", "full")
+
+        if policy == "length_only":
+            return str(len(value)) if isinstance(value, (str, list, dict)) else original
+        if policy == "compact_json":
+            if isinstance(value, dict):
+                drop = set(rule.get("drop_keys", []))
+                value = {k: v for k, v in value.items() if k not in drop}
+            if isinstance(value, (dict, list)):
+                return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+            return original
+        if policy == "truncate":
+            return truncate_to_tokens(original, rule.get("max_tokens", 512))
+        if policy == "summarize":
+            return self._summarize(original, rule.get("max_tokens", BODY_SUMMARY_TOKENS))
+        return original
+
+    # ============ 요약 캐시 ============
+    def summarize(self, text: str, max_tokens: int = BODY_SUMMARY_TOKENS) -> str:
+        """
+        summarize 정책과 같은 요약 (캐시에 없으면 요약기를 호출하므로 비동기 코드에서는 blocking_pool 에서 호출)
+        max_tokens 이하인 텍스트는 그대로 반환합니다.
+        """
+        return self._summarize(text, max_tokens)
+
+    def remember_summary(self, text: str, summary: str, max_tokens: int = BODY_SUMMARY_TOKENS):
+        """다른 프로세스에서 만든 요약을 캐시에 넣음 (이후 summarize 정책이 요약기 없이 재사용)"""
+        if summary and estimate_tokens(text) > max_tokens:
+            self._store_summary(self._summary_key(text, max_tokens), summary)
+
+    def _store_summary(self, key: str, summary: str):
+        with self._lock:
+            self._summaries[key] = summary
+            self._summaries.move_to_end(key)
+            while len(self._summaries) > self.max_summaries:
+                self._summaries.popitem(last=False)
+
+    @staticmethod
+    def _summary_key(text: str, max_tokens: int) -> str:
+        return f"{hashlib.sha1(text.encode('utf-8')).hexdigest()}:{max_tokens}"
+
+    def _summarize(self, text: str, max_tokens: int) -> str:
+        """요약은 텍스트 해시별로 한 번만 수행하고 재사용"""
+        if estimate_tokens(text) <= max_tokens:
+            return text
+        key = self._summary_key(text, max_tokens)
+        with self._lock:
+            cached = self._summaries.get(key)
+            if cached is not None:
+                self._summaries.move_to_end(key)
+        if cached is not None:
+            return cached
+        if self._summarizer is None:
+            return truncate_to_tokens(text, max_tokens)
+        try:
+            summary = self._summarizer(text, max_tokens)
+        except Exception as e:
+            print(f"⚠️ [Token Budget] Summarizer failed, truncating instead: {e}", file=sys.stderr)
+            return truncate_to_tokens(text, max_tokens)
+        # 요약 호출은 원래 없던 호출이므로 원문 전체가 추가 비용 (절약량이 그만큼 줄어듦)
+        ledger = _current_ledger.get()
+        if ledger is not None:
+            ledger.add("summarize", 0, estimate_tokens(text))
+        self._store_summary(key, summary)
+        return summary
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """추정 토큰 수가 max_tokens 이하가 되도록 앞부분만 남김"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    budget = max_tokens * 4  # 1 wide 문자 = 4, 일반 문자 = 1 단위
+    used = 0
+    cut = 0
+    for i, ch in enumerate(text):
+        used += 4 if is_wide_char(ch) else 1
+        if used > budget:
+            break
+        cut = i + 1
+    return text[:cut].rstrip() + f" …[{len(text) - cut} chars omitted]"
+
+
+# 전역 인스턴스
+token_budget = TokenBudgetManager()
@@ -31,15 +31,82 @@ class AURAClient:
                               layout_override: str,
                               vision_json: str,
                               design_json: str,
-                              plan_json: str) -> str:
-        
+                              plan_json: str,
+                              variants: int = 1,
+                              reuse_json: str = "{}",
+                              include_context: bool = False,
+                              features_json: str = "[]",
+                              priority: str = None,
+                              body_summary: str = "",
+                              typography_json: str = "{}") -> str:
+        """
+        priority: 서버 프로세스의 LLM 호출 우선순위 ("interactive" / "batch", llm_gateway 참고)
+        body_summary: 이 프로세스에서 만든 본문 요약 (서버의 typography_styler 가 요약기 없이 재사용)
+        typography_json: typography_style 위에 덮어쓸 페이지별 override JSON
+        """
+
+        arguments = {
+            "headline": headline,
+            "body": body,
+            "image_data": json.dumps(image_data) if isinstance(image_data, list) else image_data,
+            "layout_override": layout_override,
+            "vision_context": vision_json,
+            "design_spec": design_json,
+            "planner_intent": plan_json
+        }
+        # LangGraph 서버 전용 옵션 (응답은 {"html", "context", "best", "variants"} JSON)
+        if variants > 1:
+            arguments["variants"] = variants
+        if reuse_json and reuse_json != "{}":
+            arguments["reuse_context"] = reuse_json
+        if include_context:
+            arguments["include_context"] = True
+        if features_json and features_json != "[]":
+            arguments["image_features"] = features_json
+        if body_summary:
+            arguments["body_summary"] = body_summary
+        if typography_json and typography_json != "{}":
+            arguments["typography_override"] = typography_json
+
         if not MCP_AVAILABLE:
             return self._mock_generation(headline, layout_override)
 
+        return await self._call_tool(
+            "generate_magazine_layout",
+            arguments,
+            timeout=300.0,  # 300초 타임아웃 (LLM Judge + retry loop 대응)
+            timeout_result="<div>Layout generation timed out. Please try again.</div>",
+            priority=priority
+        )
+
+    async def generate_issue_style(self, issue_json: str, vision_json: str = "{}", design_json: str = "{}") -> str:
+        """
+        이슈 전체가 공유할 typography_style JSON (실패 시 "{}")
+        issue_json: {"title": str, "pages": [{"headline", "body"}, ...]}
+        """
+        if not MCP_AVAILABLE:
+            return "{}"
+        result = await self._call_tool(
+            "generate_issue_style",
+            {"issue_data": issue_json, "vision_context": vision_json, "design_spec": design_json},
+            timeout=120.0,
+            timeout_result="{}"
+        )
+        try:
+            json.loads(result)
+            return result
+        except ValueError:
+            return "{}"
+
+    async def _call_tool(self, tool_name: str, arguments: dict, timeout: float, timeout_result: str,
+                         priority: str = None) -> str:
+        env = os.environ.copy()
+        if priority:
+            env["AURA_LLM_PRIORITY"] = priority
         server_params = StdioServerParameters(
             command="python",
             args=[self.server_script], 
-            env=os.environ.copy()
+            env=env
         )
 
         try:
@@ -50,30 +117,19 @@ class AURAClient:
                     # Tool 실행 (with Timeout)
                     try:
                         result = await asyncio.wait_for(
-                            session.call_tool(
-                                "generate_magazine_layout",
-                                arguments={
-                                    "headline": headline,
-                                    "body": body,
-                                    "image_data": json.dumps(image_data) if isinstance(image_data, list) else image_data,
-                                    "layout_override": layout_override,
-                                    "vision_context": vision_json,
-                                    "design_spec": design_json,
-                                    "planner_intent": plan_json
-                                }
-                            ),
-                            timeout=300.0 # 300초 타임아웃 (LLM Judge + retry loop 대응)
+                            session.call_tool(tool_name, arguments=arguments),
+                            timeout=timeout
                         )
                     except asyncio.TimeoutError:
                         print("❌ [AURA Client] Timeout detected!")
-                        return "<div>Layout generation timed out. Please try again.</div>"
+                        return timeout_result
                     
-                    final_html = ""
+                    final_text = ""
                     for content in result.content:
                         if content.type == 'text':
-                            final_html += content.text
+                            final_text += content.text
                             
-                    return final_html
+                    return final_text
                     
         except Exception as e:
             print(f"❌ [AURA Client] Error: {e}")
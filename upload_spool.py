@@ -0,0 +1,214 @@
+"""
+[Upload Spool Module]
+업로드 이미지를 메모리에 통째로 올리지 않고 디스크로 흘려 저장(spool)하는 모듈입니다.
+
+1. spool_uploads : UploadFile 을 CHUNK_SIZE 단위로 읽어 upload_store(공개되지 않는 업로드 저장소)에 기록 (sha256 을 쓰면서 계산 → 내용 주소로 이동)
+                   - 파일당 MAX_FILE_BYTES, 요청당 MAX_REQUEST_BYTES 를 넘으면 UploadRejected (413)
+                   - 앞부분만으로 헤더를 확인해 픽셀 수가 MAX_PIXELS 를 넘으면 나머지를 읽기 전에 거절
+                   - 이미지가 아닌 파일은 예전처럼 경고 후 건너뜀
+                   - 결과는 파일 경로만 가진 SourceImage (원본 bytes / 픽셀은 필요할 때 읽고 디코딩)
+2. memory_tracker: 요청 1건이 동시에 메모리에 올린 이미지 데이터(원본 bytes + 디코딩된 픽셀)의 최대값 기록
+                   요청 끝에 spool 한 용량, 프로세스 최대 RSS 와 함께 출력
+"""
+
+import hashlib
+import io
+import os
+import resource
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from PIL import Image
+
+from asset_store import upload_store
+from event_loop import blocking_pool
+from image_validator import SourceImage
+
+
+MAX_FILE_BYTES = int(os.getenv("AURA_UPLOAD_MAX_FILE_BYTES", str(25 * 1024 ** 2)))
+MAX_REQUEST_BYTES = int(os.getenv("AURA_UPLOAD_MAX_REQUEST_BYTES", str(150 * 1024 ** 2)))
+MAX_PIXELS = int(os.getenv("AURA_UPLOAD_MAX_PIXELS", str(50_000_000)))
+CHUNK_SIZE = 1024 ** 2          # 한 번에 읽는 크기
+PROBE_LIMIT = 1024 ** 2         # 헤더를 찾을 때까지 모아 두는 앞부분 최대 크기 (EXIF 썸네일 포함)
+DECODED_BYTES_PER_PIXEL = 4     # 디코딩된 이미지 메모리 추정 (RGBA 기준)
+
+
+class UploadRejected(ValueError):
+    """제한을 넘는 업로드 (HTTP 413)"""
+
+
+# ============ 요청별 메모리 집계 ============
+class MemoryLedger:
+    """요청 1건 동안 메모리에 올라간 이미지 데이터 집계"""
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.current = 0
+        self.peak = 0
+        self.spooled_bytes = 0
+        self.spooled_files = 0
+        self.rss_start = peak_rss()
+        self._lock = threading.Lock()
+
+    def add(self, nbytes: int):
+        with self._lock:
+            self.current += nbytes
+            self.peak = max(self.peak, self.current)
+
+    def summary(self) -> Dict[str, Any]:
+        rss = peak_rss()
+        return {
+            "request_id": self.request_id,
+            "peak_image_bytes": self.peak,
+            "spooled_bytes": self.spooled_bytes,
+            "spooled_files": self.spooled_files,
+            "process_peak_rss": rss,
+            "process_peak_rss_growth": rss - self.rss_start,
+        }
+
+
+_current_ledger: ContextVar[Optional[MemoryLedger]] = ContextVar("upload_memory_ledger", default=None)
+
+
+def peak_rss() -> int:
+    """프로세스 최대 RSS (bytes, Linux 의 ru_maxrss 는 KB 단위)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MemoryTracker:
+    """
+    요청별 이미지 메모리 추적기
+    """
+
+    def start_request(self, request_id: str) -> MemoryLedger:
+        ledger = MemoryLedger(request_id)
+        _current_ledger.set(ledger)
+        return ledger
+
+    @contextmanager
+    def hold(self, nbytes: int):
+        """블록 동안 nbytes 만큼 이미지 데이터를 메모리에 둔 것으로 기록"""
+        ledger = _current_ledger.get()
+        if ledger is None or nbytes <= 0:
+            yield
+            return
+        ledger.add(nbytes)
+        try:
+            yield
+        finally:
+            ledger.add(-nbytes)
+
+    def record_spool(self, nbytes: int):
+        ledger = _current_ledger.get()
+        if ledger is not None:
+            with ledger._lock:
+                ledger.spooled_bytes += nbytes
+                ledger.spooled_files += 1
+
+    def report(self) -> Dict[str, Any]:
+        ledger = _current_ledger.get()
+        if ledger is None:
+            return {}
+        summary = ledger.summary()
+        mb = 1024 ** 2
+        print(
+            f"🧠 [Memory] {summary['request_id']}: peak {summary['peak_image_bytes'] / mb:.1f}MB image data in memory, "
+            f"{summary['spooled_files']} upload(s) / {summary['spooled_bytes'] / mb:.1f}MB spooled to disk, "
+            f"process peak RSS {summary['process_peak_rss'] / mb:.0f}MB "
+            f"(+{summary['process_peak_rss_growth'] / mb:.0f}MB during request)",
+            file=sys.stderr
+        )
+        return summary
+
+
+def image_memory(image: SourceImage) -> int:
+    """원본 bytes + 디코딩된 픽셀 추정치"""
+    width, height = image.size
+    return image.nbytes + width * height * DECODED_BYTES_PER_PIXEL
+
+
+# ============ spool ============
+def _probe_header(head: bytes, filename: Optional[str]) -> bool:
+    """앞부분으로 헤더 확인: 확인되면 True, 데이터가 더 필요하면 False (픽셀 수 초과 시 UploadRejected)"""
+    try:
+        with Image.open(io.BytesIO(head)) as probe:
+            width, height = probe.size
+    except Image.DecompressionBombError:
+        raise UploadRejected(f"{filename}: image dimensions exceed the pixel limit")
+    except Exception:
+        return False
+    if width * height > MAX_PIXELS:
+        raise UploadRejected(f"{filename}: {width}x{height} exceeds {MAX_PIXELS} pixels")
+    return True
+
+
+def spool_file(source: BinaryIO, filename: Optional[str], remaining: int) -> Optional[SourceImage]:
+    """
+    업로드 1개를 upload_store 로 spool (blocking: blocking_pool 에서 실행)
+    이미지가 아니면 None, 제한을 넘으면 UploadRejected
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=upload_store.staging_dir(), prefix=".upload-")
+    digest = hashlib.sha256()
+    head = bytearray()
+    identified = False
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_FILE_BYTES:
+                    raise UploadRejected(f"{filename}: larger than {MAX_FILE_BYTES // 1024 ** 2}MB per file")
+                if size > remaining:
+                    raise UploadRejected(f"uploads exceed {MAX_REQUEST_BYTES // 1024 ** 2}MB per request")
+                if not identified:
+                    head += chunk[:PROBE_LIMIT - len(head)]
+                    identified = _probe_header(bytes(head), filename)
+                    if not identified and len(head) >= PROBE_LIMIT:
+                        break
+                    if identified:
+                        head = bytearray()
+                digest.update(chunk)
+                out.write(chunk)
+        if not identified:
+            os.remove(tmp_path)
+            print(f"⚠️ Error loading image {filename}: not a recognized image", file=sys.stderr)
+            return None
+        asset_hash = upload_store.adopt(tmp_path, digest.hexdigest())
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    image = SourceImage(filename=filename, path=upload_store.path(asset_hash), digest=asset_hash)
+    print(f"✅ Spooled image: {filename} ({image.format} {image.size[0]}x{image.size[1]}, {size / 1024:.0f}KB)")
+    return image
+
+
+async def spool_uploads(files) -> List[SourceImage]:
+    """
+    UploadFile 목록을 업로드 순서대로 spool (이미지가 아닌 파일은 건너뜀)
+    Raises: UploadRejected
+    """
+    images = []
+    remaining = MAX_REQUEST_BYTES
+    for file in files or []:
+        # 크기를 이미 알면 읽기 전에 거절
+        if (getattr(file, "size", None) or 0) > MAX_FILE_BYTES:
+            raise UploadRejected(f"{file.filename}: larger than {MAX_FILE_BYTES // 1024 ** 2}MB per file")
+        image = await blocking_pool.run(spool_file, file.file, file.filename, remaining)
+        if image is None:
+            continue
+        remaining -= image.nbytes
+        memory_tracker.record_spool(image.nbytes)
+        images.append(image)
+    return images
+
+
+# 전역 인스턴스
+memory_tracker = MemoryTracker()
@@ -0,0 +1,250 @@
+"""
+[User Store Module]
+사용자 계정과 로그인 세션을 sqlite(WAL) 에 저장해 uvicorn 작업자 프로세스끼리 공유하는 모듈입니다.
+
+예전에는 계정이 프로세스 메모리의 dict(VALID_CREDENTIALS)여서 /signup 으로 만든 계정이
+그 요청을 받은 프로세스에만 있었기 때문에, 작업자를 여러 개 띄우면 로그인 결과가 요청마다 달라졌습니다.
+
+1. users    : 계정 (비밀번호는 PBKDF2-SHA256 + 계정별 salt 로 저장, 기본 계정 admin/user/demo 는 처음 한 번 등록)
+2. sessions : 세션 id → 세션 내용(JSON), 만료 시각
+              쿠키에는 추측할 수 없는 무작위 세션 id 만 들어가므로 서명 키를 작업자끼리 맞출 필요가 없고,
+              로그아웃하면 서버에서 세션이 삭제됨
+3. SessionMiddleware : request.session 을 sessions 테이블로 읽고 쓰는 ASGI 미들웨어
+                       (starlette SessionMiddleware 대체, 로그인으로 사용자가 바뀌면 세션 id 를 새로 발급)
+
+상태 확인:
+    python user_store.py [--json]
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import sys
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+
+from event_loop import blocking_pool
+
+
+DB_PATH = os.getenv("AURA_USER_DB", "./.users.db")
+
+SESSION_COOKIE = "session"
+SESSION_TTL = int(os.getenv("AURA_SESSION_TTL", str(14 * 24 * 3600)))    # 초: 마지막 갱신 후 세션 유지 시간
+SESSION_REFRESH = SESSION_TTL / 2      # 초: 남은 시간이 이보다 적으면 만료 시각 연장 (매 요청마다 쓰지 않도록)
+SESSION_HTTPS_ONLY = os.getenv("AURA_SESSION_HTTPS_ONLY", "0").lower() in ("1", "true", "yes")
+SESSIONLESS_PREFIXES = ("/static/", "/assets/")    # 세션을 읽지 않는 경로 (정적 파일, 이미지)
+
+PBKDF2_ITERATIONS = 200_000
+
+# 기본 계정 (예전 VALID_CREDENTIALS, 저장소가 처음 만들어질 때 등록)
+DEFAULT_USERS = {
+    'admin': 'admin123',
+    'user': 'user123',
+    'demo': 'demo123'
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    email TEXT NOT NULL DEFAULT '',
+    password_hash TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires_at);
+"""
+
+
+def hash_password(password: str, iterations: int = PBKDF2_ITERATIONS) -> str:
+    salt = secrets.token_hex(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), bytes.fromhex(salt), iterations)
+    return f"pbkdf2_sha256${iterations}${salt}${digest.hex()}"
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    try:
+        _, iterations, salt, expected = password_hash.split("$")
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), bytes.fromhex(salt), int(iterations))
+    except ValueError:
+        return False
+    return hmac.compare_digest(digest.hex(), expected)
+
+
+class UserStore:
+    """
+    프로세스 간 공유되는 계정/세션 저장소
+    """
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        self._initialized = False
+
+    # ============ 저장소 ============
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._seed(conn)
+            self._initialized = True
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _seed(conn: sqlite3.Connection):
+        if conn.execute("SELECT 1 FROM users LIMIT 1").fetchone():
+            return
+        now = time.time()
+        conn.executemany(
+            "INSERT OR IGNORE INTO users (username, password_hash, created_at) VALUES (?, ?, ?)",
+            [(username, hash_password(password), now) for username, password in DEFAULT_USERS.items()],
+        )
+
+    # ============ 계정 ============
+    def authenticate(self, username: str, password: str) -> bool:
+        """비밀번호 확인 (PBKDF2 계산이 있으므로 blocking_pool 에서 호출)"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT password_hash FROM users WHERE username = ?", (username,)).fetchone()
+        finally:
+            conn.close()
+        return row is not None and verify_password(password, row["password_hash"])
+
+    def create_user(self, username: str, password: str, email: str = "") -> bool:
+        """계정 등록, 이미 있는 사용자명이면 False"""
+        password_hash = hash_password(password)
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO users (username, email, password_hash, created_at) VALUES (?, ?, ?, ?)",
+                (username, email, password_hash, time.time()),
+            )
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    # ============ 세션 ============
+    def load_session(self, session_id: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """(만료되지 않은 세션 내용 또는 None, 만료 시각을 연장했는지)"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT data, expires_at FROM sessions WHERE id = ? AND expires_at > ?", (session_id, now)
+            ).fetchone()
+            if row is None:
+                return None, False
+            refreshed = row["expires_at"] - now < SESSION_REFRESH
+            if refreshed:
+                conn.execute("UPDATE sessions SET expires_at = ? WHERE id = ?", (now + SESSION_TTL, session_id))
+            return json.loads(row["data"]), refreshed
+        finally:
+            conn.close()
+
+    def save_session(self, session_id: Optional[str], data: Dict[str, Any]) -> str:
+        """세션 저장 후 세션 id 반환 (session_id 가 None 이면 새로 발급)"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            if session_id is None:
+                session_id = secrets.token_urlsafe(32)
+                conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, expires_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(data, ensure_ascii=False), now + SESSION_TTL),
+            )
+            return session_id
+        finally:
+            conn.close()
+
+    def delete_session(self, session_id: str):
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        finally:
+            conn.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        now = time.time()
+        conn = self._connect()
+        try:
+            users = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+            sessions = conn.execute("SELECT COUNT(*) FROM sessions WHERE expires_at > ?", (now,)).fetchone()[0]
+        finally:
+            conn.close()
+        return {"db_path": self.db_path, "users": users, "active_sessions": sessions}
+
+
+class SessionMiddleware:
+    """
+    request.session 을 user_store 세션으로 제공하는 ASGI 미들웨어
+    """
+
+    def __init__(self, app, store: Optional[UserStore] = None):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        if scope["path"].startswith(SESSIONLESS_PREFIXES):
+            scope["session"] = {}
+            await self.app(scope, receive, send)
+            return
+
+        store = self.store or user_store
+        session_id = HTTPConnection(scope).cookies.get(SESSION_COOKIE)
+        loaded, refreshed = await blocking_pool.run(store.load_session, session_id) if session_id else (None, False)
+        if loaded is None:
+            session_id = None
+        loaded = loaded or {}
+        scope["session"] = dict(loaded)
+
+        async def send_wrapper(message):
+            nonlocal session_id
+            if message["type"] == "http.response.start":
+                session = scope["session"]
+                cookie = None
+                if session != loaded:
+                    if session:
+                        # 로그인으로 사용자가 바뀌면 세션 id 를 새로 발급 (세션 고정 방지)
+                        if session_id and session.get("username") != loaded.get("username"):
+                            await blocking_pool.run(store.delete_session, session_id)
+                            session_id = None
+                        session_id = await blocking_pool.run(store.save_session, session_id, session)
+                        cookie = f"{SESSION_COOKIE}={session_id}; path=/; Max-Age={SESSION_TTL}"
+                    elif session_id:
+                        await blocking_pool.run(store.delete_session, session_id)
+                        cookie = f"{SESSION_COOKIE}=null; path=/; expires=Thu, 01 Jan 1970 00:00:00 GMT"
+                elif refreshed:
+                    # 서버에서 연장한 만료 시각을 쿠키에도 반영
+                    cookie = f"{SESSION_COOKIE}={session_id}; path=/; Max-Age={SESSION_TTL}"
+                if cookie:
+                    cookie += "; httponly; samesite=lax" + ("; secure" if SESSION_HTTPS_ONLY else "")
+                    MutableHeaders(scope=message).append("Set-Cookie", cookie)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+# 전역 인스턴스
+user_store = UserStore()
+
+
+if __name__ == "__main__":
+    metrics = user_store.metrics()
+    if "--json" in sys.argv:
+        print(json.dumps(metrics, indent=2))
+    else:
+        print(f"{metrics['users']} users, {metrics['active_sessions']} active sessions in {metrics['db_path']}")